@@ -0,0 +1,393 @@
+"""
+Batch Catalog
+=============
+
+Transactional store of batch metadata in SQLite (batch_metadata/batches.db):
+
+    batches(batch_id PRIMARY KEY, batch_number UNIQUE, product, status,
+            created_at, loaded_at, superseded_at, parent_batch, data)
+
+The indexed columns answer the lookups of the batch manager (active batch of
+a product, newest batches, next batch number, batch at a point in time, delta
+children) without reading every batch; 'data' holds the full metadata as JSON.
+
+Batches read from the catalog are kept in an identity map, so every lookup
+of a batch returns the same object. Batches derive from TrackedBatch, whose
+attribute assignments mark them as changed; commit() upserts only those
+batches (and deletes removed ones) in one transaction, so its cost does not
+grow with the number of batches read. Queries see the changes made so far:
+outside transaction() a query commits them first, so no read leaves a write
+transaction (and the write lock of the database) open.
+
+Read-modify-write steps that must not interleave with other processes using
+the same catalog (allocating a batch number, switching the active batch)
+run in transaction(), which holds the SQLite write lock and re-reads the
+batches in the identity map first.
+
+A batches.json file from earlier versions is imported on the first open and
+renamed to batches.json.migrated.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# Product of batches without one (and of catalogs from before products)
+DEFAULT_PRODUCT = "default"
+
+# Seconds to wait for another process holding the write lock
+LOCK_TIMEOUT = 60.0
+
+TABLE = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    batch_number INTEGER NOT NULL UNIQUE,
+    product TEXT NOT NULL DEFAULT 'default',
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    loaded_at TEXT,
+    superseded_at TEXT,
+    parent_batch TEXT,
+    data TEXT NOT NULL
+)
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS batches_status ON batches (status, batch_number);
+CREATE INDEX IF NOT EXISTS batches_product ON batches (product, status, batch_number);
+CREATE INDEX IF NOT EXISTS batches_created_at ON batches (created_at);
+CREATE INDEX IF NOT EXISTS batches_loaded_at ON batches (loaded_at);
+CREATE INDEX IF NOT EXISTS batches_parent ON batches (parent_batch);
+"""
+
+UPSERT = """
+INSERT OR REPLACE INTO batches
+    (batch_id, batch_number, product, status, created_at, loaded_at, superseded_at, parent_batch, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _utc(value: Optional[str]) -> Optional[str]:
+    """An ISO timestamp in UTC, so that timestamps compare as text"""
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).astimezone(timezone.utc).isoformat()
+
+
+class TrackedBatch:
+    """
+    Base class of the batches kept in a catalog.
+
+    Assigning an attribute of a batch in a catalog marks it as changed.
+    Lists held by a batch are not watched: assign a new list to change one.
+    """
+
+    _catalog: Optional['BatchCatalog'] = None
+
+    def __setattr__(self, name: str, value: Any):
+        object.__setattr__(self, name, value)
+        if self._catalog is not None:
+            self._catalog._changed(self)
+
+
+def _row(d: Dict) -> Tuple:
+    """Column values of a batch dict (BatchMetadata.to_dict())"""
+    return (
+        d['batch_id'], d['batch_number'], d.get('product') or DEFAULT_PRODUCT, d['status'],
+        _utc(d['created_at']),
+        _utc(d.get('loaded_at')), _utc(d.get('superseded_at')), d.get('parent_batch'),
+        json.dumps(d),
+    )
+
+
+class BatchCatalog:
+    """
+    Batch metadata in SQLite, with the read interface of a dict of batch ID
+    to batch (in, [], get, values, len) and indexed queries.
+
+    Usage:
+        catalog = BatchCatalog("batch_metadata/batches.db", BatchMetadata.from_dict)
+        catalog[batch.batch_id] = batch
+        catalog.active().status = BatchStatus.SUPERSEDED
+        catalog.commit()
+    """
+
+    def __init__(self, path: str, load: Callable[[Dict], Any],
+                 json_path: Optional[str] = None):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            load: Function building a batch from its dict (e.g. BatchMetadata.from_dict)
+            json_path: batches.json of earlier versions, imported if the catalog is empty
+        """
+        self.path = path
+        self._load = load
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self._conn.execute(TABLE)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(batches)")}
+        if 'product' not in columns:
+            # Catalogs from before products
+            self._conn.execute(f"ALTER TABLE batches ADD COLUMN product TEXT NOT NULL DEFAULT '{DEFAULT_PRODUCT}'")
+        self._conn.executescript(INDEXES)
+
+        # Identity map: batch ID -> batch, and the IDs of the changed batches
+        self._batches: Dict[str, TrackedBatch] = {}
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._depth = 0
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+        if json_path and os.path.exists(json_path) and len(self) == 0:
+            self.migrate_json(json_path)
+
+    def migrate_json(self, json_path: str) -> int:
+        """
+        Import the batches of a batches.json file and rename the file.
+
+        Returns:
+            Number of imported batches
+        """
+        with open(json_path, 'r') as f:
+            batches = json.load(f).get('batches', [])
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT, [_row(d) for d in batches])
+        os.replace(json_path, f"{json_path}.migrated")
+        print(f"[BatchCatalog] Migrated {len(batches)} batches from {json_path}")
+        return len(batches)
+
+    def _batch(self, batch_id: str, data: str) -> Any:
+        """The batch of a row, from the identity map if already read"""
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            batch = self._load(json.loads(data))
+            object.__setattr__(batch, '_catalog', self)
+            self._batches[batch_id] = batch
+        return batch
+
+    def _changed(self, batch: TrackedBatch):
+        """Mark a batch as changed (called by TrackedBatch on assignments)"""
+        with self._lock:
+            if self._batches.get(batch.batch_id) is batch:
+                self._dirty.add(batch.batch_id)
+
+    def _flush(self):
+        """
+        Write the changed and deleted batches.
+
+        Inside transaction() they join its transaction; outside one they are
+        committed right away, instead of holding the write lock until the
+        next commit().
+        """
+        if not (self._deleted or self._dirty):
+            return
+
+        if self._deleted:
+            self._conn.executemany("DELETE FROM batches WHERE batch_id = ?",
+                                   [(batch_id,) for batch_id in self._deleted])
+            self._deleted.clear()
+
+        if self._dirty:
+            self._conn.executemany(UPSERT, [_row(self._batches[batch_id].to_dict())
+                                            for batch_id in self._dirty])
+            self._dirty.clear()
+
+        if not self._depth:
+            self._conn.commit()
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Any]:
+        """Batches of a query selecting batch_id, data (sees the changes made so far)"""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params).fetchall()
+            return [self._batch(batch_id, data) for batch_id, data in rows]
+
+    def refresh(self):
+        """Re-read the batches in the identity map (in place) from the database"""
+        with self._lock:
+            ids = list(self._batches)
+            rows = {}
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows.update(self._conn.execute(
+                    f"SELECT batch_id, data FROM batches WHERE batch_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+            for batch_id in ids:
+                if batch_id not in rows:
+                    object.__setattr__(self._batches.pop(batch_id), '_catalog', None)
+                    continue
+                # Updating the attributes in place does not mark the batch as changed
+                vars(self._batches[batch_id]).update(vars(self._load(json.loads(rows[batch_id]))))
+            self._dirty.clear()
+            self._deleted.clear()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the write lock of the database for a read-modify-write step.
+
+        Other processes wait (up to LOCK_TIMEOUT seconds) until the step is
+        committed; batches read before are re-read first if another process
+        changed the catalog, so the step sees their current state. Nested
+        transactions join the outer one. On an error the changes are rolled
+        back and the batches re-read.
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self
+                finally:
+                    self._depth -= 1
+                return
+
+            self.commit()
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                # Only changes committed by other connections need a re-read
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    self._data_version = data_version
+                    self.refresh()
+                yield self
+                self._flush()
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                self.refresh()
+                raise
+            finally:
+                self._depth = 0
+
+    def commit(self):
+        """Write all changes to batches (at the end of the transaction, inside one)"""
+        with self._lock:
+            self._flush()
+            if not self._depth:
+                self._conn.commit()
+
+    def close(self):
+        """Commit and close the database"""
+        self.commit()
+        self._conn.close()
+
+    # -- dict interface --------------------------------------------------
+
+    def get(self, batch_id: str, default: Any = None) -> Any:
+        if batch_id in self._batches:
+            return self._batches[batch_id]
+        batches = self._query("SELECT batch_id, data FROM batches WHERE batch_id = ?", (batch_id,))
+        return batches[0] if batches else default
+
+    def __getitem__(self, batch_id: str) -> Any:
+        batch = self.get(batch_id)
+        if batch is None:
+            raise KeyError(batch_id)
+        return batch
+
+    def __contains__(self, batch_id: str) -> bool:
+        return self.get(batch_id) is not None
+
+    def __setitem__(self, batch_id: str, batch: TrackedBatch):
+        with self._lock:
+            self._deleted.discard(batch_id)
+            object.__setattr__(batch, '_catalog', self)
+            self._batches[batch_id] = batch
+            self._dirty.add(batch_id)
+
+    def __delitem__(self, batch_id: str):
+        with self._lock:
+            if batch_id not in self:
+                raise KeyError(batch_id)
+            object.__setattr__(self._batches.pop(batch_id), '_catalog', None)
+            self._dirty.discard(batch_id)
+            self._deleted.add(batch_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        return (batch.batch_id for batch in self.values())
+
+    def values(self) -> List[Any]:
+        """All batches, oldest first"""
+        return self._query("SELECT batch_id, data FROM batches ORDER BY batch_number")
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(batch.batch_id, batch) for batch in self.values()]
+
+    # -- indexed queries -------------------------------------------------
+
+    def active(self, product: str = DEFAULT_PRODUCT) -> Optional[Any]:
+        """The batch with status 'active' of a product (the newest, if there are several)"""
+        batches = self._query("SELECT batch_id, data FROM batches WHERE product = ? AND status = 'active' "
+                              "ORDER BY batch_number DESC LIMIT 1", (product,))
+        return batches[0] if batches else None
+
+    def newest(self, limit: int, status: Optional[str] = None,
+               product: Optional[str] = None) -> List[Any]:
+        """The newest batches by batch number, optionally with one status or of one product"""
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if product is not None:
+            conditions.append("product = ?")
+            params.append(product)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        return self._query(f"SELECT batch_id, data FROM batches {where}ORDER BY batch_number DESC LIMIT ?",
+                           (*params, limit))
+
+    def with_status(self, status: str) -> List[Any]:
+        """All batches with a status, oldest first"""
+        return self._query("SELECT batch_id, data FROM batches WHERE status = ? "
+                           "ORDER BY batch_number", (status,))
+
+    def loaded(self) -> List[Any]:
+        """The batches that have been loaded, oldest first"""
+        return self._query("SELECT batch_id, data FROM batches WHERE loaded_at IS NOT NULL "
+                           "ORDER BY batch_number")
+
+    def products(self) -> List[str]:
+        """The products that have batches"""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute("SELECT DISTINCT product FROM batches ORDER BY product").fetchall()
+        return [row[0] for row in rows]
+
+    def children(self, batch_id: str) -> List[Any]:
+        """The batches whose parent is a batch"""
+        return self._query("SELECT batch_id, data FROM batches WHERE parent_batch = ? "
+                           "ORDER BY batch_number", (batch_id,))
+
+    def at(self, timestamp: datetime, product: str = DEFAULT_PRODUCT) -> Optional[Any]:
+        """The newest batch of a product loaded at or before a time and not superseded then"""
+        when = timestamp.astimezone(timezone.utc).isoformat()
+        batches = self._query(
+            "SELECT batch_id, data FROM batches WHERE product = ? AND loaded_at <= ? "
+            "AND (superseded_at IS NULL OR superseded_at > ?) "
+            "ORDER BY batch_number DESC LIMIT 1", (product, when, when)
+        )
+        return batches[0] if batches else None
+
+    def next_batch_number(self) -> int:
+        """One more than the highest batch number (1 for an empty catalog)"""
+        with self._lock:
+            self._flush()
+            latest = self._conn.execute("SELECT MAX(batch_number) FROM batches").fetchone()[0]
+        return (latest or 0) + 1
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of batches per status"""
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM batches GROUP BY status").fetchall()
+        return dict(rows)
@@ -7,90 +7,160 @@ Batch Management CLI
 Command-line interface for managing RDF-star batches.
 
 Usage:
-    python batch_cli.py run <mapping_file> [options]
-    python batch_cli.py list [--status <status>]
+    python batch_cli.py run <mapping_file> [--output <file> | --no-output] [--product <name>] [options]
+    python batch_cli.py run <mapping_file> <mapping_file> ... [--no-output]
+    python batch_cli.py list [--status <status>] [--product <name>]
     python batch_cli.py diff <batch1> <batch2>
     python batch_cli.py query <batch_id> "<sparql_query>"
-    python batch_cli.py export <batch_id> <output_file>
+    python batch_cli.py as-of <timestamp> "<sparql_query>"
+    python batch_cli.py export <batch_id> <output_file> [--format nq] [--compression gzip]
     python batch_cli.py archive <batch_id>
     python batch_cli.py delete <batch_id> [--permanent]
+    python batch_cli.py purge [<batch_id> ...] [--status <status>] [--keep N]
     python batch_cli.py status
     python batch_cli.py provenance <subject_uri> [--batch <batch_id>]
 
+    Add --store-path <dir> before the command to keep batch data in an
+    on-disk store between commands, and --storage-mode delta to store
+    batches between checkpoints as deltas of the previous batch.
+
+    Several mapping files are run in parallel into the same store, each as
+    its own data product (named after the mapping file) with its own active
+    batch.
+
 =============================================================================
 """
 
 import argparse
+import re
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from pyoxigraph import Store, RdfFormat
-from batch_manager import BatchManager, BatchStatus
+from batch_manager import BatchManager, BatchStatus, DEFAULT_PRODUCT
+from store_io import open_store, rdf_format_for_path
 from rdf_star_etl_yarrrml import RDFStarETLEngine
 
 
+def open_manager(args, read_only: bool = False) -> BatchManager:
+    """
+    Open the batch manager on the batch store.
+
+    With --store-path the store is the on-disk store, so batch data is kept
+    between commands; commands that do not change the store open it
+    read-only. A read-only open is only supported while no other process
+    (such as a server on the same store) has it open for writing, so stop
+    the writer first. Without it every command starts from an empty
+    in-memory store.
+    """
+    if args.store_path and (not read_only or os.path.isdir(args.store_path)):
+        store = open_store(args.store_path, read_only=read_only)
+    else:
+        # No store yet: nothing has been loaded into it
+        store = Store()
+    return BatchManager(
+        store,
+        metadata_dir=args.metadata_dir,
+        storage_mode=args.storage_mode,
+        checkpoint_interval=args.checkpoint_interval
+    )
+
+
 def cmd_run(args):
-    """Run ETL and create a new batch."""
+    """Run ETL and create a new batch (one per mapping file)."""
     print(f"\n{'='*70}")
     print("BATCH ETL RUN")
     print(f"{'='*70}")
 
-    # Initialize batch manager with persistent store
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    if len(args.mapping_files) > 1 and (args.output or args.product):
+        print("--output and --product apply to a single mapping file")
+        return 1
+
+    # Initialize batch manager (on the on-disk store with --store-path)
+    manager = open_manager(args)
+
+    if len(args.mapping_files) == 1:
+        runs = [run_mapping(manager, args, args.mapping_files[0], args.product or DEFAULT_PRODUCT)]
+    else:
+        # One product per mapping file; the loads share the store
+        products = [re.sub(r'[^A-Za-z0-9_-]', '_', os.path.splitext(os.path.basename(path))[0])
+                    for path in args.mapping_files]
+        if len(set(products)) < len(products):
+            print("Mapping files must have different names (one product each)")
+            return 1
+        with ThreadPoolExecutor(max_workers=args.parallel or len(products)) as pool:
+            runs = list(pool.map(lambda item: run_mapping(manager, args, *item),
+                                 zip(args.mapping_files, products)))
+
+    if args.store_path:
+        manager.store.flush()
+
+    for batch, engine, output_file in runs:
+        print(f"\n{'='*70}")
+        print("BATCH COMPLETE")
+        print(f"{'='*70}")
+        print(f"Batch ID: {batch.batch_id}")
+        print(f"Product: {batch.product}")
+        print(f"Graph URI: {batch.graph_uri}")
+        print(f"Quads loaded: {batch.quad_count}")
+        print(f"Status: {batch.status.value}")
+        if batch.status == BatchStatus.CONFIRMED:
+            # Same mapping and source files as the active batch: nothing was run
+            print(f"Confirms: {batch.confirms}")
+        elif not args.no_output:
+            engine.wait_for_output()
+            print(f"Output file: {output_file}")
+        print(f"{'='*70}\n")
+
+    return 0
+
 
+def run_mapping(manager: BatchManager, args, mapping_file: str, product: str):
+    """Create a batch of a product and load it with the ETL engine"""
     # Parse tags
     tags = args.tags.split(',') if args.tags else []
 
     # Create the batch
     batch = manager.create_batch(
-        source_mapping=args.mapping_file,
+        source_mapping=mapping_file,
         source_files=[],  # Will be populated by ETL
-        description=args.description or f"ETL run from {os.path.basename(args.mapping_file)}",
-        tags=tags
+        description=args.description or f"ETL run from {os.path.basename(mapping_file)}",
+        tags=tags,
+        product=product
     )
 
-    print(f"\nCreated batch: {batch.batch_id}")
+    print(f"\nCreated batch: {batch.batch_id} ({product})")
 
     # Run ETL engine
     output_file = args.output or f"output/batch_{batch.batch_number:04d}.trig"
 
     # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    if not args.no_output:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
 
+    # The engine loads straight into the batch graph; the output file is
+    # written in the background while the batch is registered
     print(f"\nRunning ETL...")
-    engine = RDFStarETLEngine(args.mapping_file, output_file)
-    engine.run()
-
-    # Update batch with source files from ETL
-    batch.source_files = list(engine.dataframes.keys())
-
-    # Load the output into the batch
-    batch = manager.load_batch_from_file(
-        batch_id=batch.batch_id,
-        rdf_file=output_file
+    engine = RDFStarETLEngine(
+        mapping_file, output_file,
+        store=manager.store,
+        store_stats=manager.store_stats,
+        graph=batch.graph_uri,
+        write_output=not args.no_output,
+        background_output=True
     )
-
-    print(f"\n{'='*70}")
-    print("BATCH COMPLETE")
-    print(f"{'='*70}")
-    print(f"Batch ID: {batch.batch_id}")
-    print(f"Graph URI: {batch.graph_uri}")
-    print(f"Quads loaded: {batch.quad_count}")
-    print(f"Status: {batch.status.value}")
-    print(f"{'='*70}\n")
-
-    return 0
+    batch = manager.load_batch_from_engine(batch.batch_id, engine, skip_unchanged=not args.force)
+    return batch, engine, output_file
 
 
 def cmd_list(args):
     """List batches."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
 
     # Parse status filter
     status_filter = None
@@ -102,7 +172,7 @@ def cmd_list(args):
             print(f"Valid values: {', '.join(s.value for s in BatchStatus)}")
             return 1
 
-    batches = manager.list_batches(status=status_filter, limit=args.limit)
+    batches = manager.list_batches(status=status_filter, limit=args.limit, product=args.product)
 
     print(f"\n{'='*70}")
     print("BATCHES")
@@ -111,11 +181,12 @@ def cmd_list(args):
     if not batches:
         print("No batches found.")
     else:
-        print(f"{'ID':<40} {'Status':<12} {'Quads':<10} {'Created'}")
+        print(f"{'ID':<40} {'Product':<16} {'Status':<12} {'Quads':<10} {'Created'}")
         print("-" * 70)
         for batch in batches:
             created = batch.created_at.strftime("%Y-%m-%d %H:%M")
-            print(f"{batch.batch_id:<40} {batch.status.value:<12} {batch.quad_count:<10} {created}")
+            print(f"{batch.batch_id:<40} {batch.product:<16} {batch.status.value:<12} "
+                  f"{batch.quad_count:<10} {created}")
 
     print(f"{'='*70}\n")
     return 0
@@ -123,8 +194,7 @@ def cmd_list(args):
 
 def cmd_diff(args):
     """Compare two batches."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
 
     # Need to load the batch data files to compare
     batch1 = manager.get_batch(args.batch1)
@@ -137,9 +207,9 @@ def cmd_diff(args):
         print(f"Batch not found: {args.batch2}")
         return 1
 
-    # Load batch data from their export files if available
-    print(f"\nNote: For full diff, batch data must be loaded in the store.")
-    print(f"Run with a persistent store or export/import batches.\n")
+    if not args.store_path:
+        print(f"\nNote: For full diff, batch data must be loaded in the store.")
+        print(f"Run with --store-path or export/import batches.\n")
 
     try:
         diff = manager.compare_batches(args.batch1, args.batch2, sample_limit=args.limit)
@@ -147,9 +217,9 @@ def cmd_diff(args):
         print(f"\n{'='*70}")
         print(f"BATCH DIFF: {args.batch1} -> {args.batch2}")
         print(f"{'='*70}")
-        print(f"Added triples: {len(diff.added_triples)}")
-        print(f"Removed triples: {len(diff.removed_triples)}")
-        print(f"Modified subjects: {len(diff.modified_subjects)}")
+        print(f"Added triples: {diff.added_count}")
+        print(f"Removed triples: {diff.removed_count}")
+        print(f"Modified subjects: {diff.modified_count}")
         print(f"Unchanged: {diff.unchanged_count}")
 
         if args.verbose and diff.added_triples:
@@ -178,8 +248,7 @@ def cmd_diff(args):
 
 def cmd_query(args):
     """Query a specific batch."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
 
     batch = manager.get_batch(args.batch_id)
     if not batch:
@@ -213,30 +282,72 @@ def cmd_query(args):
     return 0
 
 
+def cmd_as_of(args):
+    """Query the data as it was at a point in time (from the validity index)."""
+    manager = open_manager(args, read_only=True)
+
+    timestamp = datetime.fromisoformat(args.timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    batch = manager.batch_at(timestamp)
+    if not batch:
+        print(f"No batch was active at {timestamp.isoformat()}")
+        return 1
+
+    print(f"\n{'='*70}")
+    print(f"QUERY AS OF: {timestamp.isoformat()} (batch {batch.batch_id})")
+    print(f"{'='*70}")
+    print(f"Query: {args.query[:100]}...")
+    print()
+
+    try:
+        results = manager.as_of(timestamp, args.query)
+
+        row_count = 0
+        for row in results:
+            row_count += 1
+            print(row)
+            if row_count >= args.limit:
+                print(f"... (limited to {args.limit} rows)")
+                break
+
+        print(f"\nRows returned: {row_count}")
+
+    except Exception as e:
+        print(f"Query error: {e}")
+        return 1
+
+    print(f"{'='*70}\n")
+    return 0
+
+
 def cmd_export(args):
     """Export a batch to a file."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
 
     batch = manager.get_batch(args.batch_id)
     if not batch:
         print(f"Batch not found: {args.batch_id}")
         return 1
 
-    # Determine format
-    rdf_format = RdfFormat.TRIG
-    if args.output_file.endswith('.ttl'):
-        rdf_format = RdfFormat.TURTLE
-    elif args.output_file.endswith('.nt'):
-        rdf_format = RdfFormat.N_TRIPLES
-    elif args.output_file.endswith('.nq'):
+    # Determine format (from the extension, also of .gz/.zst files)
+    if args.format:
+        rdf_format = RdfFormat.from_extension(args.format)
+    elif args.output_file == '-':
         rdf_format = RdfFormat.N_QUADS
+    else:
+        rdf_format = rdf_format_for_path(args.output_file)
 
     try:
-        manager.export_batch(args.batch_id, args.output_file, rdf_format)
-        print(f"Exported batch {args.batch_id} to {args.output_file}")
+        if args.output_file == '-':
+            # Stream to stdout (e.g. into a pipe or socket)
+            manager.export_batch(args.batch_id, sys.stdout.buffer, rdf_format, args.compression)
+        else:
+            manager.export_batch(args.batch_id, args.output_file, rdf_format, args.compression)
+            print(f"Exported batch {args.batch_id} to {args.output_file}")
     except Exception as e:
-        print(f"Export error: {e}")
+        print(f"Export error: {e}", file=sys.stderr)
         return 1
 
     return 0
@@ -244,8 +355,7 @@ def cmd_export(args):
 
 def cmd_archive(args):
     """Archive a batch."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
 
     try:
         manager.archive_batch(args.batch_id)
@@ -259,8 +369,7 @@ def cmd_archive(args):
 
 def cmd_delete(args):
     """Delete a batch."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=not args.permanent)
 
     if args.permanent:
         confirm = input(f"Permanently delete batch {args.batch_id}? This cannot be undone. [y/N]: ")
@@ -279,18 +388,54 @@ def cmd_delete(args):
     return 0
 
 
+def cmd_purge(args):
+    """Permanently delete several batches in one go (retention)."""
+    manager = open_manager(args)
+
+    batch_ids = list(args.batch_ids)
+    if args.status:
+        try:
+            status = BatchStatus(args.status.lower())
+        except ValueError:
+            print(f"Invalid status: {args.status}")
+            return 1
+        # list_batches is newest first: keep the newest --keep batches
+        selected = manager.list_batches(status=status, limit=len(manager.batches))
+        batch_ids.extend(b.batch_id for b in selected[args.keep:])
+
+    if not batch_ids:
+        print("No batches to purge.")
+        return 0
+
+    if not args.yes:
+        confirm = input(f"Permanently delete {len(batch_ids)} batches? This cannot be undone. [y/N]: ")
+        if confirm.lower() != 'y':
+            print("Cancelled.")
+            return 0
+
+    try:
+        quads = manager.purge_batches(batch_ids)
+        print(f"Purged {len(batch_ids)} batches ({quads} quads)")
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.store_path:
+        manager.store.flush()
+
+    return 0
+
+
 def cmd_status(args):
     """Show batch management status."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
     manager.print_status()
     return 0
 
 
 def cmd_provenance(args):
     """Get provenance for a subject."""
-    store = Store()
-    manager = BatchManager(store, metadata_dir=args.metadata_dir)
+    manager = open_manager(args, read_only=True)
 
     batch_id = args.batch
     if not batch_id:
@@ -333,6 +478,10 @@ def main():
 Examples:
     # Run ETL and create a new batch
     python batch_cli.py run mappings/data_products_rml.yaml --description "Daily run"
+
+    # Keep batch data in an on-disk store between commands
+    python batch_cli.py --store-path stores/batches run mappings/data_products_rml.yaml
+    python batch_cli.py --store-path stores/batches diff batch_0001 batch_0002
     
     # List all batches
     python batch_cli.py list
@@ -343,6 +492,9 @@ Examples:
     # Compare two batches
     python batch_cli.py diff batch_0001 batch_0002 --verbose
     
+    # Query the data as it was at a point in time
+    python batch_cli.py as-of 2026-02-15T12:00:00 "SELECT ?o WHERE { <http://example.org/customer/123> ?p ?o }"
+
     # Show status
     python batch_cli.py status
     
@@ -357,19 +509,47 @@ Examples:
         help='Directory for batch metadata (default: batch_metadata)'
     )
 
+    parser.add_argument(
+        '--store-path',
+        default=None,
+        help='Directory of the on-disk RocksDB batch store (default: in-memory store)'
+    )
+
+    parser.add_argument(
+        '--storage-mode',
+        choices=['full', 'delta'],
+        default='full',
+        help='Keep new batches in full, or as deltas of the previous batch between checkpoints'
+    )
+
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=int,
+        default=10,
+        help='In delta mode, keep every n-th batch in full (default: 10)'
+    )
+
     subparsers = parser.add_subparsers(dest='command', help='Command')
 
     # run command
     run_parser = subparsers.add_parser('run', help='Run ETL and create a batch')
-    run_parser.add_argument('mapping_file', help='YARRRML mapping file')
+    run_parser.add_argument('mapping_files', nargs='+', metavar='mapping_file',
+                            help='YARRRML mapping file(s); several are loaded in parallel, one product each')
+    run_parser.add_argument('--product', '-p', help=f'Data product of the batch (default: {DEFAULT_PRODUCT})')
+    run_parser.add_argument('--parallel', type=int, help='Max mapping files loaded at once (default: all)')
     run_parser.add_argument('--output', '-o', help='Output file path')
     run_parser.add_argument('--description', '-d', help='Batch description')
     run_parser.add_argument('--tags', '-t', help='Comma-separated tags')
+    run_parser.add_argument('--no-output', action='store_true',
+                            help='Only load the batch into the store, do not write an output file')
+    run_parser.add_argument('--force', action='store_true',
+                            help='Load even if the mapping and source files are unchanged since the active batch')
 
     # list command
     list_parser = subparsers.add_parser('list', help='List batches')
     list_parser.add_argument('--status', '-s', help='Filter by status')
     list_parser.add_argument('--limit', '-l', type=int, default=20, help='Max results')
+    list_parser.add_argument('--product', '-p', help='Filter by data product')
 
     # diff command
     diff_parser = subparsers.add_parser('diff', help='Compare two batches')
@@ -384,10 +564,20 @@ Examples:
     query_parser.add_argument('query', help='SPARQL query')
     query_parser.add_argument('--limit', '-l', type=int, default=100, help='Max rows')
 
+    # as-of command
+    as_of_parser = subparsers.add_parser('as-of', help='Query the data at a point in time')
+    as_of_parser.add_argument('timestamp', help='ISO 8601 timestamp (UTC if no offset)')
+    as_of_parser.add_argument('query', help='SPARQL query (data is in the default graph)')
+    as_of_parser.add_argument('--limit', '-l', type=int, default=100, help='Max rows')
+
     # export command
     export_parser = subparsers.add_parser('export', help='Export a batch')
     export_parser.add_argument('batch_id', help='Batch ID')
-    export_parser.add_argument('output_file', help='Output file')
+    export_parser.add_argument('output_file', help='Output file (.trig, .nq, .ttl, .nt, optionally .gz/.zst), or - for stdout')
+    export_parser.add_argument('--format', '-f', choices=['trig', 'nq', 'ttl', 'nt'],
+                               help='Output format (default: from the file extension, N-Quads for stdout)')
+    export_parser.add_argument('--compression', '-c', choices=['gzip', 'zstd'],
+                               help='Compress the output (default: from a .gz/.zst extension)')
 
     # archive command
     archive_parser = subparsers.add_parser('archive', help='Archive a batch')
@@ -398,6 +588,14 @@ Examples:
     delete_parser.add_argument('batch_id', help='Batch ID')
     delete_parser.add_argument('--permanent', action='store_true', help='Permanently delete')
 
+    # purge command
+    purge_parser = subparsers.add_parser('purge', help='Permanently delete several batches at once')
+    purge_parser.add_argument('batch_ids', nargs='*', help='Batch IDs')
+    purge_parser.add_argument('--status', '-s', help='Also purge all batches with this status')
+    purge_parser.add_argument('--keep', '-k', type=int, default=0,
+                              help='With --status, keep the newest N of those batches')
+    purge_parser.add_argument('--yes', '-y', action='store_true', help='Do not ask for confirmation')
+
     # status command
     status_parser = subparsers.add_parser('status', help='Show batch status')
 
@@ -418,9 +616,11 @@ Examples:
         'list': cmd_list,
         'diff': cmd_diff,
         'query': cmd_query,
+        'as-of': cmd_as_of,
         'export': cmd_export,
         'archive': cmd_archive,
         'delete': cmd_delete,
+        'purge': cmd_purge,
         'status': cmd_status,
         'provenance': cmd_provenance,
     }
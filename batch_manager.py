@@ -12,28 +12,43 @@
 # =============================================================================
 
 import os
-import hashlib
-import json
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Tuple, Any
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple, Any, Union
 from enum import Enum
-from io import BytesIO
 
 from pyoxigraph import Store, Quad, Triple, NamedNode, BlankNode, Literal, RdfFormat
 
+from batch_catalog import BatchCatalog, TrackedBatch, DEFAULT_PRODUCT
+from store_io import GraphView, bulk_add, bulk_load_file, copy_graph, file_digest
+from store_stats import StoreStats
+from batch_diff import diff_graphs
+from validity_index import ValidityIndex
+
+
+class BatchStorage(Enum):
+    """How the data of a batch is kept in the store."""
+    FULL = "full"                # Complete copy in the batch graph (checkpoint)
+    DELTA = "delta"              # Added/removed graphs against the parent batch
+
 
 class BatchStatus(Enum):
     """Status of a batch in the system."""
     PENDING = "pending"          # Batch created but not yet loaded
+    STAGING = "staging"          # Loading into its graph; not visible as active yet
     ACTIVE = "active"            # Currently active batch
     SUPERSEDED = "superseded"    # Replaced by newer batch
     ARCHIVED = "archived"        # Archived for historical reference
     DELETED = "deleted"          # Marked for deletion
+    CONFIRMED = "confirmed"      # Same input as the batch it confirms; nothing loaded
+    FAILED = "failed"            # Load failed; its staged quads were dropped
 
 
 @dataclass
-class BatchMetadata:
+class BatchMetadata(TrackedBatch):
     """Metadata for a single batch of materialized data."""
     batch_id: str
     batch_number: int
@@ -50,6 +65,21 @@ class BatchMetadata:
     description: str = ""
     tags: List[str] = field(default_factory=list)
     checksum: Optional[str] = None
+    storage: BatchStorage = BatchStorage.FULL
+    parent_batch: Optional[str] = None   # Batch a delta applies to
+    materialized: bool = True            # Batch graph holds the complete state
+    confirms: Optional[str] = None       # Batch with the same input (confirmed batches)
+    product: str = DEFAULT_PRODUCT       # Data product; each has its own active batch
+
+    @property
+    def added_graph_uri(self) -> str:
+        """Graph of the triples added since the parent batch (delta storage)"""
+        return f"{self.graph_uri}/added"
+
+    @property
+    def removed_graph_uri(self) -> str:
+        """Graph of the triples removed since the parent batch (delta storage)"""
+        return f"{self.graph_uri}/removed"
 
     def to_dict(self) -> Dict:
         return {
@@ -67,7 +97,12 @@ class BatchMetadata:
             'superseded_by': self.superseded_by,
             'description': self.description,
             'tags': self.tags,
-            'checksum': self.checksum
+            'checksum': self.checksum,
+            'storage': self.storage.value,
+            'parent_batch': self.parent_batch,
+            'materialized': self.materialized,
+            'confirms': self.confirms,
+            'product': self.product
         }
 
     @classmethod
@@ -87,7 +122,12 @@ class BatchMetadata:
             superseded_by=d.get('superseded_by'),
             description=d.get('description', ''),
             tags=d.get('tags', []),
-            checksum=d.get('checksum')
+            checksum=d.get('checksum'),
+            storage=BatchStorage(d.get('storage', BatchStorage.FULL.value)),
+            parent_batch=d.get('parent_batch'),
+            materialized=d.get('materialized', True),
+            confirms=d.get('confirms'),
+            product=d.get('product', DEFAULT_PRODUCT)
         )
 
 
@@ -101,15 +141,18 @@ class BatchDiff:
     removed_triples: List[str]    # Triples in from_batch but not in to_batch
     modified_subjects: List[str]  # Subjects with changed predicates/objects
     unchanged_count: int
+    added_count: int = 0          # Exact counts (the lists above are samples)
+    removed_count: int = 0
+    modified_count: int = 0
 
     @property
     def summary(self) -> Dict:
         return {
             'from_batch': self.from_batch,
             'to_batch': self.to_batch,
-            'added': len(self.added_triples),
-            'removed': len(self.removed_triples),
-            'modified_subjects': len(self.modified_subjects),
+            'added': self.added_count,
+            'removed': self.removed_count,
+            'modified_subjects': self.modified_count,
             'unchanged': self.unchanged_count
         }
 
@@ -125,6 +168,25 @@ class BatchManager:
     - Compare batches to see changes
     - Query point-in-time state
     - Archive and delete old batches
+    - Delta storage: checkpoints in full, other batches as added/removed graphs
+    - Skip unchanged loads: input with the checksum of the active batch is
+      recorded as a confirmed batch instead of being loaded again
+    - Concurrent loads: several data products, each with its own active batch
+
+    With storage_mode='delta', every checkpoint_interval-th batch is kept in
+    full and the batches in between as the triples added and removed since
+    the previous batch, so the store grows with the churn instead of the
+    number of batches. The active batch is also kept in full while it is
+    active. Blank nodes get new labels on every load, so triples with blank
+    nodes are always part of a delta.
+
+    A batch loads into its graph while it is STAGING; queries keep using the
+    active batch of its product until the load is complete. The batch is
+    then indexed and encoded under a lock per product, and becomes active in
+    one catalog transaction that also supersedes the previous batch. Loads
+    of different products run in parallel (threads sharing the manager and
+    its store); the catalog transaction also serializes batch numbers and
+    activations with other processes using the same metadata directory.
     """
 
     # Namespace prefixes
@@ -134,17 +196,40 @@ class BatchManager:
     DCT_NS = "http://purl.org/dc/terms/"
     RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
 
-    def __init__(self, store: Optional[Store] = None, metadata_dir: str = "batch_metadata"):
+    def __init__(
+        self,
+        store: Optional[Store] = None,
+        metadata_dir: str = "batch_metadata",
+        storage_mode: str = "full",
+        checkpoint_interval: int = 10
+    ):
         """
         Initialize the batch manager.
 
         Args:
             store: PyOxigraph Store instance (creates new if None)
-            metadata_dir: Directory to store batch metadata JSON files
+            metadata_dir: Directory of the batch catalog (batches.db) and validity indexes
+            storage_mode: 'full' keeps every batch in full, 'delta' keeps
+                          checkpoints in full and other batches as deltas
+            checkpoint_interval: In delta mode, every n-th batch is a checkpoint
         """
-        self.store = store or Store()
+        if storage_mode not in ('full', 'delta'):
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
+        if checkpoint_interval < 1:
+            raise ValueError(f"checkpoint_interval must be positive, got {checkpoint_interval}")
+        self.storage_mode = storage_mode
+        self.checkpoint_interval = checkpoint_interval
+        self.store = store if store is not None else Store()
+        self.store_stats = StoreStats(self.store, empty=store is None)
         self.metadata_dir = metadata_dir
-        self.batches: Dict[str, BatchMetadata] = {}
+        self.batches: Optional[BatchCatalog] = None
+        self.validity_index = ValidityIndex(os.path.join(metadata_dir, "validity_index"))
+        self._validity_indexes: Dict[str, ValidityIndex] = {DEFAULT_PRODUCT: self.validity_index}
+        # Per product: the batch number whose state the store holds (see as_of)
+        self._as_of_states: Dict[str, Tuple[int, Store]] = {}
+        self._as_of_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._product_locks: Dict[str, threading.Lock] = {}
 
         # Ensure metadata directory exists
         os.makedirs(metadata_dir, exist_ok=True)
@@ -153,25 +238,29 @@ class BatchManager:
         self._load_metadata()
 
     def _load_metadata(self):
-        """Load batch metadata from disk."""
-        metadata_file = os.path.join(self.metadata_dir, "batches.json")
-        if os.path.exists(metadata_file):
-            with open(metadata_file, 'r') as f:
-                data = json.load(f)
-                for batch_data in data.get('batches', []):
-                    batch = BatchMetadata.from_dict(batch_data)
-                    self.batches[batch.batch_id] = batch
+        """Open the batch catalog (importing a batches.json of earlier versions)."""
+        self.batches = BatchCatalog(
+            os.path.join(self.metadata_dir, "batches.db"),
+            BatchMetadata.from_dict,
+            json_path=os.path.join(self.metadata_dir, "batches.json")
+        )
 
     def _save_metadata(self):
-        """Save batch metadata to disk."""
-        metadata_file = os.path.join(self.metadata_dir, "batches.json")
-        data = {
-            'version': '1.0',
-            'updated_at': datetime.now(timezone.utc).isoformat(),
-            'batches': [b.to_dict() for b in self.batches.values()]
-        }
-        with open(metadata_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Write the changed batches to the catalog in one transaction."""
+        self.batches.commit()
+
+    def _product_lock(self, product: str) -> threading.Lock:
+        """The lock serializing the activations of a product"""
+        with self._lock:
+            return self._product_locks.setdefault(product, threading.Lock())
+
+    def _validity_index(self, product: str) -> ValidityIndex:
+        """The validity index of a product's batches"""
+        with self._lock:
+            if product not in self._validity_indexes:
+                self._validity_indexes[product] = ValidityIndex(
+                    os.path.join(self.metadata_dir, f"validity_index_{product}"))
+            return self._validity_indexes[product]
 
     def _generate_batch_id(self, batch_number: int) -> str:
         """Generate a unique batch ID."""
@@ -180,16 +269,15 @@ class BatchManager:
 
     def _get_next_batch_number(self) -> int:
         """Get the next batch number."""
-        if not self.batches:
-            return 1
-        return max(b.batch_number for b in self.batches.values()) + 1
+        return self.batches.next_batch_number()
 
     def create_batch(
         self,
         source_mapping: str,
         source_files: List[str],
         description: str = "",
-        tags: List[str] = None
+        tags: List[str] = None,
+        product: str = DEFAULT_PRODUCT
     ) -> BatchMetadata:
         """
         Create a new batch (without loading data yet).
@@ -199,28 +287,34 @@ class BatchManager:
             source_files: List of source data files
             description: Human-readable description
             tags: Optional tags for categorization
+            product: Data product the batch belongs to (letters, digits, '_' and '-')
 
         Returns:
             BatchMetadata for the new batch
         """
-        batch_number = self._get_next_batch_number()
-        batch_id = self._generate_batch_id(batch_number)
-        graph_uri = f"{self.BATCH_NS}{batch_id}"
-
-        batch = BatchMetadata(
-            batch_id=batch_id,
-            batch_number=batch_number,
-            created_at=datetime.now(timezone.utc),
-            graph_uri=graph_uri,
-            source_mapping=source_mapping,
-            source_files=source_files,
-            status=BatchStatus.PENDING,
-            description=description,
-            tags=tags or []
-        )
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', product):
+            raise ValueError(f"Invalid product name: {product!r}")
+
+        # The number is allocated and registered under the catalog write lock
+        with self.batches.transaction():
+            batch_number = self._get_next_batch_number()
+            batch_id = self._generate_batch_id(batch_number)
+            graph_uri = f"{self.BATCH_NS}{batch_id}"
+
+            batch = BatchMetadata(
+                batch_id=batch_id,
+                batch_number=batch_number,
+                created_at=datetime.now(timezone.utc),
+                graph_uri=graph_uri,
+                source_mapping=source_mapping,
+                source_files=source_files,
+                status=BatchStatus.PENDING,
+                description=description,
+                tags=tags or [],
+                product=product
+            )
 
-        self.batches[batch_id] = batch
-        self._save_metadata()
+            self.batches[batch_id] = batch
 
         print(f"[BatchManager] Created batch: {batch_id}")
         print(f"  Graph URI: {graph_uri}")
@@ -232,7 +326,8 @@ class BatchManager:
         self,
         batch_id: str,
         rdf_file: str,
-        rdf_format: RdfFormat = RdfFormat.TRIG
+        rdf_format: RdfFormat = RdfFormat.TRIG,
+        skip_unchanged: bool = True
     ) -> BatchMetadata:
         """
         Load RDF data from a file into a batch's named graph.
@@ -241,43 +336,36 @@ class BatchManager:
             batch_id: ID of the batch to load into
             rdf_file: Path to the RDF file
             rdf_format: Format of the RDF file
+            skip_unchanged: If the file has the checksum of the active batch,
+                            record the batch as confirmed instead of loading it
 
         Returns:
             Updated BatchMetadata
         """
-        if batch_id not in self.batches:
-            raise ValueError(f"Batch not found: {batch_id}")
-
-        batch = self.batches[batch_id]
+        batch = self._pending_batch(batch_id)
         graph = NamedNode(batch.graph_uri)
 
         print(f"[BatchManager] Loading batch {batch_id} from {rdf_file}")
 
-        # Read file content
-        with open(rdf_file, 'rb') as f:
-            content = f.read()
-
-        # Calculate checksum
-        batch.checksum = hashlib.sha256(content).hexdigest()
-
-        # Load into store
-        initial_count = len(list(self.store))
-        self.store.load(BytesIO(content), rdf_format, base_iri=batch.graph_uri)
-
-        # Count quads added
-        batch.quad_count = len(list(self.store)) - initial_count
-        batch.loaded_at = datetime.now(timezone.utc)
-        batch.status = BatchStatus.ACTIVE
-
-        # Add batch metadata to the store
-        self._add_batch_metadata_triples(batch)
-
-        # Supersede previous active batch
-        self._supersede_previous_batch(batch)
-
-        self._save_metadata()
-
-        print(f"  Loaded {batch.quad_count} quads")
+        # Checksum in chunks; the store then parses the file as a stream
+        checksum = file_digest(rdf_file).hexdigest()
+        if skip_unchanged and self._confirm_unchanged(batch, checksum):
+            return batch
+        batch.checksum = checksum
+
+        with self._staging(batch):
+            # Load into store (default graph triples go into the batch graph)
+            report = bulk_load_file(self.store, rdf_file, rdf_format,
+                                    to_graph=graph, base_iri=batch.graph_uri)
+            if rdf_format.supports_datasets:
+                # Named graphs of the file are loaded into graphs of their own
+                self.store_stats.invalidate()
+
+            # Count the batch graph natively (duplicate input quads are not counted)
+            batch.quad_count = report.quads = self.store_stats.recount_graph(batch.graph_uri)
+            self._activate(batch)
+
+        print(f"  Loaded {report}")
         print(f"  Status: {batch.status.value}")
 
         return batch
@@ -299,40 +387,175 @@ class BatchManager:
         Returns:
             Updated BatchMetadata
         """
-        if batch_id not in self.batches:
-            raise ValueError(f"Batch not found: {batch_id}")
-
-        batch = self.batches[batch_id]
+        batch = self._pending_batch(batch_id)
         target_graph = NamedNode(batch.graph_uri)
 
         print(f"[BatchManager] Loading batch {batch_id} from store")
 
-        quad_count = 0
-        for quad in source_store:
-            # Rewrite quad to use batch graph
-            new_quad = Quad(
-                quad.subject,
-                quad.predicate,
-                quad.object,
-                target_graph
-            )
-            self.store.add(new_quad)
-            quad_count += 1
+        with self._staging(batch):
+            # Rewrite quads to use batch graph
+            report = bulk_add(self.store, source_store, to_graph=target_graph)
+            self.store_stats.add(report.quads, graph=batch.graph_uri)
+
+            batch.quad_count = report.quads
+            self._activate(batch)
+
+        print(f"  Loaded {report}")
+
+        return batch
+
+    def load_batch_from_engine(self, batch_id: str, engine: Any,
+                               skip_unchanged: bool = True) -> BatchMetadata:
+        """
+        Run an ETL engine that loads straight into this batch.
+
+        The engine maps into the batch's named graph of this manager's store,
+        so its output is not serialized and parsed again. Build it with
+        store=manager.store, store_stats=manager.store_stats and
+        graph=batch.graph_uri; an output file it writes in the background
+        is not waited for (see engine.wait_for_output()).
+
+        Args:
+            batch_id: ID of the batch to load into
+            engine: RDFStarETLEngine that has not run yet
+            skip_unchanged: If the mapping and source files have the
+                            fingerprint of the active batch, record the batch
+                            as confirmed instead of running the engine
+
+        Returns:
+            Updated BatchMetadata
+        """
+        batch = self._pending_batch(batch_id)
+        if engine.store is not self.store or engine.graph != batch.graph_uri:
+            raise ValueError(f"Engine does not load into the graph of batch {batch_id}")
+
+        print(f"[BatchManager] Loading batch {batch_id} from ETL engine")
+
+        fingerprint = engine.source_fingerprint()
+        if skip_unchanged and self._confirm_unchanged(batch, fingerprint):
+            return batch
+        batch.checksum = fingerprint
+
+        with self._staging(batch):
+            engine.run()
 
-        batch.quad_count = quad_count
-        batch.loaded_at = datetime.now(timezone.utc)
-        batch.status = BatchStatus.ACTIVE
+            batch.source_files = sorted(engine.processed_files)
+            batch.quad_count = engine.graph_quads
+            self._activate(batch)
 
-        # Add batch metadata
-        self._add_batch_metadata_triples(batch)
+        print(f"  Loaded {engine.ingest_report}")
 
-        # Supersede previous
-        self._supersede_previous_batch(batch)
+        return batch
 
+    def _pending_batch(self, batch_id: str) -> BatchMetadata:
+        """A batch that can be loaded"""
+        batch = self.batches.get(batch_id)
+        if not batch:
+            raise ValueError(f"Batch not found: {batch_id}")
+        if batch.status != BatchStatus.PENDING:
+            raise ValueError(f"Batch {batch_id} is {batch.status.value}, not pending")
+        return batch
+
+    @contextmanager
+    def _staging(self, batch: BatchMetadata):
+        """
+        Load a batch as STAGING; on an error drop what it wrote and mark it FAILED.
+
+        Queries keep using the active batch of the product until the batch
+        is activated at the end of the load.
+        """
+        batch.status = BatchStatus.STAGING
         self._save_metadata()
+        try:
+            yield
+        except BaseException:
+            for graph_uri in (batch.graph_uri, batch.added_graph_uri, batch.removed_graph_uri):
+                self._drop_graph(graph_uri)
+            batch.status = BatchStatus.FAILED
+            batch.storage = BatchStorage.FULL
+            batch.parent_batch = None
+            self._save_metadata()
+            print(f"  Load failed; batch {batch.batch_id} marked {batch.status.value}")
+            raise
+
+    def _activate(self, batch: BatchMetadata):
+        """
+        Make a staged batch the active batch of its product.
+
+        Indexing and delta encoding run under the product's lock; the status
+        switch of the batch and its predecessor is one catalog transaction.
+        """
+        with self._product_lock(batch.product):
+            previous = self.get_active_batch(batch.product)
+            if previous is not None and previous.batch_number > batch.batch_number:
+                # A newer batch of the product was activated during the load
+                self._add_batch_metadata_triples(batch)
+                with self.batches.transaction():
+                    batch.loaded_at = batch.superseded_at = datetime.now(timezone.utc)
+                    batch.status = BatchStatus.SUPERSEDED
+                    batch.superseded_by = previous.batch_id
+                print(f"  Newer batch {previous.batch_id} is active; superseded on load")
+                return
+
+            # Record the valid-time intervals of the batch's triples
+            self._index_batch(batch)
+
+            # Add batch metadata to the store
+            self._add_batch_metadata_triples(batch)
+
+            # Store as a delta of the previous batch in delta mode
+            self._encode_batch(batch, previous)
+
+            with self.batches.transaction():
+                current = self.get_active_batch(batch.product)
+                if batch.storage == BatchStorage.DELTA and current is not previous:
+                    # Activated elsewhere meanwhile; the complete graph is kept instead
+                    self._drop_graph(batch.added_graph_uri)
+                    self._drop_graph(batch.removed_graph_uri)
+                    batch.storage = BatchStorage.FULL
+                    batch.parent_batch = None
+
+                now = datetime.now(timezone.utc)
+                batch.loaded_at = now
+                batch.status = BatchStatus.ACTIVE
+                if current is not None:
+                    current.status = BatchStatus.SUPERSEDED
+                    current.superseded_at = now
+                    current.superseded_by = batch.batch_id
+                    print(f"  Superseded batch: {current.batch_id}")
+
+            # Only the complete graph of the active batch is kept for deltas
+            if current is not None and current.storage == BatchStorage.DELTA and current.materialized:
+                self._drop_graph(current.graph_uri)
+                current.materialized = False
+                self._save_metadata()
+
+    def _confirm_unchanged(self, batch: BatchMetadata, checksum: Optional[str]) -> bool:
+        """
+        Record a batch as confirming the active batch if their checksums match.
 
-        print(f"  Loaded {quad_count} quads")
+        Nothing is loaded for a confirmed batch; its state, queries and
+        exports are those of the batch it confirms.
 
+        Returns:
+            True if the batch was confirmed (and its load can be skipped)
+        """
+        active = self.get_active_batch(batch.product)
+        if checksum is None or active is None or active.checksum != checksum:
+            return False
+
+        batch.checksum = checksum
+        batch.status = BatchStatus.CONFIRMED
+        batch.confirms = active.batch_id
+        self._save_metadata()
+
+        print(f"  Unchanged input (checksum {checksum[:12]}): confirms {active.batch_id}, nothing loaded")
+        return True
+
+    def _data_batch(self, batch: BatchMetadata) -> BatchMetadata:
+        """The batch holding the data of a batch (the confirmed one, for confirmations)"""
+        if batch.confirms is not None:
+            return self.batches[batch.confirms]
         return batch
 
     def _add_batch_metadata_triples(self, batch: BatchMetadata):
@@ -340,8 +563,10 @@ class BatchManager:
         graph = NamedNode(batch.graph_uri)
         batch_node = NamedNode(batch.graph_uri)
 
+        metadata = []
+
         # Type
-        self.store.add(Quad(
+        metadata.append(Quad(
             batch_node,
             NamedNode(f"{self.RDF_NS}type"),
             NamedNode(f"{self.PROV_NS}Entity"),
@@ -349,7 +574,7 @@ class BatchManager:
         ))
 
         # Creation time
-        self.store.add(Quad(
+        metadata.append(Quad(
             batch_node,
             NamedNode(f"{self.PROV_NS}generatedAtTime"),
             Literal(
@@ -361,7 +586,7 @@ class BatchManager:
 
         # Description
         if batch.description:
-            self.store.add(Quad(
+            metadata.append(Quad(
                 batch_node,
                 NamedNode(f"{self.DCT_NS}description"),
                 Literal(batch.description),
@@ -369,7 +594,7 @@ class BatchManager:
             ))
 
         # Source mapping
-        self.store.add(Quad(
+        metadata.append(Quad(
             batch_node,
             NamedNode(f"{self.PROV_NS}wasGeneratedBy"),
             Literal(batch.source_mapping),
@@ -377,57 +602,201 @@ class BatchManager:
         ))
 
         # Batch number
-        self.store.add(Quad(
+        metadata.append(Quad(
             batch_node,
             NamedNode(f"{self.BATCH_NS}batchNumber"),
             Literal(str(batch.batch_number), datatype=NamedNode(f"{self.XSD_NS}integer")),
             graph
         ))
 
-    def _supersede_previous_batch(self, new_batch: BatchMetadata):
-        """Mark previous active batch as superseded."""
-        for batch_id, batch in self.batches.items():
-            if batch_id != new_batch.batch_id and batch.status == BatchStatus.ACTIVE:
-                batch.status = BatchStatus.SUPERSEDED
-                batch.superseded_at = datetime.now(timezone.utc)
-                batch.superseded_by = new_batch.batch_id
-                print(f"  Superseded batch: {batch_id}")
+        # Only count the quads the store does not hold yet
+        metadata = [quad for quad in metadata if quad not in self.store]
+        self.store.extend(metadata)
+        self.store_stats.add(len(metadata), graph=batch.graph_uri, annotations=0)
+
+    def _index_batch(self, batch: BatchMetadata):
+        """Update the validity index of the batch's product with a freshly loaded batch"""
+        index = self._validity_index(batch.product)
+        if batch.batch_number <= index.last_batch:
+            print(f"  Validity index already covers batch {batch.batch_number}; not indexed")
+            return
+        changed = index.update(self.store, NamedNode(batch.graph_uri), batch.batch_number)
+        self._forget_as_of_states(batch.product, from_batch=batch.batch_number)
+        print(f"  Validity index: {changed} triples changed")
+
+    def rebuild_validity_index(self, product: Optional[str] = None):
+        """
+        Rebuild the validity index from the batches in the store, oldest first.
+
+        For stores loaded before the index existed; permanently deleted
+        batches are no longer part of the history afterwards.
+
+        Args:
+            product: Product whose index to rebuild (all products if None)
+        """
+        products = [product] if product else self.batches.products()
+        for name in products:
+            self._validity_index(name).clear()
+            self._forget_as_of_states(name)
+        for batch in self.batches.loaded():
+            if batch.product not in products or batch.status == BatchStatus.FAILED:
+                continue
+            state = Store()
+            self._write_state(batch, state)
+            # Leave out the batch metadata triples, as on load
+            for quad in list(state.quads_for_pattern(NamedNode(batch.graph_uri), None, None, None)):
+                state.remove(quad)
+            self._validity_index(batch.product).update(state, NamedNode(batch.graph_uri), batch.batch_number)
+
+    def _encode_batch(self, batch: BatchMetadata, previous: Optional[BatchMetadata]):
+        """
+        Keep a freshly loaded batch in full or as a delta of the active batch.
+
+        The batch graph stays complete while the batch is active; the graph
+        of a previous delta batch is dropped once it is superseded.
+        """
+        if (self.storage_mode == 'delta' and previous is not None
+                and self._deltas_since_checkpoint(previous) + 1 < self.checkpoint_interval):
+            self._write_delta(previous, batch)
+            batch.storage = BatchStorage.DELTA
+            batch.parent_batch = previous.batch_id
+            print(f"  Stored as delta of {previous.batch_id}")
+        else:
+            batch.storage = BatchStorage.FULL
+            batch.parent_batch = None
+
+    def _deltas_since_checkpoint(self, batch: BatchMetadata) -> int:
+        """Number of delta batches between a batch (included) and its checkpoint"""
+        count = 0
+        while batch.storage == BatchStorage.DELTA:
+            count += 1
+            batch = self.batches[batch.parent_batch]
+        return count
+
+    def _write_delta(self, parent: BatchMetadata, batch: BatchMetadata):
+        """Write the added/removed graphs of a batch against its (complete) parent graph"""
+        for target, source, other in (
+            (batch.added_graph_uri, batch.graph_uri, parent.graph_uri),
+            (batch.removed_graph_uri, parent.graph_uri, batch.graph_uri),
+        ):
+            self.store.update(f"""
+                INSERT {{ GRAPH <{target}> {{ ?s ?p ?o }} }}
+                WHERE {{
+                    GRAPH <{source}> {{ ?s ?p ?o }}
+                    FILTER NOT EXISTS {{ GRAPH <{other}> {{ ?s ?p ?o }} }}
+                }}
+            """)
+            self.store_stats.recount_graph(target)
+
+    def _drop_graph(self, graph_uri: str):
+        """Remove a graph and its quads from the store"""
+        quads = self.store_stats.recount_graph(graph_uri)
+        self.store.remove_graph(NamedNode(graph_uri))
+        self.store_stats.remove_graph(graph_uri, quads)
+
+    def _graph_triples(self, graph_uri: str) -> Set[Tuple]:
+        """The (subject, predicate, object) terms of a graph"""
+        return {
+            (quad.subject, quad.predicate, quad.object)
+            for quad in self.store.quads_for_pattern(None, None, None, NamedNode(graph_uri))
+        }
+
+    def _replace_graph(self, graph_uri: str, triples: Set[Tuple]):
+        """Replace the content of a graph"""
+        self._drop_graph(graph_uri)
+        graph = NamedNode(graph_uri)
+        report = bulk_add(self.store, (Quad(s, p, o, graph) for s, p, o in triples))
+        self.store_stats.add(report.quads, graph=graph_uri)
+
+    def _write_state(self, batch: BatchMetadata, target: Store):
+        """
+        Write the complete state of a batch into the batch graph of a store.
+
+        A delta batch is rebuilt from its nearest complete ancestor by
+        applying the deltas on the way in order.
+        """
+        chain = []
+        base = batch
+        while not base.materialized:
+            chain.append(base)
+            base = self.batches[base.parent_batch]
+
+        graph = NamedNode(batch.graph_uri)
+        if base is batch and target is self.store:
+            return
+        copy_graph(self.store, target, NamedNode(base.graph_uri), to_graph=graph)
+
+        for delta in reversed(chain):
+            removed = NamedNode(delta.removed_graph_uri)
+            for quad in list(self.store.quads_for_pattern(None, None, None, removed)):
+                target.remove(Quad(quad.subject, quad.predicate, quad.object, graph))
+            copy_graph(self.store, target, NamedNode(delta.added_graph_uri), to_graph=graph)
+
+    def _batch_store(self, batch: BatchMetadata) -> Store:
+        """A store whose batch graph holds the complete state of a batch"""
+        if batch.materialized:
+            return self.store
+        return self.get_state_at_batch(batch.batch_id).store
+
+    def _detach_dependents(self, batch: BatchMetadata, skip: Set[str] = frozenset()):
+        """
+        Rebase the delta batches of a batch that is about to be deleted.
+
+        Deltas of a delta batch are combined with its own deltas; deltas of a
+        full batch are materialized and become checkpoints. Batches in skip
+        are deleted as well and left alone.
+        """
+        for child in self.batches.children(batch.batch_id):
+            if child.storage != BatchStorage.DELTA:
+                continue
+            if child.batch_id in skip:
+                continue
+
+            if batch.storage == BatchStorage.DELTA:
+                added = self._graph_triples(batch.added_graph_uri)
+                removed = self._graph_triples(batch.removed_graph_uri)
+                child_added = self._graph_triples(child.added_graph_uri)
+                child_removed = self._graph_triples(child.removed_graph_uri)
+                self._replace_graph(child.added_graph_uri, (added - child_removed) | child_added)
+                self._replace_graph(child.removed_graph_uri, (removed - child_added) | (child_removed - added))
+                child.parent_batch = batch.parent_batch
+            else:
+                if not child.materialized:
+                    self._write_state(child, self.store)
+                    self.store_stats.recount_graph(child.graph_uri)
+                    child.materialized = True
+                self._drop_graph(child.added_graph_uri)
+                self._drop_graph(child.removed_graph_uri)
+                child.storage = BatchStorage.FULL
+                child.parent_batch = None
+            print(f"  Rebased batch: {child.batch_id}")
 
     def get_batch(self, batch_id: str) -> Optional[BatchMetadata]:
         """Get metadata for a specific batch."""
         return self.batches.get(batch_id)
 
-    def get_active_batch(self) -> Optional[BatchMetadata]:
-        """Get the currently active batch."""
-        for batch in self.batches.values():
-            if batch.status == BatchStatus.ACTIVE:
-                return batch
-        return None
+    def get_active_batch(self, product: str = DEFAULT_PRODUCT) -> Optional[BatchMetadata]:
+        """Get the currently active batch of a product."""
+        return self.batches.active(product)
 
     def list_batches(
         self,
         status: Optional[BatchStatus] = None,
-        limit: int = 100
+        limit: int = 100,
+        product: Optional[str] = None
     ) -> List[BatchMetadata]:
         """
-        List batches, optionally filtered by status.
+        List batches, optionally filtered by status and product.
 
         Args:
             status: Optional status filter
             limit: Maximum number to return
+            product: Optional product filter
 
         Returns:
             List of BatchMetadata, newest first
         """
-        batches = list(self.batches.values())
-
-        if status:
-            batches = [b for b in batches if b.status == status]
-
-        # Sort by batch number descending
-        batches.sort(key=lambda b: b.batch_number, reverse=True)
-
-        return batches[:limit]
+        return self.batches.newest(limit, status=status.value if status else None, product=product)
 
     def compare_batches(
         self,
@@ -441,7 +810,7 @@ class BatchManager:
         Args:
             from_batch_id: Earlier batch ID
             to_batch_id: Later batch ID
-            sample_limit: Max number of changed triples to include
+            sample_limit: Max number of changed triples and subjects to include
 
         Returns:
             BatchDiff with the changes
@@ -451,81 +820,150 @@ class BatchManager:
 
         if not from_batch or not to_batch:
             raise ValueError("Both batches must exist")
+        from_batch = self._data_batch(from_batch)
+        to_batch = self._data_batch(to_batch)
 
         print(f"[BatchManager] Comparing {from_batch_id} -> {to_batch_id}")
 
-        # Get triples from each batch
-        from_graph = NamedNode(from_batch.graph_uri)
-        to_graph = NamedNode(to_batch.graph_uri)
-
-        from_triples = set()
-        from_subjects = set()
-        for quad in self.store.quads_for_pattern(None, None, None, from_graph):
-            triple_str = f"{quad.subject} {quad.predicate} {quad.object}"
-            from_triples.add(triple_str)
-            from_subjects.add(str(quad.subject))
-
-        to_triples = set()
-        to_subjects = set()
-        for quad in self.store.quads_for_pattern(None, None, None, to_graph):
-            triple_str = f"{quad.subject} {quad.predicate} {quad.object}"
-            to_triples.add(triple_str)
-            to_subjects.add(str(quad.subject))
-
-        # Calculate diff
-        added = to_triples - from_triples
-        removed = from_triples - to_triples
-        unchanged = from_triples & to_triples
-
-        # Find modified subjects (present in both but with different triples)
-        modified_subjects = []
-        common_subjects = from_subjects & to_subjects
-        for subj in common_subjects:
-            from_subj_triples = {t for t in from_triples if t.startswith(subj)}
-            to_subj_triples = {t for t in to_triples if t.startswith(subj)}
-            if from_subj_triples != to_subj_triples:
-                modified_subjects.append(subj)
+        # Delta batches are rebuilt next to each other
+        store = self.store
+        if not (from_batch.materialized and to_batch.materialized):
+            store = Store()
+            self._write_state(from_batch, store)
+            self._write_state(to_batch, store)
+
+        # Hash-based diff in bounded memory (see batch_diff.py)
+        result = diff_graphs(
+            store,
+            NamedNode(from_batch.graph_uri),
+            NamedNode(to_batch.graph_uri),
+            sample_limit=sample_limit
+        )
 
         diff = BatchDiff(
             from_batch=from_batch_id,
             to_batch=to_batch_id,
             computed_at=datetime.now(timezone.utc),
-            added_triples=list(added)[:sample_limit],
-            removed_triples=list(removed)[:sample_limit],
-            modified_subjects=modified_subjects[:sample_limit],
-            unchanged_count=len(unchanged)
+            added_triples=result.added_triples,
+            removed_triples=result.removed_triples,
+            modified_subjects=result.modified_subjects,
+            unchanged_count=result.unchanged_count,
+            added_count=result.added_count,
+            removed_count=result.removed_count,
+            modified_count=result.modified_count
         )
 
-        print(f"  Added: {len(added)}")
-        print(f"  Removed: {len(removed)}")
-        print(f"  Modified subjects: {len(modified_subjects)}")
-        print(f"  Unchanged: {len(unchanged)}")
+        print(f"  Added: {result.added_count}")
+        print(f"  Removed: {result.removed_count}")
+        print(f"  Modified subjects: {result.modified_count}")
+        print(f"  Unchanged: {result.unchanged_count}")
+        print(f"  Computed in {result.seconds:.2f}s ({result.buckets} buckets)")
 
         return diff
 
-    def get_state_at_batch(self, batch_id: str) -> Store:
+    def batch_at(self, timestamp: datetime, product: str = DEFAULT_PRODUCT) -> Optional[BatchMetadata]:
+        """The batch of a product that was active at a point in time"""
+        return self.batches.at(timestamp, product)
+
+    def facts_as_of(self, subject_uri: str, timestamp: datetime,
+                    predicate_uri: Optional[str] = None,
+                    product: str = DEFAULT_PRODUCT) -> List[Dict]:
         """
-        Get a store containing the state at a specific batch.
+        What was known about a subject at a point in time.
 
-        This includes all data from the batch's named graph.
+        Answered from the validity index, so the cost does not depend on
+        the number of retained batches.
+
+        Args:
+            subject_uri: URI of the subject
+            timestamp: Point in time
+            predicate_uri: Optional predicate to restrict to
+            product: Data product to look in
+
+        Returns:
+            List of {'predicate', 'object'} records in N-Triples syntax
+        """
+        batch = self.batch_at(timestamp, product)
+        if not batch:
+            return []
+        state = self._validity_index(product).state(
+            batch.batch_number,
+            subject=f"<{subject_uri}>",
+            predicate=f"<{predicate_uri}>" if predicate_uri else None
+        )
+        return [
+            {'predicate': row['p'], 'object': row['o']}
+            for row in state.sort('p', 'o').iter_rows(named=True)
+        ]
+
+    def as_of(self, timestamp: datetime, sparql_query: str, product: str = DEFAULT_PRODUCT) -> Any:
+        """
+        Execute a SPARQL query against the data as it was at a point in time.
+
+        The state comes from the validity index and is queried in the
+        default graph. One store per product holds the state of the last
+        queried point in time; moving it to another time only applies the
+        triples that changed in between (see ValidityIndex.move_state).
+
+        Args:
+            timestamp: Point in time
+            sparql_query: SPARQL query
+            product: Data product to query
+
+        Returns:
+            Query results
+        """
+        batch = self.batch_at(timestamp, product)
+        if not batch:
+            raise ValueError(f"No batch was active at {timestamp.isoformat()}")
+
+        index = self._validity_index(product)
+        with self._as_of_lock:
+            # Taken out while it moves, so a failed move leaves no half-moved state
+            position, state = self._as_of_states.pop(product, (0, None))
+            if state is None:
+                state = Store()
+            if position != batch.batch_number:
+                index.move_state(state, position, batch.batch_number)
+            self._as_of_states[product] = (batch.batch_number, state)
+            return state.query(sparql_query)
+
+    def _forget_as_of_states(self, product: Optional[str] = None, from_batch: int = 0):
+        """Drop the as-of states at or after a batch (of one product, or of all)"""
+        with self._as_of_lock:
+            for name, (position, _) in list(self._as_of_states.items()):
+                if (product is None or name == product) and position >= from_batch:
+                    del self._as_of_states[name]
+
+    def get_state_at_batch(self, batch_id: str) -> GraphView:
+        """
+        Get a view of the state at a specific batch.
+
+        The view reads the batch's named graph in the store without copying
+        it; a delta batch is rebuilt from its checkpoint into a temporary
+        store on the first read.
 
         Args:
             batch_id: The batch ID to get state for
 
         Returns:
-            New Store with just that batch's data
+            GraphView of the batch graph
         """
         batch = self.batches.get(batch_id)
         if not batch:
             raise ValueError(f"Batch not found: {batch_id}")
+        batch = self._data_batch(batch)
 
         graph = NamedNode(batch.graph_uri)
-        result_store = Store()
+        if batch.materialized:
+            return GraphView(self.store, graph)
 
-        for quad in self.store.quads_for_pattern(None, None, None, graph):
-            result_store.add(quad)
+        def build() -> Store:
+            state = Store()
+            self._write_state(batch, state)
+            return state
 
-        return result_store
+        return GraphView(None, graph, build=build)
 
     def query_at_batch(self, batch_id: str, sparql_query: str) -> Any:
         """
@@ -543,11 +981,11 @@ class BatchManager:
         batch = self.batches.get(batch_id)
         if not batch:
             raise ValueError(f"Batch not found: {batch_id}")
+        batch = self._data_batch(batch)
 
         # Inject FROM clause if not present
         if 'FROM' not in sparql_query.upper():
             # Find WHERE and insert FROM before it
-            import re
             sparql_query = re.sub(
                 r'(WHERE\s*\{)',
                 f'FROM <{batch.graph_uri}> \\1',
@@ -555,7 +993,7 @@ class BatchManager:
                 flags=re.IGNORECASE
             )
 
-        return self.store.query(sparql_query)
+        return self._batch_store(batch).query(sparql_query)
 
     def delete_batch(self, batch_id: str, permanent: bool = False):
         """
@@ -566,77 +1004,129 @@ class BatchManager:
             permanent: If True, removes from store and metadata.
                       If False, just marks as DELETED.
         """
-        batch = self.batches.get(batch_id)
-        if not batch:
-            raise ValueError(f"Batch not found: {batch_id}")
+        with self.batches.transaction():
+            batch = self.batches.get(batch_id)
+            if not batch:
+                raise ValueError(f"Batch not found: {batch_id}")
 
-        if batch.status == BatchStatus.ACTIVE:
-            raise ValueError("Cannot delete active batch. Load a new batch first.")
+            if batch.status in (BatchStatus.ACTIVE, BatchStatus.STAGING):
+                raise ValueError(f"Cannot delete {batch.status.value} batch. Load a new batch first.")
 
-        print(f"[BatchManager] Deleting batch: {batch_id}")
+            print(f"[BatchManager] Deleting batch: {batch_id}")
 
-        if permanent:
-            # Remove from store
-            graph = NamedNode(batch.graph_uri)
-            quads_to_remove = list(self.store.quads_for_pattern(None, None, None, graph))
-            for quad in quads_to_remove:
-                self.store.remove(quad)
+            if permanent:
+                quads_removed = self._purge([batch])
+                print(f"  Permanently deleted {quads_removed} quads")
+            else:
+                batch.status = BatchStatus.DELETED
+                print(f"  Marked as deleted")
 
-            # Remove from metadata
-            del self.batches[batch_id]
-            print(f"  Permanently deleted {len(quads_to_remove)} quads")
-        else:
-            batch.status = BatchStatus.DELETED
-            print(f"  Marked as deleted")
+            self._save_metadata()
 
-        self._save_metadata()
+    def purge_batches(self, batch_ids: List[str]) -> int:
+        """
+        Permanently delete several batches at once (e.g. a retention job).
+
+        The graphs of all batches are dropped in one store transaction and
+        the batch metadata is written once.
+
+        Args:
+            batch_ids: Batches to delete (none of them may be active)
+
+        Returns:
+            Number of quads removed from the store
+        """
+        with self.batches.transaction():
+            batches = []
+            for batch_id in dict.fromkeys(batch_ids):
+                batch = self.batches.get(batch_id)
+                if not batch:
+                    raise ValueError(f"Batch not found: {batch_id}")
+                if batch.status in (BatchStatus.ACTIVE, BatchStatus.STAGING):
+                    raise ValueError(f"Cannot delete {batch.status.value} batch: {batch_id}")
+                batches.append(batch)
+
+            if not batches:
+                return 0
+
+            print(f"[BatchManager] Purging {len(batches)} batches")
+            quads_removed = self._purge(batches)
+            self._save_metadata()
+        print(f"  Permanently deleted {quads_removed} quads")
+
+        return quads_removed
+
+    def _purge(self, batches: List[BatchMetadata]) -> int:
+        """Drop the graphs of batches in one update and forget the batches"""
+        purged = {batch.batch_id for batch in batches}
+
+        # Confirmations of purged batches go with them
+        batches = batches + [
+            b for b in self.batches.with_status(BatchStatus.CONFIRMED.value)
+            if b.confirms in purged and b.batch_id not in purged
+        ]
+        purged.update(batch.batch_id for batch in batches)
+
+        # Rebase the remaining batches stored as deltas of purged ones; newest
+        # first, so deltas are combined before their base is materialized
+        for batch in sorted(batches, key=lambda b: b.batch_number, reverse=True):
+            self._detach_dependents(batch, skip=purged)
+
+        graphs = []
+        for batch in batches:
+            graphs.append(batch.graph_uri)
+            if batch.storage == BatchStorage.DELTA:
+                graphs.extend([batch.added_graph_uri, batch.removed_graph_uri])
+
+        counts = {graph_uri: self.store_stats.recount_graph(graph_uri) for graph_uri in graphs}
+        self.store.update(";\n".join(f"DROP SILENT GRAPH <{graph_uri}>" for graph_uri in graphs))
+        for graph_uri, quads in counts.items():
+            self.store_stats.remove_graph(graph_uri, quads)
+
+        for batch in batches:
+            del self.batches[batch.batch_id]
+        self._forget_as_of_states()
+
+        return sum(counts.values())
 
     def archive_batch(self, batch_id: str):
         """Archive a batch (keeps data but marks as archived)."""
-        batch = self.batches.get(batch_id)
-        if not batch:
-            raise ValueError(f"Batch not found: {batch_id}")
+        with self.batches.transaction():
+            batch = self.batches.get(batch_id)
+            if not batch:
+                raise ValueError(f"Batch not found: {batch_id}")
 
-        if batch.status == BatchStatus.ACTIVE:
-            raise ValueError("Cannot archive active batch")
+            if batch.status in (BatchStatus.ACTIVE, BatchStatus.STAGING):
+                raise ValueError(f"Cannot archive {batch.status.value} batch")
 
-        batch.status = BatchStatus.ARCHIVED
-        self._save_metadata()
+            batch.status = BatchStatus.ARCHIVED
+            self._save_metadata()
         print(f"[BatchManager] Archived batch: {batch_id}")
 
     def export_batch(
         self,
         batch_id: str,
-        output_file: str,
-        rdf_format: RdfFormat = RdfFormat.TRIG
+        output_file: Union[str, BinaryIO],
+        rdf_format: RdfFormat = RdfFormat.TRIG,
+        compression: Optional[str] = None
     ):
         """
-        Export a batch to a file.
+        Export a batch to a file or stream.
+
+        The batch graph is serialized straight from the store, so a
+        materialized batch is never copied. Quad formats keep the batch graph.
 
         Args:
             batch_id: Batch to export
-            output_file: Output file path
+            output_file: Output file path or binary stream
             rdf_format: Output format
+            compression: 'gzip' or 'zstd' (defaults to the .gz/.zst extension)
         """
-        batch = self.batches.get(batch_id)
-        if not batch:
-            raise ValueError(f"Batch not found: {batch_id}")
-
-        graph = NamedNode(batch.graph_uri)
+        state = self.get_state_at_batch(batch_id)
+        state.dump(output_file, rdf_format, compression=compression)
 
-        # Create temporary store with just this batch
-        temp_store = Store()
-        for quad in self.store.quads_for_pattern(None, None, None, graph):
-            temp_store.add(quad)
-
-        # Export
-        buffer = BytesIO()
-        temp_store.dump(buffer, rdf_format)
-
-        with open(output_file, 'wb') as f:
-            f.write(buffer.getvalue())
-
-        print(f"[BatchManager] Exported batch {batch_id} to {output_file}")
+        if isinstance(output_file, str):
+            print(f"[BatchManager] Exported batch {batch_id} to {output_file}")
 
     def get_provenance_for_subject(
         self,
@@ -660,6 +1150,7 @@ class BatchManager:
 
         if not batch:
             return []
+        batch = self._data_batch(batch)
 
         # Query for provenance using RDF-star reification
         query = f"""
@@ -682,7 +1173,7 @@ class BatchManager:
 
         results = []
         try:
-            for row in self.store.query(query):
+            for row in self._batch_store(batch).query(query):
                 results.append({
                     'predicate': str(row['predicate']),
                     'object': str(row['object']),
@@ -701,20 +1192,21 @@ class BatchManager:
         print("BATCH MANAGEMENT STATUS")
         print("=" * 70)
 
-        active = self.get_active_batch()
-        if active:
-            print(f"\nActive Batch: {active.batch_id}")
-            print(f"  Created: {active.created_at}")
-            print(f"  Quads: {active.quad_count}")
-        else:
-            print("\nNo active batch")
+        products = self.batches.products() or [DEFAULT_PRODUCT]
+        for product in products:
+            active = self.get_active_batch(product)
+            label = "" if products == [DEFAULT_PRODUCT] else f" ({product})"
+            if active:
+                print(f"\nActive Batch{label}: {active.batch_id}")
+                print(f"  Created: {active.created_at}")
+                print(f"  Quads: {active.quad_count}")
+            else:
+                print(f"\nNo active batch{label}")
 
         print(f"\nTotal Batches: {len(self.batches)}")
+        print(f"Store: {self.store_stats.total} quads in {len(self.store_stats.named_graphs)} named graphs")
 
-        by_status = {}
-        for batch in self.batches.values():
-            status = batch.status.value
-            by_status[status] = by_status.get(status, 0) + 1
+        by_status = self.batches.count_by_status()
 
         print("By Status:")
         for status, count in by_status.items():
@@ -722,7 +1214,7 @@ class BatchManager:
 
         print("\nRecent Batches:")
         for batch in self.list_batches(limit=5):
-            print(f"  [{batch.status.value:10}] {batch.batch_id} - {batch.quad_count} quads")
+            print(f"  [{batch.status.value:10}] {batch.batch_id} - {batch.quad_count} quads ({batch.storage.value})")
 
         print("=" * 70)
 
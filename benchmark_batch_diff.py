@@ -0,0 +1,114 @@
+"""
+Performance Benchmark: Batch Diff Engine
+========================================
+
+This script diffs two batch graphs with a given churn rate:
+1. The previous batch: count triples over 3 predicates (~count/3 subjects)
+2. The next batch: the same triples, with churn_rate of the values changed
+   and churn_rate/10 of the subjects dropped and as many added
+
+It reports the time and peak memory of batch_diff.diff_graphs, and checks
+the counts against the generated changes. With --legacy it also times the
+original set-based comparison (only practical for small sizes).
+
+Usage:
+    python benchmark_batch_diff.py [--sizes 1000000 10000000] [--churn 0.01] [--bucket-triples 2000000]
+"""
+
+import argparse
+import resource
+import time
+
+import polars as pl
+from pyoxigraph import Store, NamedNode, RdfFormat
+
+from batch_diff import diff_graphs, DEFAULT_BUCKET_TRIPLES
+from columnar_emitter import quad_frame, iri_term, literal_term, to_nquads
+from store_io import bulk_load_bytes
+
+EX = "http://example.org/"
+FROM = NamedNode(f"{EX}batch/previous")
+TO = NamedNode(f"{EX}batch/next")
+
+
+def batch_nquads(count: int, churn: float, graph: NamedNode, changed: bool) -> bytes:
+    """N-Quads of one batch graph, built with the columnar emitter"""
+    subjects = count // 3
+    first = int(subjects * churn / 10) if changed else 0
+    df = pl.select(pl.int_range(first, subjects + first).alias('i'))
+    subject = iri_term(pl.concat_str([pl.lit(f"{EX}item/"), pl.col('i').cast(pl.Utf8)]))
+
+    value = pl.col('i').cast(pl.Utf8)
+    if changed:
+        # Change the value of every 1/churn-th subject's first predicate
+        step = max(1, int(1 / churn))
+        value = pl.when(pl.col('i') % step == 0).then(value + '-changed').otherwise(value)
+
+    frames = [
+        quad_frame(df, subject, f"{EX}p{p}", literal_term(value if p == 0 else pl.col('i').cast(pl.Utf8)),
+                   graph.value)
+        for p in range(3)
+    ]
+    return to_nquads(pl.concat(frames))
+
+
+def build_store(count: int, churn: float) -> Store:
+    store = Store()
+    bulk_load_bytes(store, batch_nquads(count, churn, FROM, changed=False), RdfFormat.N_QUADS)
+    bulk_load_bytes(store, batch_nquads(count, churn, TO, changed=True), RdfFormat.N_QUADS)
+    return store
+
+
+def legacy_diff(store: Store) -> int:
+    """The original comparison: triple strings in Python sets"""
+    before = {f"{q.subject} {q.predicate} {q.object}" for q in store.quads_for_pattern(None, None, None, FROM)}
+    after = {f"{q.subject} {q.predicate} {q.object}" for q in store.quads_for_pattern(None, None, None, TO)}
+    return len(after - before) + len(before - after)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (Linux reports KiB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the batch diff engine')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000],
+                        help='Triples per batch graph')
+    parser.add_argument('--churn', type=float, default=0.01, help='Fraction of subjects changed')
+    parser.add_argument('--bucket-triples', type=int, default=DEFAULT_BUCKET_TRIPLES,
+                        help='Triples per graph held in memory at a time')
+    parser.add_argument('--legacy', action='store_true', help='Also time the set-based comparison')
+    args = parser.parse_args()
+
+    print(f"\n{'='*80}")
+    print(f"Batch Diff Benchmark (churn {args.churn:.2%})")
+    print(f"{'='*80}")
+
+    for count in args.sizes:
+        print(f"\n{count:,} triples per batch")
+        start = time.perf_counter()
+        store = build_store(count, args.churn)
+        print(f"  {'build store':<24} {time.perf_counter() - start:8.2f} s  "
+              f"peak RSS {peak_rss_mb():,.0f} MB")
+
+        diff = diff_graphs(store, FROM, TO, sample_limit=10, bucket_triples=args.bucket_triples)
+        print(f"  {'diff_graphs':<24} {diff.seconds:8.2f} s  {count / diff.seconds:12,.0f} triples/s  "
+              f"{diff.buckets} buckets  peak RSS {peak_rss_mb():,.0f} MB")
+        print(f"  added {diff.added_count:,}  removed {diff.removed_count:,}  "
+              f"modified subjects {diff.modified_count:,}  unchanged {diff.unchanged_count:,}")
+
+        if args.legacy:
+            start = time.perf_counter()
+            changes = legacy_diff(store)
+            seconds = time.perf_counter() - start
+            print(f"  {'set-based (no modified)':<24} {seconds:8.2f} s  "
+                  f"{'match' if changes == diff.added_count + diff.removed_count else 'MISMATCH'}")
+
+        del store
+
+    print(f"\n{'='*80}")
+
+
+if __name__ == "__main__":
+    main()
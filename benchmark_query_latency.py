@@ -0,0 +1,122 @@
+"""
+Load Test: Light Query Latency Next to Heavy Queries
+====================================================
+
+This script sends light SPARQL queries (one subject lookup) to the FastAPI
+SPARQL endpoint at a steady rate and reports their latency percentiles:
+1. Alone
+2. While --heavy clients keep running a heavy query (a cross join count)
+
+Queries run on the server's bounded query pool, so with fewer heavy clients
+than query workers the light p99 should stay flat. The endpoint is called
+in-process (httpx ASGI transport) on a synthetic store with the query cache
+and coalescing off, or with --url on a running server (start it with
+--cache-entries 0 --no-coalesce).
+
+Usage:
+    python benchmark_query_latency.py [--triples 3000] [--heavy 2] [--workers 4] [--seconds 5]
+    python benchmark_query_latency.py --url http://localhost:7878
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+from pyoxigraph import Store, Quad, NamedNode, Literal
+
+import fastapi_sparql_server as server
+from query_cache import QueryCache
+from query_executor import QueryExecutor
+from store_stats import StoreStats
+
+EX = "http://example.org/"
+LIGHT_QUERY = f"SELECT ?o WHERE {{ <{EX}item/1> <{EX}p> ?o }}"
+HEAVY_QUERY = f"SELECT (COUNT(*) AS ?c) WHERE {{ ?a <{EX}p> ?x . ?b <{EX}p> ?y }}"
+
+
+def build_store(triples: int) -> Store:
+    store = Store()
+    store.extend(Quad(NamedNode(f"{EX}item/{i}"), NamedNode(f"{EX}p"), Literal(str(i))) for i in range(triples))
+    return store
+
+
+def percentile(values: List[float], q: float) -> float:
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+
+async def light_client(client: httpx.AsyncClient, seconds: float, rate: float) -> List[float]:
+    """Light queries at a steady rate; latencies in ms"""
+    latencies = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        start = time.perf_counter()
+        response = await client.get("/sparql", params={"query": LIGHT_QUERY})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(max(0.0, 1 / rate - (time.perf_counter() - start)))
+    return latencies
+
+
+async def heavy_client(client: httpx.AsyncClient, stop: asyncio.Event) -> int:
+    """Heavy queries back to back until stopped"""
+    count = 0
+    while not stop.is_set():
+        await client.get("/sparql", params={"query": HEAVY_QUERY}, timeout=None)
+        count += 1
+    return count
+
+
+async def measure(client: httpx.AsyncClient, heavy: int, seconds: float, rate: float):
+    stop = asyncio.Event()
+    heavy_tasks = [asyncio.ensure_future(heavy_client(client, stop)) for _ in range(heavy)]
+    await asyncio.sleep(0.2 if heavy else 0)
+    latencies = await light_client(client, seconds, rate)
+    stop.set()
+    heavy_count = sum(await asyncio.gather(*heavy_tasks))
+    return latencies, heavy_count
+
+
+async def run(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60.0)
+    else:
+        server.store = build_store(args.triples)
+        server.store_stats = StoreStats(server.store)
+        server.executor = QueryExecutor(max_workers=args.workers, timeout=None)
+        # Every query runs: the benchmark measures execution, not the cache
+        server.cache = QueryCache(max_entries=0, coalesce=False)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app),
+                                   base_url="http://benchmark", timeout=60.0)
+
+    print(f"\n{'='*80}")
+    print(f"Light Query Latency ({args.rate:.0f} light queries/s for {args.seconds:.0f} s per run)")
+    print(f"{'='*80}")
+    print(f"  {'heavy clients':<16} {'light queries':>14} {'p50 ms':>10} {'p99 ms':>10} "
+          f"{'max ms':>10} {'heavy done':>12}")
+
+    async with client:
+        for heavy in sorted({0, args.heavy}):
+            latencies, heavy_count = await measure(client, heavy, args.seconds, args.rate)
+            print(f"  {heavy:<16} {len(latencies):>14} {percentile(latencies, 50):>10.2f} "
+                  f"{percentile(latencies, 99):>10.2f} {max(latencies):>10.2f} {heavy_count:>12}")
+
+    print(f"\n{'='*80}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test light query latency next to heavy queries')
+    parser.add_argument('--url', help='Running SPARQL server (default: in-process server)')
+    parser.add_argument('--triples', type=int, default=3000,
+                        help='Triples in the synthetic store (heavy query joins them pairwise)')
+    parser.add_argument('--workers', type=int, default=4, help='Query workers of the in-process server')
+    parser.add_argument('--heavy', type=int, default=2, help='Concurrent heavy query clients')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+    parser.add_argument('--rate', type=float, default=50.0, help='Light queries per second')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Performance Benchmark: Per-Quad vs Bulk Store Ingest
+====================================================
+
+This script compares three ways of putting quads into a pyoxigraph Store:
+1. Per-quad Store.add (the original engines and batch manager)
+2. store_io.bulk_add (batched Store.bulk_extend)
+3. store_io.bulk_load_bytes (serialized N-Quads through Store.bulk_load)
+
+Timings 1 and 2 include creating the Quad objects, as the engines do;
+timing 3 starts from N-Quads text built by the columnar emitter.
+
+Usage:
+    python benchmark_store_ingest.py [--sizes 1000000 10000000] [--batch-size 100000]
+"""
+
+import argparse
+import time
+from typing import Iterator
+
+import polars as pl
+from pyoxigraph import Store, Quad, NamedNode, Literal, RdfFormat
+
+from columnar_emitter import quad_frame, iri_term, literal_term, to_nquads
+from store_io import bulk_add, bulk_load_bytes
+
+EX = "http://example.org/"
+
+
+def generate_quads(count: int) -> Iterator[Quad]:
+    """Generate count quads over 3 predicates (~count/3 subjects)"""
+    predicates = [NamedNode(f"{EX}p{i}") for i in range(3)]
+    for i in range(count):
+        yield Quad(NamedNode(f"{EX}item/{i // 3}"), predicates[i % 3], Literal(str(i)))
+
+
+def generate_nquads(count: int) -> bytes:
+    """The same quads as N-Quads text, built with the columnar emitter"""
+    df = pl.select(pl.int_range(count).alias('i'))
+    subject = iri_term(pl.concat_str([pl.lit(f"{EX}item/"), (pl.col('i') // 3).cast(pl.Utf8)]))
+    frames = [
+        quad_frame(df.filter(pl.col('i') % 3 == p), subject, f"{EX}p{p}",
+                   literal_term(pl.col('i').cast(pl.Utf8)))
+        for p in range(3)
+    ]
+    return to_nquads(pl.concat(frames))
+
+
+def benchmark_per_quad(count: int) -> float:
+    store = Store()
+    start = time.perf_counter()
+    for quad in generate_quads(count):
+        store.add(quad)
+    return time.perf_counter() - start
+
+
+def benchmark_bulk_add(count: int, batch_size: int) -> float:
+    store = Store()
+    start = time.perf_counter()
+    bulk_add(store, generate_quads(count), batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def benchmark_bulk_load(count: int) -> float:
+    data = generate_nquads(count)
+    store = Store()
+    start = time.perf_counter()
+    bulk_load_bytes(store, data, RdfFormat.N_QUADS)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-quad vs bulk store ingest')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000],
+                        help='Numbers of quads to ingest')
+    parser.add_argument('--batch-size', type=int, default=100_000, help='Quads per bulk_extend call')
+    args = parser.parse_args()
+
+    print(f"\n{'='*80}")
+    print(f"Store Ingest Benchmark")
+    print(f"{'='*80}")
+
+    for count in args.sizes:
+        print(f"\n{count:,} quads")
+        results = [
+            ('Store.add per quad', benchmark_per_quad(count)),
+            (f'bulk_add (batch {args.batch_size:,})', benchmark_bulk_add(count, args.batch_size)),
+            ('bulk_load_bytes (N-Quads)', benchmark_bulk_load(count)),
+        ]
+        baseline = results[0][1]
+        for name, seconds in results:
+            print(f"  {name:<32} {seconds:8.2f} s  {count / seconds:12,.0f} quads/s  "
+                  f"{baseline / seconds:5.2f}x")
+
+    print(f"\n{'='*80}")
+
+
+if __name__ == "__main__":
+    main()
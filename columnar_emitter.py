@@ -0,0 +1,165 @@
+"""
+Columnar Quad Emitter
+=====================
+
+Builds RDF quads as Polars frames of N-Quads term strings instead of
+pyoxigraph objects. Each predicate-object of a triples map becomes one frame
+with the columns:
+
+- s: subject term   (<iri>)
+- p: predicate term (<iri>)
+- o: object term    (<iri> or "literal"^^<datatype> / "literal"@lang)
+- g: graph term     (<iri>, or "" for the default graph)
+
+Datatype and language suffixes are produced as columns, so a whole frame can
+be written straight to N-Quads text (or handed to a bulk loader) without
+creating a Python object per row. Python objects are only built on demand
+through ``iter_quads``/``iter_triples``.
+"""
+
+from io import BytesIO
+from typing import IO, Iterator, List, Optional, Sequence, Union
+
+import polars as pl
+from pyoxigraph import Quad, Triple, RdfFormat, parse
+
+QUAD_COLUMNS = ['s', 'p', 'o', 'g']
+
+
+def escape_literal(value: pl.Expr) -> pl.Expr:
+    """Escape a Utf8 expression for use inside an N-Quads string literal"""
+    return (
+        value.cast(pl.Utf8)
+        .str.replace_all('\\', '\\\\', literal=True)
+        .str.replace_all('"', '\\"', literal=True)
+        .str.replace_all('\n', '\\n', literal=True)
+        .str.replace_all('\r', '\\r', literal=True)
+    )
+
+
+def iri_term(value: Union[pl.Expr, str]) -> pl.Expr:
+    """Wrap an IRI expression (or constant IRI) as an N-Quads IRI term"""
+    if isinstance(value, str):
+        return pl.lit(f"<{value}>")
+    return pl.concat_str([pl.lit('<'), value, pl.lit('>')])
+
+
+def literal_term(value: pl.Expr, datatype: Optional[str] = None,
+                 language: Optional[str] = None) -> pl.Expr:
+    """
+    Build an N-Quads literal term expression.
+
+    Args:
+        value: Utf8 expression with the lexical values
+        datatype: Optional expanded datatype IRI (takes precedence over language)
+        language: Optional language tag
+
+    Returns:
+        Expression producing '"value"', '"value"^^<datatype>' or '"value"@lang'
+    """
+    if datatype:
+        suffix = f"^^<{datatype}>"
+    elif language:
+        suffix = f"@{language}"
+    else:
+        suffix = ""
+    return pl.concat_str([pl.lit('"'), escape_literal(value), pl.lit('"' + suffix)])
+
+
+def graph_term(graph_iri: Optional[str]) -> pl.Expr:
+    """Graph term expression ("" means the default graph)"""
+    return pl.lit(f"<{graph_iri}>" if graph_iri else "")
+
+
+def quad_frame(df: pl.DataFrame, subject: pl.Expr, predicate_iri: str, obj: pl.Expr,
+               graph_iri: Optional[str] = None, with_row_index: bool = False,
+               carry: Sequence[str] = ()) -> pl.DataFrame:
+    """
+    Evaluate one predicate-object over a source frame.
+
+    Args:
+        df: Source frame
+        subject: Subject term expression
+        predicate_iri: Expanded predicate IRI
+        obj: Object term expression
+        graph_iri: Optional expanded graph IRI
+        with_row_index: Also return the source row index as 'row_idx'
+        carry: Source columns to keep next to the quad columns
+
+    Returns:
+        Frame with columns s, p, o, g (and row_idx first when requested,
+        carried columns last)
+    """
+    columns = [
+        subject.alias('s'),
+        pl.lit(f"<{predicate_iri}>").alias('p'),
+        obj.alias('o'),
+        graph_term(graph_iri).alias('g'),
+    ]
+    carried = [pl.col(name) for name in carry]
+    if with_row_index:
+        return df.with_row_index('row_idx').select([pl.col('row_idx')] + columns + carried)
+    # Broadcast constant columns to the frame height
+    return df.with_columns(columns).select(QUAD_COLUMNS + list(carry))
+
+
+def nquads_line() -> pl.Expr:
+    """Expression rendering s, p, o, g columns as one N-Quads line"""
+    return pl.concat_str([
+        pl.col('s'), pl.lit(' '), pl.col('p'), pl.lit(' '), pl.col('o'),
+        pl.when(pl.col('g') != '').then(pl.lit(' ') + pl.col('g')).otherwise(pl.lit('')),
+        pl.lit(' .'),
+    ]).alias('line')
+
+
+def ntriples_line() -> pl.Expr:
+    """Expression rendering s, p, o columns as one N-Triples line"""
+    return pl.concat_str([
+        pl.col('s'), pl.lit(' '), pl.col('p'), pl.lit(' '), pl.col('o'), pl.lit(' .'),
+    ]).alias('line')
+
+
+def write_lines(lines: pl.DataFrame, output: Union[str, IO[bytes]]):
+    """Write a single-column frame of serialized lines without quoting"""
+    lines.write_csv(output, include_header=False, quote_style='never')
+
+
+def write_nquads(frame: pl.DataFrame, output: Union[str, IO[bytes]]):
+    """Write a quad frame as N-Quads to a path or binary file object"""
+    if frame.height == 0:
+        return
+    write_lines(frame.select(nquads_line()), output)
+
+
+def to_nquads(frame: pl.DataFrame) -> bytes:
+    """Serialize a quad frame to N-Quads bytes"""
+    buffer = BytesIO()
+    write_nquads(frame, buffer)
+    return buffer.getvalue()
+
+
+def to_ntriples(frame: pl.DataFrame) -> bytes:
+    """Serialize the s, p, o columns of a quad frame to N-Triples bytes"""
+    if frame.height == 0:
+        return b''
+    buffer = BytesIO()
+    write_lines(frame.select(ntriples_line()), buffer)
+    return buffer.getvalue()
+
+
+def iter_quads(frame: pl.DataFrame) -> Iterator[Quad]:
+    """Build pyoxigraph Quad objects for a frame (only when a consumer needs them)"""
+    return parse(to_nquads(frame), format=RdfFormat.N_QUADS)
+
+
+def iter_triples(frame: pl.DataFrame) -> Iterator[Triple]:
+    """Build pyoxigraph Triple objects for the s, p, o columns of a frame"""
+    for quad in parse(to_ntriples(frame), format=RdfFormat.N_TRIPLES):
+        yield quad.triple
+
+
+def concat_frames(frames: List[pl.DataFrame]) -> pl.DataFrame:
+    """Concatenate quad frames (empty frame with the quad schema if none)"""
+    if not frames:
+        return pl.DataFrame({c: [] for c in QUAD_COLUMNS}, schema={c: pl.Utf8 for c in QUAD_COLUMNS})
+    return pl.concat(frames, how='vertical')
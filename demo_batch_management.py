@@ -223,15 +223,15 @@ def demo_batch_timeline():
 
         print(f"Comparing {first_batch} vs {last_batch}:")
         diff = manager.compare_batches(first_batch, last_batch)
-        print(f"  Added: {len(diff.added_triples)}")
-        print(f"  Removed: {len(diff.removed_triples)}")
+        print(f"  Added: {diff.added_count}")
+        print(f"  Removed: {diff.removed_count}")
         print(f"  Unchanged: {diff.unchanged_count}")
 
         # Compare consecutive batches
         print("\nDay-over-day changes:")
         for i in range(len(batches) - 1):
             diff = manager.compare_batches(batches[i], batches[i + 1])
-            changes = len(diff.added_triples) + len(diff.removed_triples)
+            changes = diff.added_count + diff.removed_count
             print(f"  Day {i + 1} -> Day {i + 2}: {changes} changes")
 
     # Demonstrate provenance query
@@ -10,53 +10,85 @@ This server:
 
 Usage:
     uvicorn fastapi_sparql_server:app --host 0.0.0.0 --port 7878
+    python fastapi_sparql_server.py [--store-path <dir>] [--read-only]
+
+With --store-path (or SPARQL_STORE_PATH) the data lives in an on-disk
+RocksDB store: the files are ingested on the first start only, later starts
+open the store as it is. --read-only (or SPARQL_STORE_READ_ONLY=1) serves an
+existing store without write access. It is for a store that no other
+process has open for writing (such as a Store.backup copy): Oxigraph does
+not support reading a store while another process writes it, and a
+read-only server never sees a change, so its query cache is never
+invalidated.
+
+Queries run on a bounded thread pool (see query_executor.py) with a
+per-query timeout: --query-workers / SPARQL_QUERY_WORKERS and
+--query-timeout / SPARQL_QUERY_TIMEOUT (seconds). A query past its timeout
+gets 504; a query whose client disconnects is cancelled.
+
+Responses are cached (see query_cache.py) until the store changes:
+--cache-entries / SPARQL_CACHE_ENTRIES and --cache-bytes /
+SPARQL_CACHE_BYTES bound the cache; responses carry an ETag, and GET
+requests with a matching If-None-Match get 304. Identical requests sent
+while their query runs share one execution and response buffer
+(--no-coalesce / SPARQL_QUERY_COALESCE=0 turns this off).
+
+Results are sent in the format the Accept header asks for (see
+sparql_results.py): SPARQL JSON/XML, CSV/TSV, Arrow IPC or Parquet for
+SELECT; JSON, N-Triples, Turtle or RDF/XML for CONSTRUCT/DESCRIBE. A query
+whose results cannot be sent in any accepted format gets 406.
 
 Then access:
     http://localhost:7878/sparql (GET or POST)
 """
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from pyoxigraph import Store, RdfFormat
+import os
+import threading
 import time
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
+
+from query_cache import QueryCache, etag_matches
+from query_executor import QueryExecutor, QueryTimeout, QueryCancelled
+from sparql_results import NotAcceptable, result_media_type, write_results
+from store_io import bulk_load_file, open_store
+from store_stats import StoreStats, DEFAULT_GRAPH, store_is_empty
 
 app = FastAPI(title="RDF-star SPARQL Endpoint", version="1.0.0")
 
 # Global store
 store: Optional[Store] = None
+store_stats: Optional[StoreStats] = None
 load_stats: Dict[str, Any] = {}
 
+# On-disk store options (set from the command line or the environment)
+STORE_PATH: Optional[str] = os.environ.get('SPARQL_STORE_PATH')
+STORE_READ_ONLY: bool = os.environ.get('SPARQL_STORE_READ_ONLY') == '1'
 
-def initialize_store():
-    """Load ontologies and instance data into PyOxigraph store"""
-    global store, load_stats
+# Pool running the queries off the event loop
+executor = QueryExecutor()
 
-    print("="*80)
-    print("Initializing PyOxigraph SPARQL Endpoint with RDF-star")
-    print("="*80)
+# Encoded responses of repeated queries
+cache = QueryCache()
 
-    store = Store()
-    load_stats = {
-        'ontology_loaded': False,
-        'instance_loaded': False,
-        'total_quads': 0,
-        'load_time': 0,
-        'datasets_count': 0,
-        'activities_count': 0
-    }
 
-    start_time = time.time()
+def load_source_files(store_path: Optional[str] = None) -> bool:
+    """Ingest the ontology and instance data files into the empty store"""
+    global store_stats
+
+    store_stats = StoreStats(store, empty=True)
 
     # Load ontologies
     try:
         ontology_path = "data/data_products_ontology.ttl"
         print(f"\n[1/2] Loading ontologies from {ontology_path}...")
-        with open(ontology_path, 'rb') as f:
-            store.load(f, RdfFormat.TURTLE)
+        report = bulk_load_file(store, ontology_path, RdfFormat.TURTLE)
+        report.quads = store_stats.recount_graph(DEFAULT_GRAPH)
         load_stats['ontology_loaded'] = True
-        print(f"      [OK] Ontology loaded successfully")
+        print(f"      [OK] Ontology loaded successfully: {report}")
     except Exception as e:
         print(f"      [ERROR] Failed to load ontologies: {e}")
         return False
@@ -65,16 +97,71 @@ def initialize_store():
     try:
         instance_path = "output/output_data_star.trig"
         print(f"\n[2/2] Loading instance data from {instance_path}...")
-        with open(instance_path, 'rb') as f:
-            store.load(f, RdfFormat.TRIG)
+        before = store_stats.total
+        report = bulk_load_file(store, instance_path, RdfFormat.TRIG)
+        # The file's graphs are counted natively (the total is read for
+        # load_stats right after anyway)
+        store_stats.invalidate()
+        report.quads = store_stats.total - before
         load_stats['instance_loaded'] = True
-        print(f"      [OK] Instance data loaded successfully")
+        load_stats['ingest_rate'] = report.rate
+        print(f"      [OK] Instance data loaded successfully: {report}")
     except Exception as e:
         print(f"      [ERROR] Failed to load instance data: {e}")
         return False
 
+    if store_path:
+        store.flush()
+    return True
+
+
+def initialize_store(store_path: Optional[str] = None, read_only: bool = False):
+    """
+    Load ontologies and instance data into PyOxigraph store
+
+    Args:
+        store_path: Optional directory of an on-disk store; a store that
+                    already holds data is served as it is
+        read_only: Open the on-disk store read-only
+    """
+    global store, store_stats, load_stats
+
+    print("="*80)
+    print("Initializing PyOxigraph SPARQL Endpoint with RDF-star")
+    print("="*80)
+
+    try:
+        store = open_store(store_path, read_only=read_only)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Failed to open store: {e}")
+        return False
+
+    load_stats = {
+        'ontology_loaded': False,
+        'instance_loaded': False,
+        'total_quads': 0,
+        'load_time': 0,
+        'datasets_count': 0,
+        'activities_count': 0
+    }
+
+    start_time = time.time()
+
+    if store_path and not store_is_empty(store):
+        # Serve the on-disk store as it is instead of re-ingesting the files
+        store_stats = StoreStats(store)
+        mode = "read-only" if read_only else "read-write"
+        print(f"\n[1/1] Opened on-disk store at {store_path} ({mode})")
+        load_stats['ontology_loaded'] = True
+        load_stats['instance_loaded'] = True
+    elif read_only:
+        print(f"[ERROR] Read-only store is empty: {store_path}")
+        return False
+    elif not load_source_files(store_path):
+        return False
+
     # Calculate statistics
-    load_stats['total_quads'] = len(list(store))
+    load_stats.update(store_stats.to_dict())
     load_stats['load_time'] = time.time() - start_time
 
     # Count datasets and activities
@@ -114,7 +201,7 @@ def initialize_store():
 @app.on_event("startup")
 async def startup_event():
     """Initialize store on startup"""
-    if not initialize_store():
+    if not initialize_store(STORE_PATH, read_only=STORE_READ_ONLY):
         print("[ERROR] Failed to initialize store!")
         raise RuntimeError("Store initialization failed")
 
@@ -210,9 +297,9 @@ LIMIT 10</pre>
 
 
 @app.get("/sparql")
-async def sparql_get(query: str):
+async def sparql_get(query: str, request: Request):
     """SPARQL endpoint - GET method"""
-    return await execute_sparql(query)
+    return await execute_sparql(query, request)
 
 
 @app.post("/sparql")
@@ -236,111 +323,61 @@ async def sparql_post(request: Request):
     if not query:
         raise HTTPException(status_code=400, detail="No query provided")
 
-    return await execute_sparql(query)
+    return await execute_sparql(query, request)
 
 
-async def execute_sparql(query: str) -> JSONResponse:
-    """Execute SPARQL query and return results"""
+async def execute_sparql(query: str, request: Optional[Request] = None) -> StreamingResponse:
+    """Execute SPARQL query on the query pool and stream the results"""
     if store is None:
         raise HTTPException(status_code=500, detail="Store not initialized")
 
+    accept = request.headers.get('accept') if request is not None else None
+    generation = store_stats.generation
+    key = cache.key(query, accept)
+    headers = {'Vary': 'Accept', 'ETag': cache.etag(key, generation)}
+
+    if (request is not None and request.method == 'GET'
+            and etag_matches(request.headers.get('if-none-match'), headers['ETag'])):
+        cache.count('not_modified')
+        return Response(status_code=304, headers=headers)
+
+    cached = cache.get(key, generation)
+    if cached is not None:
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
+
+    # Identical requests while the query runs share its execution
+    chunks = cache.flight(
+        key, generation,
+        lambda disconnected: executor.stream(
+            lambda cancel, emit: run_query(query, cancel, emit, accept), disconnected=disconnected
+        ),
+        disconnected=request.is_disconnected if request is not None else None
+    )
     try:
-        start_time = time.time()
-
-        print(f"\n[QUERY] Executing SPARQL query...")
-        print(f"[QUERY] First 200 chars: {query[:200]}")
-
-        # Execute query - DON'T convert to list yet!
-        query_results = store.query(query)
-
-        # Get variable names BEFORE converting to list
-        vars = []
-        if hasattr(query_results, 'variables'):
-            var_objects = query_results.variables  # Property, not method!
-            vars = [str(v).lstrip('?') for v in var_objects]  # Remove ? prefix
-            print(f"[RESULT] Variables: {vars}")
-
-        # NOW convert to list
-        results = list(query_results)
-        query_time = time.time() - start_time
-
-        print(f"[RESULT] Got {len(results)} results in {query_time:.3f}s")
-
-        # Convert results to bindings
-        bindings = []
-        for result in results:
-            binding = {}
-            for var in vars:
-                try:
-                    # Access by string key (without ?)
-                    value = result[var]
-
-                    if value is not None:
-                        value_str = str(value)
-
-                        # Determine type and format
-                        if value_str.startswith('<') and value_str.endswith('>'):
-                            # URI in angle brackets
-                            binding[var] = {
-                                'type': 'uri',
-                                'value': value_str[1:-1]  # Remove < >
-                            }
-                        elif value_str.startswith('http://') or value_str.startswith('https://'):
-                            # Plain URI
-                            binding[var] = {
-                                'type': 'uri',
-                                'value': value_str
-                            }
-                        elif value_str.startswith('"'):
-                            # Literal with quotes - might have datatype
-                            if '^^' in value_str:
-                                # "value"^^<datatype>
-                                parts = value_str.split('^^')
-                                literal_value = parts[0].strip('"')
-                                datatype = parts[1].strip('<>')
-                                binding[var] = {
-                                    'type': 'literal',
-                                    'value': literal_value,
-                                    'datatype': datatype
-                                }
-                            else:
-                                # Plain literal "value"
-                                binding[var] = {
-                                    'type': 'literal',
-                                    'value': value_str.strip('"')
-                                }
-                        else:
-                            # Unquoted value
-                            binding[var] = {
-                                'type': 'literal',
-                                'value': value_str
-                            }
-                except (KeyError, IndexError) as e:
-                    print(f"[WARNING] Could not extract {var}: {e}")
-                    continue
-
-            bindings.append(binding)
-
-        print(f"[RESULT] Bindings created: {len(bindings)}")
-        if bindings:
-            print(f"[RESULT] First binding keys: {list(bindings[0].keys())}")
-            print(f"[RESULT] First binding sample: {bindings[0]}")
-
-        response_data = {
-            'head': {'vars': vars},
-            'results': {'bindings': bindings},
-            'meta': {
-                'query_time': f"{query_time:.3f}s",
-                'result_count': len(results)
+        media_type = await anext(chunks)
+    except QueryTimeout:
+        print(f"[ERROR] Query timed out after {executor.timeout}s")
+        raise HTTPException(
+            status_code=504,
+            detail={
+                'error': 'Query timed out',
+                'message': f"Query took longer than {executor.timeout}s",
+                'query': query[:500]
             }
-        }
+        )
+    except QueryCancelled:
+        raise HTTPException(status_code=499, detail="Client closed request")
+
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
-        return JSONResponse(content=response_data)
 
+def run_query(query: str, cancel: threading.Event, emit: Callable[[Any], None], accept: Optional[str] = None):
+    """Execute a SPARQL query and emit the media type and body chunks (runs on a query worker)"""
+    start_time = time.time()
+    try:
+        results = store.query(query)
     except Exception as e:
         print(f"[ERROR] Query execution failed: {e}")
-        import traceback
-        traceback.print_exc()
         raise HTTPException(
             status_code=400,
             detail={
@@ -350,11 +387,22 @@ async def execute_sparql(query: str) -> JSONResponse:
             }
         )
 
+    def meta(count: int) -> Dict[str, Any]:
+        return {'meta': {'query_time': f"{time.time() - start_time:.3f}s", 'result_count': count}}
+
+    try:
+        media_type = result_media_type(results, accept)
+    except NotAcceptable as e:
+        raise HTTPException(status_code=406, detail={'error': 'Not acceptable', 'message': str(e)})
+
+    emit(media_type)
+    write_results(results, media_type, emit, cancel, footer=meta)
+
 
 @app.get("/stats")
 async def stats():
     """Return store statistics"""
-    return load_stats
+    return {**load_stats, 'query_executor': executor.to_dict(), 'query_cache': cache.to_dict()}
 
 
 @app.get("/health")
@@ -369,8 +417,30 @@ async def health():
 
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
 
+    parser = argparse.ArgumentParser(description="FastAPI SPARQL Endpoint Server")
+    parser.add_argument("--store-path", default=STORE_PATH,
+                        help="Directory of an on-disk RocksDB store (default: in-memory store)")
+    parser.add_argument("--read-only", action="store_true", default=STORE_READ_ONLY,
+                        help="Open the on-disk store read-only (no writer may have it open)")
+    parser.add_argument("--query-workers", type=int, default=executor.max_workers,
+                        help="Queries run at once")
+    parser.add_argument("--query-timeout", type=float, default=executor.timeout,
+                        help="Seconds before a query is cancelled")
+    parser.add_argument("--cache-entries", type=int, default=cache.max_entries,
+                        help="Query responses cached (0 disables the cache)")
+    parser.add_argument("--cache-bytes", type=int, default=cache.max_bytes,
+                        help="Total bytes of the cached query responses")
+    parser.add_argument("--no-coalesce", action="store_false", dest="coalesce", default=cache.coalesce,
+                        help="Run every request, also identical ones sent while a query runs")
+    args = parser.parse_args()
+    STORE_PATH = args.store_path
+    STORE_READ_ONLY = args.read_only
+    executor = QueryExecutor(max_workers=args.query_workers, timeout=args.query_timeout)
+    cache = QueryCache(max_entries=args.cache_entries, max_bytes=args.cache_bytes, coalesce=args.coalesce)
+
     print("\n" + "="*80)
     print("FastAPI SPARQL Endpoint Server")
     print("RDF-star Data Products with Governance")
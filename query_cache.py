@@ -0,0 +1,388 @@
+"""
+Query Cache
+===========
+
+LRU cache of encoded SPARQL responses for the servers, so dashboards that
+send the same queries over and over do not re-run them.
+
+Entries are keyed on the normalized query text (comments dropped, runs of
+whitespace outside strings collapsed) and the Accept header, and belong to
+one generation of the store (StoreStats.generation): a recorded write moves
+the store to a new generation and the entries of the old one are no longer
+served.
+
+    cache = QueryCache(max_entries=1000, max_bytes=256 * 1024 * 1024)
+
+    key = cache.key(query, accept)
+    entry = cache.get(key, store_stats.generation)
+    if entry is None:
+        chunks = cache.flight(key, store_stats.generation,
+                              lambda disconnected: executor.stream(work, disconnected=disconnected),
+                              disconnected=request.is_disconnected)
+        media_type = await anext(chunks)
+
+A query that is not cached runs once for all the requests that ask for it
+while it runs (single flight): flight() joins a running execution of the
+same key and generation, and every request reads the chunks of the one
+response buffer from its start. The fastest request pulls the next chunk,
+so the query still runs at the pace of its clients; it is cancelled once
+all of its requests are gone. A complete response is kept in the cache; a
+response larger than max_entry_bytes is not, and its execution takes no
+more requests once it outgrows that size, so its buffer only holds the
+chunks not yet read by every request.
+
+Every response gets an ETag derived from its key and generation, so a
+client sending it back in If-None-Match gets 304 Not Modified until the
+store changes, whether or not the response is still cached.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from query_executor import QueryCancelled
+
+# Defaults, overridable with SPARQL_CACHE_ENTRIES / SPARQL_CACHE_BYTES /
+# SPARQL_QUERY_COALESCE=0
+DEFAULT_ENTRIES = int(os.environ.get('SPARQL_CACHE_ENTRIES', 1000))
+DEFAULT_BYTES = int(os.environ.get('SPARQL_CACHE_BYTES', 256 * 1024 * 1024))
+DEFAULT_COALESCE = os.environ.get('SPARQL_QUERY_COALESCE', '1') != '0'
+
+Disconnected = Callable[[], Awaitable[bool]]
+
+# Marks the end of a flight's source
+_END = object()
+
+# Tokens of a query that normalization must not change (strings, IRIs),
+# comments and whitespace
+_TOKENS = re.compile(r'''
+    (?P<keep>
+        """(?:[^"\\]|\\.|"(?!""))*"""
+      | \'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\'
+      | "(?:[^"\\\n]|\\.)*"
+      | '(?:[^'\\\n]|\\.)*'
+      | <[^<>"{}|^`\\\s]*>
+    )
+  | (?P<comment>\#[^\n]*)
+  | (?P<space>\s+)
+  | (?P<other>[^\s"'<\#]+|.)
+''', re.VERBOSE | re.DOTALL)
+
+
+def normalize_query(query: str) -> str:
+    """Query text with comments dropped and whitespace collapsed (outside strings and IRIs)"""
+    parts: List[str] = []
+    for match in _TOKENS.finditer(query):
+        if match.lastgroup in ('comment', 'space'):
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        else:
+            parts.append(match.group())
+    return ''.join(parts).strip()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+@dataclass
+class CachedResponse:
+    """Encoded response of a query"""
+    generation: int
+    media_type: str
+    body: bytes
+
+
+class QueryCache:
+    """
+    LRU cache of encoded query responses, bounded by entries and bytes.
+
+    Safe to use from the event loop and the query workers at once.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_ENTRIES,
+        max_bytes: int = DEFAULT_BYTES,
+        max_entry_bytes: Optional[int] = None,
+        coalesce: bool = DEFAULT_COALESCE
+    ):
+        """
+        Args:
+            max_entries: Responses kept (0 disables the cache)
+            max_bytes: Total size of the responses kept
+            max_entry_bytes: Largest response kept (default: an eighth of max_bytes)
+            coalesce: Run a query once for concurrent identical requests
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 8 if max_entry_bytes is None else max_entry_bytes
+        self.coalesce = coalesce
+        # Running executions that take more requests (used on the event loop only)
+        self._flights: Dict[Tuple[str, int], '_Flight'] = {}
+        # Part of every ETag, so ETags of an earlier process never match
+        self._instance = uuid.uuid4().hex
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'coalesced': 0, 'stored': 0, 'evictions': 0,
+                      'too_large': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def count(self, key: str, delta: int = 1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def key(self, query: str, accept: Optional[str] = None) -> str:
+        """Cache key of a query and the Accept header it was sent with"""
+        return f"{(accept or '').strip()}\n{normalize_query(query)}"
+
+    def etag(self, key: str, generation: int) -> str:
+        """ETag of the response to a key in a store generation"""
+        digest = hashlib.sha1(f"{self._instance}\n{generation}\n{key}".encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def get(self, key: str, generation: int) -> Optional[CachedResponse]:
+        """The cached response, if there is one of this generation (counts a hit or a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.generation != generation:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key: str, generation: int, media_type: str, body: bytes):
+        """Keep a response, evicting the least recently used ones beyond the limits"""
+        if not self.enabled:
+            return
+        if len(body) > self.max_entry_bytes:
+            self.count('too_large')
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CachedResponse(generation, media_type, body)
+            self._bytes += len(body)
+            self.stats['stored'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def _remove(self, key: str):
+        self._bytes -= len(self._entries.pop(key).body)
+
+    def flight(
+        self,
+        key: str,
+        generation: int,
+        start: Callable[[Disconnected], Awaitable[AsyncIterator[Any]]],
+        disconnected: Optional[Disconnected] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Read the response to a key from the running execution, or start one.
+
+        Args:
+            key: Key of the request (see key())
+            generation: Generation of the store
+            start: Coroutine function starting the execution, given a
+                   coroutine function telling if all its requests are gone;
+                   returns an async iterator of the media type and the body
+                   chunks (e.g. QueryExecutor.stream)
+            disconnected: Coroutine function telling if this request is gone
+
+        Returns:
+            Async iterator of the media type and the body chunks; errors of
+            the execution are raised to every request reading it
+        """
+        flight = self._flights.get((key, generation)) if self.coalesce else None
+        if flight is None:
+            flight = _Flight(self, key, generation, start)
+            if self.coalesce:
+                self._flights[(key, generation)] = flight
+        else:
+            self.count('coalesced')
+        return flight.read(disconnected)
+
+    def clear(self):
+        """Drop all responses"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Settings, size and counters (for /stats)"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'in_flight': len(self._flights),
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None,
+            }
+
+
+class _Flight:
+    """One execution of a query and the requests reading its response"""
+
+    def __init__(self, cache: QueryCache, key: str, generation: int,
+                 start: Callable[[Disconnected], Awaitable[AsyncIterator[Any]]]):
+        self.cache = cache
+        self.key = key
+        self.generation = generation
+        self._start = start
+        self._source: Optional[AsyncIterator[Any]] = None
+        self._pending: Optional[asyncio.Future] = None
+        # Media type and body chunks from position _base on
+        self._chunks: List[Any] = []
+        self._base = 0
+        self._size = 0
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        # Position and disconnect check of each request reading
+        self._positions: Dict[object, int] = {}
+        self._watchers: Dict[object, Optional[Disconnected]] = {}
+
+    @property
+    def joinable(self) -> bool:
+        """Whether the response is still complete from its start"""
+        return self._base == 0 and self._size <= self.cache.max_entry_bytes
+
+    async def read(self, disconnected: Optional[Disconnected]) -> AsyncIterator[Any]:
+        """The media type and body chunks, for one request"""
+        reader = object()
+        self._positions[reader] = 0
+        self._watchers[reader] = disconnected
+        try:
+            while True:
+                position = self._positions[reader]
+                if position < self._base + len(self._chunks):
+                    chunk = self._chunks[position - self._base]
+                    self._positions[reader] = position + 1
+                    self._trim()
+                    yield chunk
+                elif self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                else:
+                    changed = self._changed
+                    self._pull()
+                    await changed.wait()
+        finally:
+            del self._positions[reader]
+            del self._watchers[reader]
+            if not self._positions and not self._done:
+                self._abort()
+
+    async def _all_disconnected(self) -> bool:
+        """Whether every request reading is gone (for the execution's disconnect checks)"""
+        watchers = list(self._watchers.values())
+        if not watchers or None in watchers:
+            return False
+        return all([await watcher() for watcher in watchers])
+
+    async def _run(self) -> AsyncIterator[Any]:
+        chunks = await self._start(self._all_disconnected)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _next(self) -> Any:
+        try:
+            return await self._source.__anext__()
+        except StopAsyncIteration:
+            return _END
+
+    def _pull(self):
+        """Fetch the next chunk, unless it is being fetched (in a task no request's cancellation stops)"""
+        if self._pending is None and not self._done:
+            if self._source is None:
+                self._source = self._run()
+            self._pending = asyncio.ensure_future(self._next())
+            self._pending.add_done_callback(self._pulled)
+
+    def _pulled(self, pending: asyncio.Future):
+        self._pending = None
+        if pending.cancelled():
+            self._finish(QueryCancelled())
+        elif pending.exception() is not None:
+            self._finish(pending.exception())
+        elif pending.result() is _END:
+            self._finish(None)
+        else:
+            chunk = pending.result()
+            if self._base or self._chunks:
+                self._size += len(chunk)
+            self._chunks.append(chunk)
+            if not self.joinable:
+                self._leave_table()
+            self._trim()
+            self._notify()
+
+    def _trim(self):
+        """Drop the chunks every request has read, once no request can join"""
+        if not self.joinable and self._positions:
+            read = min(self._positions.values()) - self._base
+            if read > 0:
+                del self._chunks[:read]
+                self._base += read
+
+    def _finish(self, error: Optional[BaseException]):
+        if self._done:
+            return
+        self._done = True
+        self._error = error
+        self._leave_table()
+        if error is None and self.joinable and self._chunks:
+            self.cache.put(self.key, self.generation, self._chunks[0], b''.join(self._chunks[1:]))
+        self._notify()
+
+    def _abort(self):
+        """Cancel the execution once no request reads it"""
+        self._done = True
+        self._error = QueryCancelled()
+        self._leave_table()
+        if self._pending is not None:
+            self._pending.cancel()
+        elif self._source is not None:
+            asyncio.ensure_future(self._source.aclose())
+
+    def _leave_table(self):
+        if self.cache._flights.get((self.key, self.generation)) is self:
+            del self.cache._flights[(self.key, self.generation)]
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
@@ -0,0 +1,309 @@
+"""
+Query Executor
+==============
+
+Runs blocking SPARQL work (store.query and encoding the results) on a
+bounded thread pool, so the asyncio event loop of the servers keeps serving
+/health and light queries while heavy queries run. pyoxigraph releases the
+GIL while it evaluates a query, so the worker threads run in parallel.
+
+Every query gets a deadline and a cancel event:
+
+    executor = QueryExecutor(max_workers=4, timeout=30.0)
+
+    def work(cancel: threading.Event):
+        rows = []
+        for row in store.query(query):
+            check_cancelled(cancel)
+            rows.append(row)
+        return rows
+
+    rows = await executor.run(work, disconnected=request.is_disconnected)
+
+stream() runs work that emits chunks (e.g. a large result body) and yields
+them on the event loop as they come, through a small buffer: the worker
+waits while the buffer is full, so a slow client holds back the query
+instead of filling memory.
+
+run() raises QueryTimeout once the deadline passes and QueryCancelled when
+the client disconnects; in both cases the cancel event is set, so the work
+stops at its next check_cancelled(). Threads cannot be interrupted, so a
+query inside a single pyoxigraph call (e.g. an aggregate) runs to the end
+of that call; it keeps its worker until then, so no more than max_workers
+queries ever run at once.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# Defaults, overridable with SPARQL_QUERY_WORKERS / SPARQL_QUERY_TIMEOUT
+DEFAULT_WORKERS = int(os.environ.get('SPARQL_QUERY_WORKERS', min(8, os.cpu_count() or 1)))
+DEFAULT_TIMEOUT = float(os.environ.get('SPARQL_QUERY_TIMEOUT', 30.0))
+
+# Seconds between checks for a disconnected client
+DISCONNECT_POLL = 0.1
+
+# Chunks buffered between a streaming worker and the response
+STREAM_BUFFER = 8
+
+# Marks the end of a stream
+_END = object()
+
+
+class QueryTimeout(Exception):
+    """The query ran longer than its timeout"""
+
+
+class QueryCancelled(Exception):
+    """The query was cancelled (its client disconnected)"""
+
+
+def check_cancelled(cancel: threading.Event):
+    """Raise QueryCancelled in a worker whose query was cancelled"""
+    if cancel.is_set():
+        raise QueryCancelled()
+
+
+def _clear_frames(error: BaseException):
+    """
+    Drop the locals of the frames an exception went through.
+
+    pyoxigraph results can only be dropped on the thread that created them;
+    an exception handed to the event loop must not keep them alive.
+    """
+    while error is not None:
+        traceback.clear_frames(error.__traceback__)
+        error = error.__cause__ or error.__context__
+
+
+class QueryExecutor:
+    """
+    Bounded thread pool for blocking query work, with timeouts and cancellation.
+
+    Queries wait for a free worker on the event loop (the wait counts
+    towards their timeout), so the pool never queues more work than it has
+    threads.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        Args:
+            max_workers: Queries run at once
+            timeout: Default seconds per query (None for no timeout)
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sparql')
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self.stats = {'completed': 0, 'failed': 0, 'timeouts': 0, 'cancelled': 0, 'running': 0}
+
+    def _count(self, key: str, delta: int = 1):
+        with self._lock:
+            self.stats[key] += delta
+
+    def _work(self, fn: Callable[[threading.Event], Any], cancel: threading.Event) -> Any:
+        """Run fn in a worker and free the slot when it returns"""
+        self._count('running')
+        try:
+            check_cancelled(cancel)
+            return fn(cancel)
+        except BaseException as e:
+            _clear_frames(e)
+            raise
+        finally:
+            self._count('running', -1)
+            self._slots.release()
+
+    async def _acquire(self, deadline: Optional[float]):
+        """Wait for a free worker without blocking the event loop"""
+        while not self._slots.acquire(blocking=False):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise QueryTimeout()
+            await asyncio.sleep(0.005)
+
+    async def run(
+        self,
+        fn: Callable[[threading.Event], Any],
+        timeout: Optional[float] = -1,
+        disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Any:
+        """
+        Run fn(cancel) on a worker thread.
+
+        Args:
+            fn: Blocking work; should call check_cancelled(cancel) regularly
+            timeout: Seconds for this query (default: the executor's timeout,
+                     None for no timeout)
+            disconnected: Coroutine function telling if the client is gone
+                          (e.g. request.is_disconnected)
+
+        Returns:
+            The result of fn
+
+        Raises:
+            QueryTimeout: The deadline passed
+            QueryCancelled: The client disconnected
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        cancel = threading.Event()
+
+        try:
+            await self._acquire(deadline)
+            future = asyncio.wrap_future(self._pool.submit(self._work, fn, cancel))
+            while True:
+                wait = DISCONNECT_POLL if disconnected else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise QueryTimeout()
+                    wait = remaining if wait is None else min(wait, remaining)
+                done, _ = await asyncio.wait({future}, timeout=wait)
+                if done:
+                    break
+                if disconnected and await disconnected():
+                    raise QueryCancelled()
+            result = future.result()
+        except QueryTimeout:
+            cancel.set()
+            self._count('timeouts')
+            raise
+        except (QueryCancelled, asyncio.CancelledError):
+            cancel.set()
+            self._count('cancelled')
+            raise
+        except Exception:
+            self._count('failed')
+            raise
+
+        self._count('completed')
+        return result
+
+    async def stream(
+        self,
+        fn: Callable[[threading.Event, Callable[[Any], None]], None],
+        timeout: Optional[float] = -1,
+        disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Run fn(cancel, emit) on a worker thread and iterate over what it emits.
+
+        Waits for the first chunk, so errors before it (e.g. a query that
+        does not parse) are raised here; later errors, the timeout and a
+        disconnect end the iteration with the exception. Closing the
+        iterator cancels the work.
+
+        Args:
+            fn: Blocking work calling emit(chunk) for every chunk
+            timeout: Seconds for the whole stream (default: the executor's
+                     timeout, None for no timeout)
+            disconnected: Coroutine function telling if the client is gone
+
+        Returns:
+            Async iterator of the chunks
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        buffer: queue.Queue = queue.Queue(STREAM_BUFFER)
+        ready = asyncio.Event()
+        cancel = threading.Event()
+
+        def put(item):
+            while True:
+                check_cancelled(cancel)
+                try:
+                    buffer.put(item, timeout=DISCONNECT_POLL)
+                    break
+                except queue.Full:
+                    continue
+            loop.call_soon_threadsafe(ready.set)
+
+        def work(cancel):
+            try:
+                fn(cancel, put)
+            except QueryCancelled:
+                raise
+            except BaseException as e:
+                # Handed to the iterator, which raises it on the event loop
+                _clear_frames(e)
+                put(e)
+                return
+            put(_END)
+
+        async def chunks():
+            try:
+                await self._acquire(deadline)
+                self._pool.submit(self._work, work, cancel)
+                while True:
+                    try:
+                        item = buffer.get_nowait()
+                    except queue.Empty:
+                        ready.clear()
+                        if not buffer.empty():
+                            continue
+                        wait = DISCONNECT_POLL if disconnected else None
+                        if deadline is not None:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                raise QueryTimeout()
+                            wait = remaining if wait is None else min(wait, remaining)
+                        try:
+                            await asyncio.wait_for(ready.wait(), wait)
+                        except asyncio.TimeoutError:
+                            if disconnected and await disconnected():
+                                raise QueryCancelled()
+                        continue
+                    if item is _END:
+                        break
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
+            except QueryTimeout:
+                self._count('timeouts')
+                raise
+            except (QueryCancelled, asyncio.CancelledError, GeneratorExit):
+                self._count('cancelled')
+                raise
+            except Exception:
+                self._count('failed')
+                raise
+            else:
+                self._count('completed')
+            finally:
+                cancel.set()
+
+        iterator = chunks()
+        try:
+            first = await iterator.__anext__()
+        except StopAsyncIteration:
+            first = _END
+
+        async def with_first():
+            try:
+                if first is not _END:
+                    yield first
+                    async for chunk in iterator:
+                        yield chunk
+            finally:
+                await iterator.aclose()
+
+        return with_first()
+
+    def shutdown(self):
+        """Stop the workers (running queries finish first)"""
+        self._pool.shutdown(wait=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Settings and counters (for /stats)"""
+        with self._lock:
+            return {'max_workers': self.max_workers, 'timeout': self.timeout, **self.stats}
@@ -11,6 +11,14 @@ Usage:
     # Or with custom data file:
     python rdf-workbench.py --data output/batch_simulation/two_batches.trig
 
+    # Keep the data in an on-disk store (ingested on the first start only):
+    python rdf-workbench.py --store-path stores/workbench
+    # Or serve one that no other process has open for writing:
+    python rdf-workbench.py --store-path stores/workbench --read-only
+
+    # Queries run on a bounded thread pool with a per-query timeout:
+    python rdf-workbench.py --query-workers 4 --query-timeout 10
+
 Endpoints:
     GET/POST /sparql - Execute SPARQL queries
     GET /stats - Server statistics
@@ -18,12 +26,13 @@ Endpoints:
 """
 
 import argparse
+import threading
 import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 
 from fastapi import FastAPI, HTTPException, Request, Query
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -31,6 +40,12 @@ import uvicorn
 from pyoxigraph import Store, RdfFormat, NamedNode
 import os
 
+from query_cache import QueryCache, etag_matches
+from query_executor import QueryExecutor, QueryTimeout, QueryCancelled
+from sparql_results import NotAcceptable, result_media_type, write_results
+from store_io import bulk_load_file, open_store
+from store_stats import StoreStats, store_is_empty
+
 # Get the directory of this script
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -56,8 +71,13 @@ templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 
 # Global state
 store: Optional[Store] = None
+store_stats: Optional[StoreStats] = None
+store_path: Optional[str] = None
+store_read_only: bool = False
 load_stats: Dict[str, Any] = {}
 data_file: str = "output/batch_simulation/two_batches.trig"
+executor = QueryExecutor()
+cache = QueryCache()
 
 
 def uri_str(node):
@@ -98,7 +118,7 @@ def graph_uri_from_path(filepath: str, base_dir: str) -> str:
 
 def load_rdf_file(filepath: str, graph_uri: str, indent: str = "  "):
     """Load a single RDF file into a named graph."""
-    global store
+    global store, store_stats
     entry = os.path.basename(filepath)
     graph = NamedNode(graph_uri)
     fmt = None
@@ -119,13 +139,15 @@ def load_rdf_file(filepath: str, graph_uri: str, indent: str = "  "):
 
     try:
         print(f"{indent}Loading: {entry} -> <{graph_uri}>")
-        with open(filepath, 'rb') as f:
-            if fmt in (RdfFormat.TRIG, RdfFormat.N_QUADS):
-                # These formats carry their own graph info
-                store.load(f, fmt)
-            else:
-                store.load(f, fmt, to_graph=graph)
-        print(f"{indent}  -> loaded successfully")
+        if fmt in (RdfFormat.TRIG, RdfFormat.N_QUADS):
+            # These formats carry their own graph info
+            report = bulk_load_file(store, filepath, fmt)
+            # Their graphs are counted natively when the counts are next read
+            store_stats.invalidate()
+        else:
+            report = bulk_load_file(store, filepath, fmt, to_graph=graph)
+            report.quads = store_stats.recount_graph(graph_uri)
+        print(f"{indent}  -> loaded {report}")
         return True
     except Exception as e:
         print(f"{indent}  -> Warning: Failed to load: {e}")
@@ -149,28 +171,44 @@ def load_rdf_directory_recursive(directory: str, base_dir: str = None, indent: s
             load_rdf_file(filepath, graph_uri, indent)
 
 
-def initialize_store(rdf_input_dir: str = None):
-    """Load RDF data into PyOxigraph store from rdf-data-input directory."""
-    global store, load_stats, data_file
+def initialize_store(rdf_input_dir: str = None, path: Optional[str] = None, read_only: bool = False):
+    """
+    Load RDF data into PyOxigraph store from rdf-data-input directory.
+
+    With a path the store is an on-disk store; if it already holds data it
+    is served as it is and the input directory is not loaded again.
+    """
+    global store, store_stats, store_path, store_read_only, load_stats, data_file
 
     print("=" * 70)
     print("Initializing Batch SPARQL Endpoint")
     print("=" * 70)
 
-    store = Store()
     start_time = time.time()
 
     try:
+        store = open_store(path, read_only=read_only)
+        store_path = path
+        store_read_only = read_only
+
         # Determine RDF input directory - default to rdf-data-input
         input_dir = rdf_input_dir if rdf_input_dir else os.path.join(BASE_DIR, "rdf-data-input")
         data_file = input_dir
 
-        # Recursively load all RDF files from the input directory
-        if os.path.exists(input_dir):
+        if path and not store_is_empty(store):
+            # Serve the on-disk store instead of re-loading the input directory
+            store_stats = StoreStats(store)
+            print(f"\nOpened on-disk store: {path} ({'read-only' if read_only else 'read-write'})")
+        elif read_only:
+            raise ValueError(f"Read-only store is empty: {path}")
+        elif os.path.exists(input_dir):
+            # Recursively load all RDF files from the input directory
+            store_stats = StoreStats(store, empty=True)
             print(f"\nLoading RDF files recursively from: {input_dir}")
             print("  (Place ontologies in /ontologies and instance data in /individuals)\n")
             load_rdf_directory_recursive(input_dir)
         else:
+            store_stats = StoreStats(store, empty=True)
             print(f"\n[WARNING] RDF input directory not found: {input_dir}")
             print("  Creating directory structure...")
             os.makedirs(os.path.join(input_dir, "ontologies"), exist_ok=True)
@@ -179,8 +217,11 @@ def initialize_store(rdf_input_dir: str = None):
             print(f"  Created: {input_dir}/individuals/")
             print("\n  Place your RDF files in these directories and restart the server.")
 
+        if path and not read_only:
+            store.flush()
+
         load_stats['data_loaded'] = True
-        load_stats['total_quads'] = len(list(store))
+        load_stats['total_quads'] = store_stats.total
         load_stats['load_time'] = time.time() - start_time
 
         # Count batches - use simpler query
@@ -200,12 +241,9 @@ def initialize_store(rdf_input_dir: str = None):
             load_stats['batch_count'] = 0
 
         # Count named graphs
-        graphs = set()
-        for quad in store:
-            if quad.graph_name:
-                graphs.add(str(quad.graph_name))
+        graphs = store_stats.named_graphs
         load_stats['graph_count'] = len(graphs)
-        load_stats['graphs'] = list(graphs)
+        load_stats['graphs'] = graphs
 
         print(f"\n[OK] Data loaded successfully")
         print(f"    Total quads: {load_stats['total_quads']:,}")
@@ -321,7 +359,7 @@ WHERE {{
 @app.get("/stats")
 async def get_stats():
     """Return server statistics."""
-    return JSONResponse(load_stats)
+    return JSONResponse({**load_stats, 'query_executor': executor.to_dict(), 'query_cache': cache.to_dict()})
 
 
 @app.get("/batches")
@@ -369,9 +407,9 @@ async def list_batches():
 
 
 @app.get("/sparql")
-async def sparql_get(query: str = Query(..., description="SPARQL query")):
+async def sparql_get(request: Request, query: str = Query(..., description="SPARQL query")):
     """Execute SPARQL query via GET."""
-    return await execute_sparql(query)
+    return await execute_sparql(query, request)
 
 
 @app.post("/sparql")
@@ -396,80 +434,65 @@ async def sparql_post(request: Request):
     if not query:
         raise HTTPException(status_code=400, detail="No query provided")
 
-    return await execute_sparql(query)
+    return await execute_sparql(query, request)
 
 
-async def execute_sparql(query: str) -> JSONResponse:
-    """Execute SPARQL query and return results."""
+async def execute_sparql(query: str, request: Optional[Request] = None) -> StreamingResponse:
+    """Execute SPARQL query on the query pool and stream the results."""
     if store is None:
         raise HTTPException(status_code=500, detail="Store not initialized")
 
+    accept = request.headers.get('accept') if request is not None else None
+    generation = store_stats.generation
+    key = cache.key(query, accept)
+    headers = {'Vary': 'Accept', 'ETag': cache.etag(key, generation)}
+
+    if (request is not None and request.method == 'GET'
+            and etag_matches(request.headers.get('if-none-match'), headers['ETag'])):
+        cache.count('not_modified')
+        return Response(status_code=304, headers=headers)
+
+    cached = cache.get(key, generation)
+    if cached is not None:
+        return Response(cached.body, media_type=cached.media_type, headers=headers)
+
+    # Identical requests while the query runs share its execution
+    chunks = cache.flight(
+        key, generation,
+        lambda disconnected: executor.stream(
+            lambda cancel, emit: run_query(query, cancel, emit, accept), disconnected=disconnected
+        ),
+        disconnected=request.is_disconnected if request is not None else None
+    )
     try:
-        start_time = time.time()
-
-        # Execute query
-        query_results = store.query(query)
-
-        # Handle SELECT queries
-        if hasattr(query_results, 'variables'):
-            vars = [str(v).lstrip('?') for v in query_results.variables]
-            results_list = list(query_results)
-            query_time = time.time() - start_time
-
-            bindings = []
-            for result in results_list:
-                binding = {}
-                for var in vars:
-                    try:
-                        value = result[var]
-                        if value is not None:
-                            value_str = str(value)
-
-                            if value_str.startswith('<') and value_str.endswith('>'):
-                                binding[var] = {'type': 'uri', 'value': value_str[1:-1]}
-                            elif '^^' in value_str:
-                                parts = value_str.split('^^')
-                                binding[var] = {
-                                    'type': 'literal',
-                                    'value': parts[0].strip('"'),
-                                    'datatype': parts[1].strip('<>')
-                                }
-                            elif value_str.startswith('"'):
-                                binding[var] = {'type': 'literal', 'value': value_str.strip('"')}
-                            elif value_str.startswith('http'):
-                                binding[var] = {'type': 'uri', 'value': value_str}
-                            else:
-                                binding[var] = {'type': 'literal', 'value': value_str}
-                    except (KeyError, IndexError):
-                        continue
-
-                if binding:
-                    bindings.append(binding)
-
-            return JSONResponse({
-                "head": {"vars": vars},
-                "results": {"bindings": bindings},
-                "metadata": {
-                    "resultCount": len(bindings),
-                    "queryTime": f"{query_time:.3f}s"
-                }
-            })
+        media_type = await anext(chunks)
+    except QueryTimeout:
+        raise HTTPException(status_code=504, detail=f"Query timed out after {executor.timeout}s")
+    except QueryCancelled:
+        raise HTTPException(status_code=499, detail="Client closed request")
 
-        # Handle ASK queries
-        elif isinstance(query_results, bool):
-            return JSONResponse({"boolean": query_results})
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
-        # Handle CONSTRUCT queries
-        else:
-            results_list = list(query_results)
-            return JSONResponse({
-                "triples": [str(t) for t in results_list],
-                "count": len(results_list)
-            })
 
+def run_query(query: str, cancel: threading.Event, emit: Callable[[Any], None], accept: Optional[str] = None):
+    """Execute a SPARQL query and emit the media type and body chunks (runs on a query worker)."""
+    start_time = time.time()
+    try:
+        results = store.query(query)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Query error: {str(e)}")
 
+    def metadata(count: int) -> Dict[str, Any]:
+        return {"metadata": {"resultCount": count, "queryTime": f"{time.time() - start_time:.3f}s"}}
+
+    try:
+        media_type = result_media_type(results, accept)
+    except NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+    emit(media_type)
+    write_results(results, media_type, emit, cancel, footer=metadata)
+
 
 @app.get("/ontologies")
 async def get_ontology_index():
@@ -661,6 +684,8 @@ async def load_file_to_graph(
     """Load an RDF file from rdf-data-input into a specific named graph."""
     if store is None:
         raise HTTPException(status_code=500, detail="Store not initialized")
+    if store_read_only:
+        raise HTTPException(status_code=403, detail="Store is read-only")
 
     input_dir = os.path.join(BASE_DIR, "rdf-data-input")
     filepath = os.path.join(input_dir, file.replace("/", os.sep))
@@ -678,8 +703,7 @@ async def load_file_to_graph(
     if not success:
         raise HTTPException(status_code=400, detail=f"Unsupported file format: {file}")
 
-    # Recount
-    count = len([q for q in store.quads_for_pattern(None, None, None, NamedNode(graph_uri))])
+    count = store_stats.graph_count(graph_uri)
 
     return JSONResponse({
         "message": f"Loaded {file} into <{graph_uri}>",
@@ -691,25 +715,26 @@ async def load_file_to_graph(
 @app.post("/api/graphs/reload")
 async def reload_all_graphs():
     """Reload all files from rdf-data-input, each into its own named graph."""
-    global store
-    store = Store()
+    global store, store_stats
+    if store_read_only:
+        raise HTTPException(status_code=403, detail="Store is read-only")
+    if store_path:
+        # The on-disk store stays open; empty it instead of replacing it
+        store.clear()
+    else:
+        store = Store()
+    store_stats = StoreStats(store, empty=True)
+    # Responses of the replaced data are never served again
+    cache.clear()
     input_dir = os.path.join(BASE_DIR, "rdf-data-input")
 
     if os.path.exists(input_dir):
         load_rdf_directory_recursive(input_dir)
 
-    # Recount
-    graphs = set()
-    total = 0
-    for quad in store:
-        total += 1
-        if quad.graph_name:
-            graphs.add(str(quad.graph_name))
-
     return JSONResponse({
         "message": "Reloaded all files",
-        "totalQuads": total,
-        "namedGraphs": len(graphs)
+        "totalQuads": store_stats.total,
+        "namedGraphs": len(store_stats.named_graphs)
     })
 
 
@@ -1385,6 +1410,8 @@ async def get_individual_details(uri: str = Query(..., description="Individual U
 
 
 def main():
+    global executor, cache
+
     parser = argparse.ArgumentParser(
         description="Batch SPARQL Server",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -1402,18 +1429,37 @@ Examples:
     python rdf-workbench.py
     python rdf-workbench.py --port 8080
     python rdf-workbench.py --rdf-input /path/to/custom/rdf-folder
+    python rdf-workbench.py --store-path stores/workbench --read-only
         """
     )
     parser.add_argument("--rdf-input", "-r",
                         default=None,
                         help="Path to RDF input directory (default: ./rdf-data-input)")
+    parser.add_argument("--store-path",
+                        default=None,
+                        help="Directory of an on-disk RocksDB store (default: in-memory store)")
+    parser.add_argument("--read-only", action="store_true",
+                        help="Serve an existing on-disk store without write access (no writer may have it open)")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind")
     parser.add_argument("--port", "-p", type=int, default=7878, help="Port")
+    parser.add_argument("--query-workers", type=int, default=executor.max_workers,
+                        help="Queries run at once")
+    parser.add_argument("--query-timeout", type=float, default=executor.timeout,
+                        help="Seconds before a query is cancelled")
+    parser.add_argument("--cache-entries", type=int, default=cache.max_entries,
+                        help="Query responses cached (0 disables the cache)")
+    parser.add_argument("--cache-bytes", type=int, default=cache.max_bytes,
+                        help="Total bytes of the cached query responses")
+    parser.add_argument("--no-coalesce", action="store_false", dest="coalesce", default=cache.coalesce,
+                        help="Run every request, also identical ones sent while a query runs")
 
     args = parser.parse_args()
 
+    executor = QueryExecutor(max_workers=args.query_workers, timeout=args.query_timeout)
+    cache = QueryCache(max_entries=args.cache_entries, max_bytes=args.cache_bytes, coalesce=args.coalesce)
+
     # Initialize store before starting server
-    if not initialize_store(args.rdf_input):
+    if not initialize_store(args.rdf_input, path=args.store_path, read_only=args.read_only):
         print("[ERROR] Failed to initialize store. Exiting.")
         return
 
@@ -29,6 +29,8 @@ from pyoxigraph import (
     Store, Quad, Triple, NamedNode, BlankNode, Literal, RdfFormat
 )
 
+from store_stats import StoreStats
+
 # =========================================================================
 # Namespace URIs - match rdf_star_transform_v2.py for consistency
 # =========================================================================
@@ -337,7 +339,7 @@ def main(config_path):
     print(f"[{datetime.now()}] RDF-Star export complete: {output_path}")
     print(f"✓ Total triples: {triple_count}")
     print(f"✓ Total RDF-Star provenance quads: {rdf_star_count}")
-    print(f"✓ Total quads in store: {len(list(store))}")
+    print(f"✓ Total quads in store: {StoreStats(store).total}")
 
     return store
 
@@ -30,6 +30,8 @@ from pyoxigraph import (
 )
 
 from yarrrml_parser import YARRRMLParser, TriplesMap
+from store_io import bulk_add, open_store
+from store_stats import StoreStats
 
 
 def add_dataset_metadata(store, config, prefixes):
@@ -158,12 +160,19 @@ def create_rdf_node(value_template: str, row: Dict[str, Any], prefixes: Dict[str
 class RDFStarETLEngine:
     """Dynamic RDF-star ETL Engine driven by YARRRML-star mappings"""
 
-    def __init__(self, config_path: str):
-        """Initialize the ETL engine with configuration"""
+    def __init__(self, config_path: str, store_path: Optional[str] = None):
+        """
+        Initialize the ETL engine with configuration
+
+        Args:
+            config_path: Path to the pipeline configuration file
+            store_path: Optional directory of an on-disk (RocksDB) store to use
+                        instead of an in-memory store
+        """
         self.config_path = config_path
         self.config = None
         self.parser = None
-        self.store = Store()
+        self.store = open_store(store_path)
         self.prefixes = {}
         self.dataframes = {}  # Cache for loaded CSV dataframes
         self.triples_cache = {}  # Cache triples for quoted triple references
@@ -240,6 +249,8 @@ class RDFStarETLEngine:
             self.stats['files_processed'] += 1
             self.processed_files.add(source.path)
 
+        quads_batch = []
+
         # Process each row
         for row_dict in df.iter_rows(named=True):
 
@@ -258,7 +269,7 @@ class RDFStarETLEngine:
                     NamedNode(expand_uri('rdf:type', self.prefixes)),
                     NamedNode(type_full_uri)
                 )
-                self.store.add(Quad(
+                quads_batch.append(Quad(
                     subject,
                     NamedNode(expand_uri('rdf:type', self.prefixes)),
                     NamedNode(type_full_uri)
@@ -285,12 +296,14 @@ class RDFStarETLEngine:
 
                 # Create and store triple
                 triple = Triple(subject, predicate, obj)
-                self.store.add(Quad(subject, predicate, obj))
+                quads_batch.append(Quad(subject, predicate, obj))
                 self.stats['triples_generated'] += 1
 
                 # Cache this triple for potential quoted triple references
                 self._cache_triple(tm_name, row_dict, triple)
 
+        bulk_add(self.store, quads_batch)
+
         print(f"  ✓ Generated triples for {df.height} rows")
 
     def _cache_triple(self, tm_name: str, row_data: Dict, triple: Triple):
@@ -325,6 +338,8 @@ class RDFStarETLEngine:
         source = tm.sources[0]
         df = self.load_csv_data(source.path)
 
+        quads_batch = []
+
         # Process each row and match with cached triples
         for row_dict in df.iter_rows(named=True):
             # Find matching triples from the referenced map
@@ -342,7 +357,7 @@ class RDFStarETLEngine:
                 reifier = BlankNode()
 
                 # Link reifier to the base triple using rdf:reifies
-                self.store.add(Quad(
+                quads_batch.append(Quad(
                     reifier,
                     NamedNode(expand_uri('rdf:reifies', self.prefixes)),
                     base_triple
@@ -361,9 +376,11 @@ class RDFStarETLEngine:
                         po.datatype
                     )
 
-                    self.store.add(Quad(reifier, predicate, obj))
+                    quads_batch.append(Quad(reifier, predicate, obj))
                     self.stats['quoted_triples_generated'] += 1
 
+        bulk_add(self.store, quads_batch)
+
         print(f"  ✓ Generated quoted triples annotations for {df.height} rows")
 
     def _find_matching_triples(self, ref_tm_name: str, row_dict: Dict,
@@ -449,7 +466,7 @@ class RDFStarETLEngine:
         print(f"Rows processed: {self.stats['rows_processed']}")
         print(f"Triples generated: {self.stats['triples_generated']}")
         print(f"Quoted triple annotations: {self.stats['quoted_triples_generated']}")
-        print(f"Total quads in store: {len(list(self.store))}")
+        print(f"Total quads in store: {StoreStats(self.store).total}")
         print(f"{'='*80}\n")
 
     def _write_output(self):
@@ -17,7 +17,6 @@ import polars as pl
 import os
 import re
 from datetime import datetime, timezone
-from io import BytesIO
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from functools import lru_cache
@@ -27,6 +26,9 @@ from pyoxigraph import (
 )
 
 from yarrrml_parser import YARRRMLParser, TriplesMap
+from store_io import bulk_add, open_store, write_store
+from store_stats import StoreStats
+from template_expressions import compile_template, compile_iri_reference
 
 # Pre-compile regex patterns for performance
 TEMPLATE_VAR_PATTERN = re.compile(r'\$\(([^)]+)\)')
@@ -126,41 +128,32 @@ def expand_uri(uri_template: str, prefixes: Dict[str, str]) -> str:
     return expand_uri_cached(uri_template, tuple(prefixes.items()))
 
 
-def instantiate_template_vectorized(template: str, df: pl.DataFrame, prefixes: Dict[str, str]) -> List[str]:
+def instantiate_template_vectorized(template: str, df: pl.DataFrame, prefixes: Dict[str, str]) -> pl.Series:
     """
-    Batch template instantiation - processes DataFrame efficiently
-    Returns list of instantiated URIs
+    Batch template instantiation - evaluates the compiled Polars expression
+    for the template and returns one Utf8 column of instantiated values
     """
-    # Extract variables from template
-    variables = TEMPLATE_VAR_PATTERN.findall(template)
-
-    # Convert to dict records (more efficient than iter_rows for this use case)
-    records = df.to_dicts()
-
-    results = []
-    for row in records:
-        result = template
-        for var in variables:
-            value = row.get(var, '')
-            sanitized = sanitize_uri_component(value)
-            result = result.replace(f"$({var})", sanitized)
-
-        result = result.replace('~iri', '')
-        result = expand_uri(result, prefixes)
-        results.append(result)
-
-    return results
+    expr = compile_template(template, prefixes, df.schema)
+    # with_columns broadcasts constant templates to the frame height
+    return df.with_columns(expr.alias('__template_value')).get_column('__template_value')
 
 
 class RDFStarETLEngineOptimized:
     """Optimized RDF-star ETL Engine with vectorized operations"""
 
-    def __init__(self, config_path: str):
-        """Initialize the ETL engine with configuration"""
+    def __init__(self, config_path: str, store_path: Optional[str] = None):
+        """
+        Initialize the ETL engine with configuration
+
+        Args:
+            config_path: Path to the pipeline configuration file
+            store_path: Optional directory of an on-disk (RocksDB) store to use
+                        instead of an in-memory store
+        """
         self.config_path = config_path
         self.config = None
         self.parser = None
-        self.store = Store()
+        self.store = open_store(store_path)
         self.prefixes = {}
         self.dataframes = {}
         self.triples_cache = {}
@@ -238,7 +231,7 @@ class RDFStarETLEngineOptimized:
         if not tm.subject.template:
             return
 
-        subject_uris = instantiate_template_vectorized(tm.subject.template, df, self.prefixes)
+        subject_uris = instantiate_template_vectorized(tm.subject.template, df, self.prefixes).to_list()
 
         # Batch create triples for type statements
         quads_batch = []
@@ -280,19 +273,14 @@ class RDFStarETLEngineOptimized:
             if po.object_type == "iri" and po.value.strip().startswith('$(') and po.value.strip().endswith(')'):
                 col_name = po.value.strip()[2:-1]
                 if col_name in df.columns:
-                    # Get column as list for batch processing
-                    col_values = df[col_name].to_list()
+                    # Absolute IRIs pass through, other values use the template
+                    obj_uris = df.select(
+                        compile_iri_reference(po.value, self.prefixes, df.schema).alias('value')
+                    ).to_series().to_list()
 
                     for i in range(df.height):
-                        value = col_values[i]
                         subject = NamedNode(subject_uris[i])
-
-                        if value and (str(value).startswith('http://') or str(value).startswith('https://')):
-                            obj = NamedNode(str(value))
-                        else:
-                            # Fallback to template
-                            obj_uri = subject_uris[i]  # Or compute properly
-                            obj = NamedNode(obj_uri)
+                        obj = NamedNode(obj_uris[i])
 
                         triple = Triple(subject, predicate, obj)
                         quad = create_quad_with_graph(subject, predicate, obj, po_graph, self.prefixes)
@@ -305,7 +293,7 @@ class RDFStarETLEngineOptimized:
                 # Handle literals with vectorized operations
                 if po.object_type == "literal":
                     # Vectorize literal creation
-                    value_series = instantiate_template_vectorized(po.value, df, self.prefixes)
+                    value_series = instantiate_template_vectorized(po.value, df, self.prefixes).to_list()
 
                     for i in range(df.height):
                         subject = NamedNode(subject_uris[i])
@@ -329,7 +317,7 @@ class RDFStarETLEngineOptimized:
                         })
                 else:
                     # IRI objects with templates
-                    obj_uris = instantiate_template_vectorized(po.value, df, self.prefixes)
+                    obj_uris = instantiate_template_vectorized(po.value, df, self.prefixes).to_list()
 
                     for i in range(df.height):
                         subject = NamedNode(subject_uris[i])
@@ -344,8 +332,7 @@ class RDFStarETLEngineOptimized:
                         })
 
         # Bulk insert into store
-        for quad in quads_batch:
-            self.store.add(quad)
+        bulk_add(self.store, quads_batch)
 
         self.stats['triples_generated'] += len(quads_batch)
 
@@ -454,8 +441,7 @@ class RDFStarETLEngineOptimized:
                         self.stats['quoted_triples_generated'] += 1
 
             # Bulk insert
-            for quad in quads_batch:
-                self.store.add(quad)
+            bulk_add(self.store, quads_batch)
 
         print(f"  [OK] Generated quoted triples annotations for {df.height} rows")
 
@@ -533,7 +519,7 @@ class RDFStarETLEngineOptimized:
         print(f"Rows processed: {self.stats['rows_processed']}")
         print(f"Triples generated: {self.stats['triples_generated']}")
         print(f"Quoted triple annotations: {self.stats['quoted_triples_generated']}")
-        print(f"Total quads in store: {len(list(self.store))}")
+        print(f"Total quads in store: {StoreStats(self.store).total}")
         print(f"{'='*80}\n")
 
     def _write_output(self):
@@ -548,51 +534,19 @@ class RDFStarETLEngineOptimized:
         print(f"\n[{datetime.now()}] Writing output to: {output_path}")
         print(f"[{datetime.now()}] Format: {rdf_format}")
 
-        prefix_lines = []
-        for prefix, uri in self.prefixes.items():
-            prefix_lines.append(f"@prefix {prefix}: <{uri}> .")
-
-        if 'rdf' not in self.prefixes:
-            prefix_lines.append("@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .")
-        if 'rdfs' not in self.prefixes:
-            prefix_lines.append("@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .")
-
-        prefix_block = '\n'.join(prefix_lines) + '\n\n'
+        prefixes = dict(self.prefixes)
+        prefixes.setdefault('rdf', 'http://www.w3.org/1999/02/22-rdf-syntax-ns#')
+        prefixes.setdefault('rdfs', 'http://www.w3.org/2000/01/rdf-schema#')
 
-        # Serialize to TriG format
-        buffer = BytesIO()
-        self.store.dump(buffer, RdfFormat.TRIG)
-        content = buffer.getvalue().decode('utf-8')
-        buffer.close()  # Explicitly close buffer
-
-        # Remove auto-generated prefixes
-        lines = content.split('\n')
-        filtered_lines = [line for line in lines
-                         if not (line.strip().startswith('@prefix') or line.strip().startswith('PREFIX'))]
-
-        # Combine prefixes with content
-        final_content = prefix_block + '\n'.join(filtered_lines)
-
-        # Write to file with explicit flush and close
+        # Serialize straight into the file (N-Quads when configured, else TriG)
+        output_format = RdfFormat.N_QUADS if rdf_format.upper() in ('NQUADS', 'N-QUADS') else RdfFormat.TRIG
         try:
-            with open(output_path, 'w', encoding='utf-8', buffering=1) as f:
-                f.write(final_content)
-                f.flush()  # Force flush to disk
-                os.fsync(f.fileno())  # Force OS to write to disk
+            file_size = write_store(self.store, output_path, output_format, prefixes=prefixes)
         except Exception as e:
             print(f"[ERROR] Failed to write output: {e}")
             raise
 
-        # Verify file was written completely
-        if os.path.exists(output_path):
-            file_size = os.path.getsize(output_path)
-            expected_size = len(final_content.encode('utf-8'))
-            if file_size == expected_size:
-                print(f"[{datetime.now()}] [OK] Output written successfully ({file_size:,} bytes)")
-            else:
-                print(f"[{datetime.now()}] [WARNING] File size mismatch: wrote {file_size:,}, expected {expected_size:,}")
-        else:
-            print(f"[{datetime.now()}] [ERROR] Output file not found after write")
+        print(f"[{datetime.now()}] [OK] Output written successfully ({file_size:,} bytes)")
 
 
 def main():
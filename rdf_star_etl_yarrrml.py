@@ -14,33 +14,65 @@ derived from the YARRRML specification:
 
 Usage:
     python rdf_star_etl_yarrrml.py <mapping_file.yaml> [output_file.trig]
+    python rdf_star_etl_yarrrml.py <mapping_file.yaml> [output_file.nq] --streaming [--chunk-rows N]
+    python rdf_star_etl_yarrrml.py <mapping_file.yaml> [output_file.trig] --workers N
+    python rdf_star_etl_yarrrml.py <mapping_file.yaml> [output_file.trig] --store-path <store_dir>
 
 Example:
     python rdf_star_etl_yarrrml.py mappings/data_products_rml.yaml
     python rdf_star_etl_yarrrml.py mappings/my_mapping.yaml output/result.trig
+    python rdf_star_etl_yarrrml.py mappings/loans.yaml output/loans.nq --streaming --chunk-rows 500000
+    python rdf_star_etl_yarrrml.py mappings/loans.yaml output/loans.nq --emit-mode nquads --workers 16
 
 =============================================================================
 """
 
 import polars as pl
 import os
+import hashlib
 import re
+import io
+import shutil
 import argparse
+import tempfile
+import contextlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from io import BytesIO
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from functools import lru_cache
 
 from pyoxigraph import (
-    Store, Quad, Triple, NamedNode, BlankNode, Literal, RdfFormat
+    Store, Quad, NamedNode, Literal, RdfFormat
 )
 
 from yarrrml_parser import YARRRMLParser, TriplesMap
+from store_io import (
+    IngestReport, bulk_load_bytes, bulk_load_file, file_digest, open_store, rdf_format_for_path,
+    write_store,
+)
+from store_stats import StoreStats, DEFAULT_GRAPH, RDF_REIFIES, store_is_empty
+from template_expressions import compile_template, compile_iri_reference
+from columnar_emitter import (
+    quad_frame, iri_term, literal_term, concat_frames, to_nquads, write_nquads, QUAD_COLUMNS
+)
 
 # Pre-compile regex patterns for performance
 TEMPLATE_VAR_PATTERN = re.compile(r'\$\(([^)]+)\)')
 URI_SANITIZE_PATTERN = re.compile(r'[^\w\-.]')
 
+# Emission modes: load generated quads into the store, or write them
+# straight to an N-Quads output file as they are produced
+EMIT_MODES = ('store', 'nquads')
+
+# Rows per chunk in streaming mode
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Predicate id of a cached triple (index into the specs of its triples map)
+PRED_ID_DTYPE = pl.UInt16
+
 
 @lru_cache(maxsize=10000)
 def sanitize_uri_component_cached(value: str) -> str:
@@ -74,6 +106,14 @@ def expand_uri(uri_template: str, prefixes: Dict[str, str]) -> str:
     return expand_uri_cached(uri_template, tuple(prefixes.items()))
 
 
+def content_digest(values: pl.Series) -> pl.Series:
+    """Hex SHA-256 digest (first 128 bits) of each string, stable across Polars versions"""
+    return pl.Series([
+        None if value is None else hashlib.sha256(value.encode()).hexdigest()[:32]
+        for value in values
+    ], dtype=pl.Utf8)
+
+
 def create_quad_with_graph(subject, predicate, obj, graph_uri: Optional[str], prefixes: Dict[str, str]) -> Quad:
     """Create a Quad with optional named graph"""
     if graph_uri:
@@ -83,24 +123,50 @@ def create_quad_with_graph(subject, predicate, obj, graph_uri: Optional[str], pr
         return Quad(subject, predicate, obj)
 
 
-def instantiate_template_vectorized(template: str, df: pl.DataFrame, prefixes: Dict[str, str]) -> List[str]:
-    """Batch template instantiation - processes DataFrame efficiently"""
-    variables = TEMPLATE_VAR_PATTERN.findall(template)
-    records = df.to_dicts()
+def map_source_group(mapping_file: str, source_path: str, tm_names: List[str], shard_path: str,
+                     streaming: bool, chunk_rows: int, graph: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Worker task: map one source through its regular triples maps.
 
-    results = []
-    for row in records:
-        result = template
-        for var in variables:
-            value = row.get(var, '')
-            sanitized = sanitize_uri_component(value)
-            result = result.replace(f"$({var})", sanitized)
+    Runs in a pool process. Quads are written to an N-Quads shard file;
+    triples caches come back as Arrow IPC buffers so the parent can run
+    the quoted-triples pass.
 
-        result = result.replace('~iri', '')
-        result = expand_uri(result, prefixes)
-        results.append(result)
+    Returns:
+        Dict with 'stats', 'caches' (name -> IPC bytes) and the console 'log'
+    """
+    engine = RDFStarETLEngine(mapping_file, shard_path, emit_mode='nquads',
+                              streaming=streaming, chunk_rows=chunk_rows, graph=graph)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        engine.load_mapping()
+        with open(shard_path, 'wb') as shard:
+            engine._nquads_out = shard
+            triples_maps = [(name, engine.parser.triples_maps[name]) for name in tm_names]
+            if streaming:
+                engine.process_source_streaming(source_path, triples_maps)
+            else:
+                for tm_name, tm in triples_maps:
+                    engine.process_triples_map_vectorized(tm_name, tm)
+            engine._nquads_out = None
+
+    caches = {}
+    for tm_name, cache in engine.triples_cache.items():
+        buffer = BytesIO()
+        cache.write_ipc(buffer)
+        caches[tm_name] = buffer.getvalue()
+
+    return {'stats': engine.stats, 'caches': caches, 'log': log.getvalue()}
 
-    return results
+
+def instantiate_template_vectorized(template: str, df: pl.DataFrame, prefixes: Dict[str, str]) -> pl.Series:
+    """
+    Batch template instantiation - evaluates the compiled Polars expression
+    for the template and returns one Utf8 column of instantiated values
+    """
+    expr = compile_template(template, prefixes, df.schema)
+    # with_columns broadcasts constant templates to the frame height
+    return df.with_columns(expr.alias('__template_value')).get_column('__template_value')
 
 
 class RDFStarETLEngine:
@@ -115,24 +181,84 @@ class RDFStarETLEngine:
     - authors: From YARRRML authors section
     """
 
-    def __init__(self, mapping_file: str, output_file: Optional[str] = None):
+    def __init__(self, mapping_file: str, output_file: Optional[str] = None,
+                 emit_mode: str = 'store', streaming: bool = False,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int = 1,
+                 store_path: Optional[str] = None, store: Optional[Store] = None,
+                 store_stats: Optional[StoreStats] = None, graph: Optional[str] = None,
+                 write_output: bool = True, background_output: bool = False):
         """
         Initialize the ETL engine with a YARRRML mapping file.
 
         Args:
             mapping_file: Path to the YARRRML mapping file
             output_file: Optional output file path (overrides targets in YARRRML)
+            emit_mode: 'store' loads quads into the in-memory store and writes
+                       it at the end (N-Quads for .nq/.nquads outputs, else
+                       TriG); 'nquads' writes quad frames straight to the
+                       output file as N-Quads
+            streaming: Scan sources lazily and process them chunk by chunk, so
+                       peak memory depends on chunk_rows rather than input size
+                       (implies emit_mode='nquads')
+            chunk_rows: Number of source rows per chunk in streaming mode
+            workers: Number of processes for the regular triples maps; maps
+                     are grouped by source and the groups run in parallel
+            store_path: Directory of an on-disk (RocksDB) store to load the quads
+                        into instead of an in-memory store; quads it already
+                        holds are kept and written to the output as well
+            store: Existing store to load the quads into (e.g. the store of a
+                   BatchManager), usually together with graph
+            store_stats: Statistics of that store, kept up to date by the run
+            graph: Load every quad into this named graph instead of the
+                   graphs of the mapping; only this graph is written out
+            write_output: Write the output file (store mode only; the store
+                          may be all the caller needs)
+            background_output: Write the output file in a background thread;
+                               run() returns once the store is loaded and
+                               wait_for_output() waits for the file
         """
+        if emit_mode not in EMIT_MODES:
+            raise ValueError(f"Unknown emit mode: {emit_mode} (expected one of {EMIT_MODES})")
+        if chunk_rows < 1:
+            raise ValueError(f"chunk_rows must be positive, got {chunk_rows}")
+        if workers < 1:
+            raise ValueError(f"workers must be positive, got {workers}")
+        if streaming:
+            # The store would grow with the input, so quads always go to the output file
+            emit_mode = 'nquads'
+        if store is not None and store_path:
+            raise ValueError("Pass either store or store_path, not both")
+        if emit_mode == 'nquads' and (store is not None or not write_output):
+            raise ValueError("The nquads emit mode writes the output file, not a given store")
+
         self.mapping_file = mapping_file
         self.mapping_dir = os.path.dirname(os.path.abspath(mapping_file))
         self.output_file = output_file
+        self.emit_mode = emit_mode
+        self.streaming = streaming
+        self.chunk_rows = chunk_rows
+        self.workers = workers
+        self.graph = graph
+        self.write_output = write_output
+        self.background_output = background_output
+        self._nquads_out = None
+        self._output_thread = None
+        self._output_error = None
+        self.graph_quads = 0
+        self.ingest_report = IngestReport()
 
         self.parser = None
-        self.store = Store()
+        self.store_path = store_path
+        self.shared_store = store is not None
+        self.store = store if store is not None else open_store(store_path)
+        if store_stats is None:
+            store_stats = StoreStats(self.store, empty=store_is_empty(self.store))
+        self.store_stats = store_stats
         self.prefixes = {}
         self.base_iri = None
         self.dataframes = {}
         self.triples_cache = {}
+        self.quoted_refs = set()
         self.processed_files = set()
 
         # Pre-expanded URIs for common predicates
@@ -143,7 +269,8 @@ class RDFStarETLEngine:
             'triples_generated': 0,
             'quoted_triples_generated': 0,
             'rows_processed': 0,
-            'files_processed': 0
+            'files_processed': 0,
+            'quads_written': 0
         }
 
     def load_mapping(self):
@@ -168,6 +295,12 @@ class RDFStarETLEngine:
         # Pre-expand common URIs
         self.rdf_type_uri = expand_uri('rdf:type', self.prefixes)
 
+        # Triples maps whose output some quoted map annotates
+        self.quoted_refs = {
+            tm.subject.quoted_mapping_ref for tm in self.parser.triples_maps.values()
+            if tm.subject.is_quoted and tm.subject.quoted_mapping_ref
+        }
+
         # Determine output file
         if not self.output_file:
             self.output_file = self._determine_output_file()
@@ -195,9 +328,34 @@ class RDFStarETLEngine:
                         return access.split('~')[0]
                     return access
 
-        # Default: same name as mapping file but with .trig extension
+        # Default: same name as mapping file but with .trig (or .nq) extension
         base_name = os.path.splitext(os.path.basename(self.mapping_file))[0]
-        return os.path.join(self.mapping_dir, 'output', f'{base_name}_output.trig')
+        extension = 'nq' if self.emit_mode == 'nquads' else 'trig'
+        return os.path.join(self.mapping_dir, 'output', f'{base_name}_output.{extension}')
+
+    def source_fingerprint(self) -> Optional[str]:
+        """
+        SHA-256 over the mapping file and every source file it reads.
+
+        Loads the mapping if needed. Two runs with the same fingerprint map
+        the same input with the same mapping.
+
+        Returns:
+            Hex digest, or None if a source is not a local file (database,
+            HTTP, SPARQL), since its content cannot be fingerprinted
+        """
+        if self.parser is None:
+            self.load_mapping()
+
+        digest = file_digest(self.mapping_file)
+        paths = {source.path for tm in self.parser.triples_maps.values() for source in tm.sources}
+        for path in sorted(paths):
+            resolved = self._resolve_source_path(path)
+            if not os.path.isfile(resolved):
+                return None
+            digest.update(f"\n{path}\n".encode())
+            file_digest(resolved, digest)
+        return digest.hexdigest()
 
     def _resolve_source_path(self, source_path: str) -> str:
         """Resolve source path relative to mapping file directory"""
@@ -237,14 +395,38 @@ class RDFStarETLEngine:
 
         print(f"[{datetime.now()}] Loading CSV: {resolved_path}")
 
+        df = self.scan_csv_data(csv_path).collect()
+        self.dataframes[csv_path] = df
+        print(f"[{datetime.now()}] Loaded {df.height} rows x {df.width} columns from {resolved_path}")
+
+        return df
+
+    def scan_csv_data(self, csv_path: str) -> pl.LazyFrame:
+        """
+        Lazily scan the columns of a CSV source that the mapping references.
+
+        Only the projected columns are parsed, and they are read as Utf8 so
+        no dtype inference runs; values keep their lexical form from the file.
+        """
+        resolved_path = self._resolve_source_path(csv_path)
+
         if not os.path.exists(resolved_path):
             raise FileNotFoundError(f"Source file not found: {resolved_path}")
 
-        df = pl.read_csv(resolved_path, ignore_errors=True)
-        self.dataframes[csv_path] = df
-        print(f"[{datetime.now()}] Loaded {df.height} rows from {resolved_path}")
+        scan = pl.scan_csv(resolved_path, infer_schema=False, ignore_errors=True)
+        header = scan.collect_schema().names()
+        required = set(self._required_columns(csv_path))
+        columns = [name for name in header if name in required]
 
-        return df
+        # Keep one column for mappings that reference none, so the row count survives
+        if not columns and header:
+            columns = header[:1]
+
+        return scan.select(columns)
+
+    def _required_columns(self, csv_path: str) -> List[str]:
+        """Columns of a source referenced by the mapping (templates and join keys)"""
+        return self.parser.get_required_columns_for_source(csv_path)
 
     def add_metadata(self):
         """Add metadata about the ETL source/process"""
@@ -258,45 +440,56 @@ class RDFStarETLEngine:
         dataset_uri = f"{base}dataset/etl_import"
 
         dataset = NamedNode(dataset_uri)
+        graph = NamedNode(self.graph) if self.graph else None
+        metadata = []
 
         # Add type
-        self.store.add(Quad(
+        metadata.append(Quad(
             dataset,
             NamedNode(expand_uri('rdf:type', self.prefixes)),
-            NamedNode(expand_uri('dcat:Dataset', self.prefixes))
+            NamedNode(expand_uri('dcat:Dataset', self.prefixes)),
+            graph
         ))
 
         # Add title
-        self.store.add(Quad(
+        metadata.append(Quad(
             dataset,
             NamedNode(expand_uri('dct:title', self.prefixes)),
-            Literal("ETL Pipeline Generated Dataset")
+            Literal("ETL Pipeline Generated Dataset"),
+            graph
         ))
 
         # Add description
-        self.store.add(Quad(
+        metadata.append(Quad(
             dataset,
             NamedNode(expand_uri('dct:description', self.prefixes)),
-            Literal(f"Generated from YARRRML mapping: {os.path.basename(self.mapping_file)}")
+            Literal(f"Generated from YARRRML mapping: {os.path.basename(self.mapping_file)}"),
+            graph
         ))
 
         # Add created timestamp
-        self.store.add(Quad(
+        metadata.append(Quad(
             dataset,
             NamedNode(expand_uri('dct:created', self.prefixes)),
             Literal(datetime.now(timezone.utc).isoformat(),
-                    datatype=NamedNode(expand_uri('xsd:dateTime', self.prefixes)))
+                    datatype=NamedNode(expand_uri('xsd:dateTime', self.prefixes))),
+            graph
         ))
 
         # Add authors if present
         for author in self.parser.authors:
             author_name = author.get('name', author.get('webid', 'Unknown'))
-            self.store.add(Quad(
+            metadata.append(Quad(
                 dataset,
                 NamedNode(expand_uri('dct:creator', self.prefixes)),
-                Literal(author_name)
+                Literal(author_name),
+                graph
             ))
 
+        self.store.extend(metadata)
+        self.ingest_report.merge(IngestReport(quads=len(metadata)))
+        self.store_stats.add(len(metadata), graph=self.graph or DEFAULT_GRAPH, annotations=0)
+
         print(f"[{datetime.now()}] Added ETL metadata")
 
     def process_triples_map_vectorized(self, tm_name: str, tm: TriplesMap):
@@ -321,38 +514,55 @@ class RDFStarETLEngine:
         if not tm.subject.template:
             return
 
-        subject_uris = instantiate_template_vectorized(tm.subject.template, df, self.prefixes)
+        quads = self.build_quad_frame(tm, df)
+
+        # Bulk insert into store
+        self._ingest_quad_frame(quads.select(QUAD_COLUMNS))
+
+        self.stats['triples_generated'] += quads.height
+
+        # Only count rows from this file once
+        if source.path not in self.processed_files:
+            self.stats['rows_processed'] += df.height
+            self.stats['files_processed'] += 1
+            self.processed_files.add(source.path)
+
+        # Quoted maps re-derive the triples they annotate from the retained
+        # source frame, so only (row, predicate) references are cached
+        if tm_name in self.quoted_refs:
+            cache = quads.select(['row_idx', 'pred_id'])
+            self.triples_cache[tm_name] = cache
+            print(f"  [OK] Cached {cache.height} triple references ({cache.estimated_size() / 1024:.0f} KB)")
+
+        print(f"  [OK] Generated {quads.height} triples for {df.height} rows")
+
+    def quad_specs(self, tm: TriplesMap,
+                   schema: Dict[str, pl.DataType]) -> Tuple[pl.Expr, List[Tuple[str, pl.Expr, Optional[str]]]]:
+        """
+        Compile the subject and the (predicate, object, graph) specs of a triples map.
 
-        # Batch create triples for type statements
-        quads_batch = []
-        triples_for_cache = []
+        Type statements come first, then predicate-objects; the position of a
+        spec in the list is its predicate id in the triples cache.
+
+        Returns:
+            Subject term expression and a list of (predicate IRI, object term
+            expression, graph IRI or None)
+        """
+        subject = iri_term(compile_template(tm.subject.template, self.prefixes, schema))
 
         # Determine graph for mapping-level
         mapping_graph = tm.graphs[0] if tm.graphs else None
         subject_graph = tm.subject.graphs[0] if tm.subject.graphs else None
         default_graph = mapping_graph or subject_graph
 
+        specs = []
+
         for type_uri in tm.type_statements:
             type_full_uri = expand_uri(type_uri, self.prefixes)
-            type_node = NamedNode(type_full_uri)
-            rdf_type_node = NamedNode(self.rdf_type_uri)
-
-            for i in range(df.height):
-                subject = NamedNode(subject_uris[i])
-                triple = Triple(subject, rdf_type_node, type_node)
+            specs.append((self.rdf_type_uri, iri_term(type_full_uri), self._expand_graph(default_graph)))
 
-                quad = create_quad_with_graph(subject, rdf_type_node, type_node, default_graph, self.prefixes)
-                quads_batch.append(quad)
-
-                triples_for_cache.append({
-                    'row_idx': i,
-                    'triple': triple
-                })
-
-        # Batch create triples for predicate-objects
         for po in tm.predicate_objects:
             predicate_uri = expand_uri(po.predicate, self.prefixes)
-            predicate = NamedNode(predicate_uri)
 
             # Determine graph for this predicate-object (PO graph > default graph)
             po_graph = po.graphs[0] if po.graphs else default_graph
@@ -360,202 +570,341 @@ class RDFStarETLEngine:
             # Check if object is IRI with direct column reference
             if po.object_type == "iri" and po.value.strip().startswith('$(') and po.value.strip().endswith(')'):
                 col_name = po.value.strip()[2:-1]
-                if col_name in df.columns:
-                    col_values = df[col_name].to_list()
-
-                    for i in range(df.height):
-                        value = col_values[i]
-                        subject = NamedNode(subject_uris[i])
-
-                        if value and (str(value).startswith('http://') or str(value).startswith('https://')):
-                            obj = NamedNode(str(value))
-                        else:
-                            obj_uri = instantiate_template_vectorized(po.value, df[i:i+1], self.prefixes)[0]
-                            obj = NamedNode(obj_uri)
-
-                        triple = Triple(subject, predicate, obj)
-                        quad = create_quad_with_graph(subject, predicate, obj, po_graph, self.prefixes)
-                        quads_batch.append(quad)
-                        triples_for_cache.append({
-                            'row_idx': i,
-                            'triple': triple
-                        })
+                if col_name not in schema:
+                    continue
+                # Absolute IRIs pass through, other values use the template
+                obj = iri_term(compile_iri_reference(po.value, self.prefixes, schema))
+            elif po.object_type == "literal":
+                datatype_uri = expand_uri(po.datatype, self.prefixes) if po.datatype else None
+                obj = literal_term(compile_template(po.value, self.prefixes, schema),
+                                   datatype=datatype_uri, language=po.language)
             else:
-                # Handle literals with vectorized operations
-                if po.object_type == "literal":
-                    value_series = instantiate_template_vectorized(po.value, df, self.prefixes)
-
-                    for i in range(df.height):
-                        subject = NamedNode(subject_uris[i])
-                        value = value_series[i]
-
-                        if po.datatype:
-                            datatype_uri = expand_uri(po.datatype, self.prefixes)
-                            obj = Literal(value, datatype=NamedNode(datatype_uri))
-                        elif po.language:
-                            obj = Literal(value, language=po.language)
-                        else:
-                            obj = Literal(value)
-
-                        triple = Triple(subject, predicate, obj)
-                        quad = create_quad_with_graph(subject, predicate, obj, po_graph, self.prefixes)
-                        quads_batch.append(quad)
-                        triples_for_cache.append({
-                            'row_idx': i,
-                            'triple': triple
-                        })
-                else:
-                    # IRI objects with templates
-                    obj_uris = instantiate_template_vectorized(po.value, df, self.prefixes)
-
-                    for i in range(df.height):
-                        subject = NamedNode(subject_uris[i])
-                        obj = NamedNode(obj_uris[i])
-
-                        triple = Triple(subject, predicate, obj)
-                        quad = create_quad_with_graph(subject, predicate, obj, po_graph, self.prefixes)
-                        quads_batch.append(quad)
-                        triples_for_cache.append({
-                            'row_idx': i,
-                            'triple': triple
-                        })
+                # IRI objects with templates
+                obj = iri_term(compile_template(po.value, self.prefixes, schema))
 
-        # Bulk insert into store
-        for quad in quads_batch:
-            self.store.add(quad)
+            specs.append((predicate_uri, obj, self._expand_graph(po_graph)))
 
-        self.stats['triples_generated'] += len(quads_batch)
-
-        # Only count rows from this file once
-        if source.path not in self.processed_files:
-            self.stats['rows_processed'] += df.height
-            self.stats['files_processed'] += 1
-            self.processed_files.add(source.path)
+        return subject, specs
 
-        # Cache triples with row data
-        if tm_name not in self.triples_cache:
-            self.triples_cache[tm_name] = []
+    def build_quad_frame(self, tm: TriplesMap, df: pl.DataFrame,
+                         carry: Tuple[str, ...] = ()) -> pl.DataFrame:
+        """
+        Build the quads of a triples map as a frame of N-Quads terms.
 
-        df_dicts = df.to_dicts()
+        Each type statement and predicate-object is evaluated as one frame of
+        (row_idx, s, p, o, g, pred_id) columns; no pyoxigraph objects are
+        created. A LazyFrame source gives a LazyFrame result. Source columns
+        named in carry are kept between the quad columns and pred_id.
+        """
+        schema = df.collect_schema()
+        subject, specs = self.quad_specs(tm, schema)
+
+        frames = [
+            quad_frame(df, subject, predicate_uri, obj, graph_iri,
+                       with_row_index=True, carry=carry)
+            .with_columns(pl.lit(pred_id, dtype=PRED_ID_DTYPE).alias('pred_id'))
+            for pred_id, (predicate_uri, obj, graph_iri) in enumerate(specs)
+        ]
 
-        for item in triples_for_cache:
-            row_idx = item['row_idx']
-            row_dict = df_dicts[row_idx]
-            self.triples_cache[tm_name].append({
-                'row_data': row_dict,
-                'triple': item['triple']
-            })
+        if not frames:
+            empty = concat_frames([]).insert_column(0, pl.Series('row_idx', [], dtype=pl.UInt32))
+            for name in carry:
+                empty = empty.with_columns(pl.lit(None, dtype=schema[name]).alias(name))
+            empty = empty.with_columns(pl.lit(None, dtype=PRED_ID_DTYPE).alias('pred_id'))
+            return empty.lazy() if isinstance(df, pl.LazyFrame) else empty
+        return pl.concat(frames, how='vertical')
+
+    def _expand_graph(self, graph_uri: Optional[str]) -> Optional[str]:
+        """Expand an optional graph template to a full IRI"""
+        return expand_uri(graph_uri, self.prefixes) if graph_uri else None
+
+    def _ingest_quad_frame(self, quads: pl.DataFrame):
+        """Load a frame of N-Quads terms into the store, or write it to the N-Quads output"""
+        if quads.height == 0:
+            return
+        if self.graph:
+            quads = quads.with_columns(g=pl.lit(f"<{self.graph}>"))
+        if self._nquads_out is not None:
+            write_nquads(quads, self._nquads_out)
+            self.stats['quads_written'] += quads.height
+        else:
+            # The frame size is recorded; frames may repeat quads, so the
+            # counts are corrected once at the end of the run (_finish_store_counts)
+            report = bulk_load_bytes(self.store, to_nquads(quads), RdfFormat.N_QUADS,
+                                     quads=quads.height)
+            self.ingest_report.merge(report)
+            self._record_store_counts(quads, report.quads)
+
+    def _record_store_counts(self, quads: pl.DataFrame, added: int):
+        """Update the store statistics with a frame of quads loaded into the store"""
+        graphs = quads['g'].unique()
+        graph = None
+        if len(graphs) == 1:
+            graph = graphs[0][1:-1] if graphs[0] else DEFAULT_GRAPH
+        annotations = (quads['p'] == f"<{RDF_REIFIES}>").sum()
+        self.store_stats.add(added, graph=graph, annotations=annotations)
+
+    def process_source_streaming(self, source_path: str, triples_maps: List[Tuple[str, TriplesMap]]):
+        """
+        Stream one source through every regular triples map that reads it.
 
-        print(f"  [OK] Generated {len(triples_for_cache)} triples for {df.height} rows")
+        The source is scanned lazily and collected in chunks of chunk_rows
+        rows; each chunk is mapped by all triples maps, written out and
+        released before the next chunk is read.
+        """
+        names = ', '.join(name for name, _ in triples_maps)
+        print(f"\n[{datetime.now()}] Streaming source: {source_path} ({names})")
+
+        scan = self.scan_csv_data(source_path)
+        rows = 0
+        triples = 0
+
+        for chunk in scan.collect_batches(chunk_size=self.chunk_rows):
+            for _, tm in triples_maps:
+                quads = self.build_quad_frame(tm, chunk)
+                self._ingest_quad_frame(quads.select(QUAD_COLUMNS))
+                triples += quads.height
+            rows += chunk.height
+
+        self.stats['triples_generated'] += triples
+        if source_path not in self.processed_files:
+            self.stats['rows_processed'] += rows
+            self.stats['files_processed'] += 1
+            self.processed_files.add(source_path)
 
-    def process_quoted_triples_map(self, tm_name: str, tm: TriplesMap):
-        """Process quoted triples map (RDF-star annotations)"""
-        print(f"\n[{datetime.now()}] Processing quoted triples map: {tm_name}")
+        print(f"  [OK] Generated {triples} triples for {rows} rows")
 
-        if not tm.subject.is_quoted or not tm.subject.quoted_mapping_ref:
+    def process_sources_parallel(self):
+        """
+        Run the regular triples maps in a process pool.
+
+        Triples maps reading the same source form one task, so each source is
+        read once; tasks over different sources are independent (quoted maps
+        only depend on their referenced map and run afterwards in this
+        process). Each task writes an N-Quads shard; shards and triples caches
+        are merged in mapping order, so the output does not depend on which
+        task finishes first.
+        """
+        groups = self._source_groups()
+        if not groups:
             return
 
-        # Build lookup for cached triples
-        all_cached_triples = []
-        for cache_name, cache_list in self.triples_cache.items():
-            all_cached_triples.extend(cache_list)
+        workers = min(self.workers, len(groups))
+        print(f"[{datetime.now()}] Mapping {len(groups)} sources with {workers} worker processes")
+
+        shard_dir = tempfile.mkdtemp(prefix='etl_shards_')
+        # Spawned workers: forking a process that already runs Polars threads can deadlock
+        context = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                tasks = []
+                for index, (source_path, triples_maps) in enumerate(groups.items()):
+                    shard_path = os.path.join(shard_dir, f'shard_{index:05d}.nq')
+                    future = pool.submit(
+                        map_source_group, os.path.abspath(self.mapping_file), source_path,
+                        [name for name, _ in triples_maps], shard_path,
+                        self.streaming, self.chunk_rows, self.graph
+                    )
+                    tasks.append((source_path, shard_path, future))
+
+                for source_path, shard_path, future in tasks:
+                    self._merge_source_group(source_path, shard_path, future.result())
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    def _merge_source_group(self, source_path: str, shard_path: str, result: Dict[str, Any]):
+        """Merge the shard, triples caches and statistics of one worker task"""
+        print(result['log'], end='')
+
+        if self._nquads_out is not None:
+            with open(shard_path, 'rb') as shard:
+                shutil.copyfileobj(shard, self._nquads_out)
+            self.stats['quads_written'] += result['stats']['quads_written']
+        else:
+            report = bulk_load_file(self.store, shard_path, RdfFormat.N_QUADS,
+                                    quads=result['stats']['quads_written'])
+            self.ingest_report.merge(report)
+            # Shards hold regular triples maps only, which do not annotate
+            self.store_stats.add(report.quads, graph=self.graph, annotations=0)
+
+        for tm_name, buffer in result['caches'].items():
+            self.triples_cache[tm_name] = pl.read_ipc(BytesIO(buffer))
+
+        for key in ('triples_generated', 'rows_processed', 'files_processed'):
+            self.stats[key] += result['stats'][key]
+        self.processed_files.add(source_path)
+
+    def _source_groups(self) -> Dict[str, List[Tuple[str, TriplesMap]]]:
+        """Group the regular triples maps by the source they read (mapping order)"""
+        groups = {}
+        for tm_name, tm in self.parser.triples_maps.items():
+            if tm.subject.is_quoted:
+                continue
+            if not tm.sources:
+                print(f"\n[{datetime.now()}] [WARNING] {tm_name}: No sources defined, skipping")
+                continue
+            if not tm.subject.template:
+                continue
+            groups.setdefault(tm.sources[0].path, []).append((tm_name, tm))
+        return groups
+
+    def build_annotation_frame(self, tm: TriplesMap, matches: pl.DataFrame,
+                               reifier_ns: str) -> pl.DataFrame:
+        """
+        Build the annotation quads for joined (annotation row, base triple) pairs.
 
-        if not all_cached_triples:
-            print(f"  [WARNING] No cached triples found")
-            return
+        Each match gets one reifier with an rdf:reifies triple term and one
+        quad per annotation predicate-object. Reifiers are skolem IRIs hashed
+        from the reified triple and the annotation values, so reloading the
+        same annotations yields the same quads (blank nodes would be relabeled
+        by every load and show up as changed in every batch delta).
 
-        if not tm.sources:
-            return
+        Args:
+            tm: Quoted triples map
+            matches: Annotation source columns joined with base triple terms s, p, o
+            reifier_ns: Namespace of the reifier IRIs, unique per quoted map
+        """
+        schema = matches.collect_schema()
+        objects = []
+        for po in tm.predicate_objects:
+            predicate_uri = expand_uri(po.predicate, self.prefixes)
+            value = compile_template(po.value, self.prefixes, schema)
+            if po.object_type == "iri":
+                obj = iri_term(value)
+            else:
+                datatype_uri = expand_uri(po.datatype, self.prefixes) if po.datatype else None
+                obj = literal_term(value, datatype=datatype_uri, language=po.language)
+            objects.append((predicate_uri, obj))
+
+        # N-Triples terms never hold a raw newline, so the key is unambiguous;
+        # the digest (unlike Expr.hash) names the same reifier in every version
+        key = pl.concat_str(
+            [pl.col('s'), pl.col('p'), pl.col('o')] + [obj.fill_null('') for _, obj in objects],
+            separator='\n',
+        )
+        reifier = pl.concat_str([
+            pl.lit(f"<{reifier_ns}"),
+            key.map_batches(content_digest, return_dtype=pl.Utf8, is_elementwise=True),
+            pl.lit('>'),
+        ])
+        base_triple = pl.concat_str([
+            pl.lit('<<( '), pl.col('s'), pl.lit(' '), pl.col('p'), pl.lit(' '), pl.col('o'), pl.lit(' )>>'),
+        ])
+
+        frames = [quad_frame(matches, reifier, expand_uri('rdf:reifies', self.prefixes), base_triple)]
+        for predicate_uri, obj in objects:
+            frames.append(quad_frame(matches, reifier, predicate_uri, obj))
+
+        return concat_frames(frames)
+
+    def _release_source_frames(self):
+        """Drop the source frames that the quoted-triples pass does not read"""
+        needed = {
+            tm.sources[0].path for tm in self.parser.triples_maps.values()
+            if tm.sources and (tm.subject.is_quoted or tm.name in self.quoted_refs)
+        }
+        for path in list(self.dataframes):
+            if path not in needed:
+                del self.dataframes[path]
 
-        source = tm.sources[0]
-        df = self.load_csv_data(source.path)
+    def _annotation_targets(self, ref_name: str, ref_tm: TriplesMap,
+                            parent_key: str) -> Optional[pl.LazyFrame]:
+        """
+        Triples of the referenced map with the str2 join key of their source row.
+
+        The in-memory path takes them from the triples cache; the streaming
+        path rebuilds them lazily from a scan of the referenced source.
 
-        # Extract join key
-        join_key = self._extract_join_key(tm.subject.join_condition)
-
-        if join_key:
-            # Create index for cached triples
-            cached_index = {}
-            for cached in all_cached_triples:
-                key_value = cached['row_data'].get(join_key)
-                triple_subject_uri = str(cached['triple'].subject)
-                if '/dataset/' in triple_subject_uri and key_value:
-                    if key_value not in cached_index:
-                        cached_index[key_value] = []
-                    cached_index[key_value].append(cached)
-
-            # Batch process quoted triples
-            quads_batch = []
-
-            for row_dict in df.iter_rows(named=True):
-                join_value = row_dict.get(join_key)
-                matching_triples = cached_index.get(join_value, [])
-
-                for cached_triple_data in matching_triples:
-                    base_triple = cached_triple_data['triple']
-                    reifier = BlankNode()
-
-                    # rdf:reifies link
-                    quads_batch.append(Quad(
-                        reifier,
-                        NamedNode(expand_uri('rdf:reifies', self.prefixes)),
-                        base_triple
-                    ))
-
-                    # Add annotation properties
-                    for po in tm.predicate_objects:
-                        predicate_uri = expand_uri(po.predicate, self.prefixes)
-                        predicate = NamedNode(predicate_uri)
-
-                        if po.object_type == "iri":
-                            obj_uri = self._instantiate_template_single(po.value, row_dict)
-                            obj = NamedNode(obj_uri)
-                        else:
-                            value = self._instantiate_template_single(po.value, row_dict)
-                            if po.datatype:
-                                datatype_uri = expand_uri(po.datatype, self.prefixes)
-                                obj = Literal(value, datatype=NamedNode(datatype_uri))
-                            elif po.language:
-                                obj = Literal(value, language=po.language)
-                            else:
-                                obj = Literal(value)
-
-                        quads_batch.append(Quad(reifier, predicate, obj))
-                        self.stats['quoted_triples_generated'] += 1
-
-            # Bulk insert
-            for quad in quads_batch:
-                self.store.add(quad)
-
-        print(f"  [OK] Generated quoted triples annotations for {df.height} rows")
-
-    def _extract_join_key(self, join_condition: Optional[Dict]) -> Optional[str]:
-        """Extract join key from join condition"""
-        if not join_condition:
+        Returns:
+            LazyFrame with columns __join_key, s, p, o (None if unavailable)
+        """
+        if self.streaming:
+            scan = self.scan_csv_data(ref_tm.sources[0].path)
+            if parent_key not in scan.collect_schema():
+                return None
+            keyed = scan.with_columns(pl.col(parent_key).alias('__join_key'))
+            return self.build_quad_frame(ref_tm, keyed, carry=('__join_key',)).select(
+                ['__join_key', 's', 'p', 'o'])
+
+        cache = self.triples_cache.get(ref_name)
+        if cache is None or cache.height == 0:
+            return None
+        df = self.load_csv_data(ref_tm.sources[0].path)
+        if parent_key not in df.columns:
             return None
 
-        equal_params = join_condition.get('equal', '')
-        str1_match = re.search(r'str1=\$\(([^)]+)\)', equal_params)
+        # Re-derive the cached triples, one predicate at a time, from the source rows
+        keyed = df.with_columns(pl.col(parent_key).alias('__join_key'))
+        subject, specs = self.quad_specs(ref_tm, keyed.schema)
+        frames = []
+        for (pred_id,), refs in cache.partition_by('pred_id', as_dict=True, maintain_order=True).items():
+            predicate_uri, obj, _ = specs[pred_id]
+            rows = keyed.select(pl.all().gather(refs.get_column('row_idx')))
+            frames.append(quad_frame(rows, subject, predicate_uri, obj, carry=('__join_key',)))
+
+        return pl.concat(frames, how='vertical').select(['__join_key', 's', 'p', 'o']).lazy()
+
+    def process_quoted_triples_map(self, tm_name: str, tm: TriplesMap):
+        """
+        Process quoted triples map (RDF-star annotations).
+
+        The annotation source is hash-joined with the output of the referenced
+        triples map (quoted_mapping_ref) on the equal(str1, str2) keys, and the
+        annotation predicate-objects are computed as columns of the matches.
+        In streaming mode the base triples are streamed through the join and
+        matches are written chunk by chunk.
+        """
+        print(f"\n[{datetime.now()}] Processing quoted triples map: {tm_name}")
+
+        if not tm.subject.is_quoted or not tm.subject.quoted_mapping_ref or not tm.sources:
+            return
 
-        if str1_match:
-            return str1_match.group(1)
+        ref_name = tm.subject.quoted_mapping_ref
+        ref_tm = self.parser.triples_maps.get(ref_name)
+        if ref_tm is None or ref_tm.subject.is_quoted or not ref_tm.sources:
+            print(f"  [WARNING] Referenced triples map not found: {ref_name}")
+            return
 
-        return None
+        child_key, parent_key = self.parser.get_join_keys(tm)
+        if not child_key or not parent_key:
+            print(f"  [WARNING] No equal(str1, str2) join condition, skipping")
+            return
 
-    def _instantiate_template_single(self, template: str, row_dict: Dict[str, Any]) -> str:
-        """Instantiate template for a single row"""
-        result = template
+        targets = self._annotation_targets(ref_name, ref_tm, parent_key)
+        if targets is None:
+            print(f"  [WARNING] No triples found for {ref_name}")
+            return
 
-        variables = TEMPLATE_VAR_PATTERN.findall(template)
-        for var in variables:
-            value = row_dict.get(var, '')
-            sanitized_value = sanitize_uri_component(value)
-            result = result.replace(f"$({var})", sanitized_value)
+        source_path = tm.sources[0].path
+        if self.streaming:
+            annotations = self.scan_csv_data(source_path)
+        else:
+            annotations = self.load_csv_data(source_path).lazy()
+        if child_key not in annotations.collect_schema():
+            print(f"  [WARNING] Join column not found in source: {child_key}")
+            return
+
+        # Only the annotation rows are held in the hash table
+        matches = targets.join(
+            annotations.with_columns(pl.col(child_key).alias('__join_key')),
+            on='__join_key', how='inner'
+        )
+        if self.streaming:
+            chunks = matches.collect_batches(chunk_size=self.chunk_rows)
+        else:
+            chunks = [matches.collect()]
 
-        result = result.replace('~iri', '')
-        result = expand_uri(result, self.prefixes)
+        base = self.base_iri or 'http://example.org/'
+        map_label = re.sub(r'\W', '_', tm_name)
+        reifier_ns = f"{base}.well-known/genid/{map_label}/"
+        emitted = 0
+        for chunk in chunks:
+            quads = self.build_annotation_frame(tm, chunk, reifier_ns)
+            self._ingest_quad_frame(quads)
+            emitted += chunk.height
+            self.stats['quoted_triples_generated'] += chunk.height * len(tm.predicate_objects)
 
-        return result
+        print(f"  [OK] Annotated {emitted} triples of {ref_name}")
 
     def run(self):
         """Execute the complete ETL pipeline"""
@@ -566,7 +915,16 @@ class RDFStarETLEngine:
         print(f"Started at: {start_time}")
         print(f"Mapping file: {self.mapping_file}")
 
-        self.load_mapping()
+        if self.parser is None:
+            self.load_mapping()
+
+        if self.store_path:
+            print(f"[{datetime.now()}] On-disk store: {self.store_path}")
+            if self.store_stats.total:
+                print(f"[{datetime.now()}] Store already holds {self.store_stats.total} quads (kept in the output)")
+
+        if self.emit_mode == 'nquads':
+            self._open_nquads_output()
 
         # Add metadata
         self.add_metadata()
@@ -576,9 +934,18 @@ class RDFStarETLEngine:
         print(f"Pass 1: Processing regular triples maps")
         print(f"{'='*80}")
 
-        for tm_name, tm in self.parser.triples_maps.items():
-            if not tm.subject.is_quoted:
-                self.process_triples_map_vectorized(tm_name, tm)
+        if self.streaming:
+            print(f"[{datetime.now()}] Streaming mode: {self.chunk_rows} rows per chunk")
+        if self.workers > 1:
+            self.process_sources_parallel()
+        elif self.streaming:
+            for source_path, triples_maps in self._source_groups().items():
+                self.process_source_streaming(source_path, triples_maps)
+        else:
+            for tm_name, tm in self.parser.triples_maps.items():
+                if not tm.subject.is_quoted:
+                    self.process_triples_map_vectorized(tm_name, tm)
+            self._release_source_frames()
 
         # Pass 2: Quoted triples
         print(f"\n{'='*80}")
@@ -589,8 +956,16 @@ class RDFStarETLEngine:
             if tm.subject.is_quoted:
                 self.process_quoted_triples_map(tm_name, tm)
 
+        if self._nquads_out is None:
+            self._finish_store_counts()
+
         # Write output
-        self._write_output()
+        if self.background_output and self._nquads_out is None:
+            self._start_background_output()
+        else:
+            self._write_output()
+        if self.store_path:
+            self.store.flush()
 
         # Print statistics
         end_time = datetime.now()
@@ -604,47 +979,113 @@ class RDFStarETLEngine:
         print(f"Rows processed: {self.stats['rows_processed']}")
         print(f"Triples generated: {self.stats['triples_generated']}")
         print(f"Quoted triple annotations: {self.stats['quoted_triples_generated']}")
-        print(f"Total quads in store: {len(list(self.store))}")
-        print(f"Output file: {self.output_file}")
+        if self.emit_mode == 'nquads':
+            print(f"Quads written: {self.stats['quads_written']}")
+        else:
+            print(f"Store ingest: {self.ingest_report}")
+            if self.graph:
+                print(f"Quads in graph <{self.graph}>: {self.graph_quads}")
+            if not self.shared_store:
+                print(f"Total quads in store: {self.store_stats.total}")
+        if self.write_output:
+            print(f"Output file: {self.output_file}")
         print(f"{'='*80}\n")
 
-    def _write_output(self):
-        """Write RDF output to file"""
-        # Ensure output directory exists
+    def _open_nquads_output(self):
+        """Open the N-Quads output file that quad frames are streamed into"""
         output_dir = os.path.dirname(self.output_file)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        print(f"\n[{datetime.now()}] Writing output to: {self.output_file}")
+        print(f"[{datetime.now()}] Streaming N-Quads to: {self.output_file}")
+        self._nquads_out = open(self.output_file, 'wb')
 
-        # Build prefix block
-        prefix_lines = []
-        for prefix, uri in self.prefixes.items():
-            prefix_lines.append(f"@prefix {prefix}: <{uri}> .")
+    def _finish_nquads_output(self):
+        """Append the quads still held in the store (metadata, annotations) and close"""
+        quads_in_store = self.store_stats.total
+        self.store.dump(self._nquads_out, RdfFormat.N_QUADS)
+        self.stats['quads_written'] += quads_in_store
 
-        prefix_block = '\n'.join(prefix_lines) + '\n\n'
+        self._nquads_out.flush()
+        os.fsync(self._nquads_out.fileno())
+        self._nquads_out.close()
+        self._nquads_out = None
 
-        # Serialize to TriG format
-        buffer = BytesIO()
-        self.store.dump(buffer, RdfFormat.TRIG)
-        content = buffer.getvalue().decode('utf-8')
-        buffer.close()
+        file_size = os.path.getsize(self.output_file)
+        print(f"[{datetime.now()}] Output written successfully ({file_size:,} bytes)")
+
+    def _finish_store_counts(self):
+        """
+        Correct the store counts recorded per frame (frames may hold duplicate quads).
 
-        # Remove auto-generated prefixes
-        lines = content.split('\n')
-        filtered_lines = [line for line in lines
-                         if not (line.strip().startswith('@prefix') or line.strip().startswith('PREFIX'))]
+        The graph the run loaded into is recounted; a run into the whole
+        store leaves the counts to be recounted natively on their next read.
+        """
+        if self.graph:
+            self.graph_quads = self.store_stats.recount_graph(self.graph)
+        else:
+            self.store_stats.invalidate()
 
-        # Combine prefixes with content
-        final_content = prefix_block + '\n'.join(filtered_lines)
+    def _start_background_output(self):
+        """
+        Write the output file in a thread, so the loaded store can be used right away.
 
-        # Write to file
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(final_content)
-            f.flush()
-            os.fsync(f.fileno())
+        The thread writes a snapshot of what the run loaded: it returns once
+        the snapshot is taken, so quads written afterwards (e.g. the batch
+        metadata a batch manager adds on activation) are not in the output.
+        """
+        snapshot_taken = threading.Event()
+
+        def write():
+            try:
+                # Store iterators cannot move between threads; the thread takes its own
+                from_graph = NamedNode(self.graph) if self.graph else None
+                snapshot = self.store.quads_for_pattern(None, None, None, from_graph)
+                snapshot_taken.set()
+                self._write_output(snapshot)
+            except BaseException as e:
+                self._output_error = e
+            finally:
+                snapshot_taken.set()
+
+        self._output_thread = threading.Thread(target=write, name='etl-output', daemon=False)
+        self._output_thread.start()
+        snapshot_taken.wait()
+
+    def wait_for_output(self):
+        """Wait for a background output write and re-raise its error"""
+        if self._output_thread is not None:
+            self._output_thread.join()
+            self._output_thread = None
+        if self._output_error is not None:
+            error, self._output_error = self._output_error, None
+            raise error
+
+    def _write_output(self, snapshot: Optional[Iterable[Quad]] = None):
+        """Write RDF output to file (the quads of a store snapshot, if given)"""
+        if self._nquads_out is not None:
+            self._finish_nquads_output()
+            return
+        if not self.write_output:
+            return
 
-        file_size = os.path.getsize(self.output_file)
+        # Ensure output directory exists
+        output_dir = os.path.dirname(self.output_file)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        # .nq/.nquads outputs take the N-Quads fast path; the output holds named
+        # graphs, so extensions of triples formats still get TriG
+        rdf_format = rdf_format_for_path(self.output_file)
+        if not rdf_format.supports_datasets:
+            rdf_format = RdfFormat.TRIG
+        print(f"\n[{datetime.now()}] Writing {rdf_format.name} output to: {self.output_file}")
+
+        # Serialize straight into the file with the mapping prefixes; a run
+        # into a batch graph writes that graph only (as triples)
+        from_graph = NamedNode(self.graph) if self.graph else None
+        file_size = write_store(self.store, self.output_file, rdf_format,
+                                prefixes=self.prefixes, from_graph=from_graph, quads=snapshot)
         print(f"[{datetime.now()}] Output written successfully ({file_size:,} bytes)")
 
 
@@ -657,6 +1098,10 @@ def main():
 Examples:
     python rdf_star_etl_yarrrml.py mappings/data_products_rml.yaml
     python rdf_star_etl_yarrrml.py mappings/my_mapping.yaml output/result.trig
+    python rdf_star_etl_yarrrml.py mappings/my_mapping.yaml output/result.nq --emit-mode nquads
+    python rdf_star_etl_yarrrml.py mappings/loans.yaml output/loans.nq --streaming --chunk-rows 500000
+    python rdf_star_etl_yarrrml.py mappings/loans.yaml output/loans.nq --emit-mode nquads --workers 16
+    python rdf_star_etl_yarrrml.py mappings/loans.yaml output/loans.trig --store-path stores/loans
     python rdf_star_etl_yarrrml.py --help
         """
     )
@@ -673,6 +1118,41 @@ Examples:
         help='Output file path (optional, derived from YARRRML targets or mapping name)'
     )
 
+    parser.add_argument(
+        '--emit-mode',
+        choices=EMIT_MODES,
+        default='store',
+        help='store: build the in-memory store and write TriG (default); '
+             'nquads: stream quad frames straight to an N-Quads file'
+    )
+
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='Scan sources lazily and map them chunk by chunk with bounded memory '
+             '(writes N-Quads)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Worker processes for regular triples maps, grouped by source (default: 1)'
+    )
+
+    parser.add_argument(
+        '--chunk-rows',
+        type=int,
+        default=DEFAULT_CHUNK_ROWS,
+        help=f'Source rows per chunk in streaming mode (default: {DEFAULT_CHUNK_ROWS})'
+    )
+
+    parser.add_argument(
+        '--store-path',
+        default=None,
+        help='Directory of an on-disk RocksDB store to load into (default: in-memory store)'
+    )
+
     args = parser.parse_args()
 
     if not os.path.exists(args.mapping_file):
@@ -680,7 +1160,9 @@ Examples:
         return 1
 
     try:
-        engine = RDFStarETLEngine(args.mapping_file, args.output_file)
+        engine = RDFStarETLEngine(args.mapping_file, args.output_file, emit_mode=args.emit_mode,
+                                  streaming=args.streaming, chunk_rows=args.chunk_rows,
+                                  workers=args.workers, store_path=args.store_path)
         engine.run()
         return 0
     except Exception as e:
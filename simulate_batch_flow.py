@@ -23,6 +23,8 @@ from io import BytesIO
 
 from pyoxigraph import Store, Quad, Triple, NamedNode, BlankNode, Literal, RdfFormat
 
+from store_stats import StoreStats
+
 # Namespaces
 EX = "http://example.org/"
 BATCH = "http://example.org/batch/"
@@ -233,7 +235,7 @@ def simulate_batch_flow():
         f.write(final_content)
 
     print(f"  Saved to: {output_file}")
-    print(f"  Total quads: {len(list(store))}")
+    print(f"  Total quads: {StoreStats(store).total}")
 
     # =========================================================================
     # SUMMARY
@@ -0,0 +1,392 @@
+"""
+SPARQL Results
+==============
+
+Streaming serializers of query results, chosen by the Accept header:
+
+    SELECT              application/sparql-results+json (default), application/json,
+                        application/sparql-results+xml, text/csv, text/tab-separated-values,
+                        application/vnd.apache.arrow.stream, application/vnd.apache.parquet
+    ASK                 application/sparql-results+json (default), application/sparql-results+xml
+    CONSTRUCT/DESCRIBE  application/json (default: {"triples": [...], "count": n}),
+                        application/n-triples, text/turtle, application/rdf+xml
+
+JSON results follow the SPARQL 1.1 Query Results JSON format, with RDF-star
+triple terms as in SPARQL 1.2:
+
+    {"head": {"vars": ["s", "o"]},
+     "results": {"bindings": [
+         {"s": {"type": "uri", "value": "http://example.org/x"},
+          "o": {"type": "literal", "value": "1", "datatype": "http://www.w3.org/2001/XMLSchema#integer"}}]}}
+
+Terms are encoded by their class (NamedNode, BlankNode, Literal, Triple),
+not by parsing their string form, so literals holding quotes or '^^' come
+out unchanged. The body is produced in chunks of rows: a large SELECT is
+never held as a list of dicts, and the chunks go straight into a
+StreamingResponse (see QueryExecutor.stream).
+
+XML, CSV, TSV and the RDF formats are written by pyoxigraph's serializers
+as they iterate over the results. The columnar formats have one string
+column per variable (IRI, lexical form of a literal, blank node label or
+N-Triples form of a triple term; null if unbound), built in batches of
+COLUMNAR_ROWS rows: Arrow IPC is streamed batch by batch and reads into
+Polars without copying (pl.read_ipc_stream); Parquet keeps the batches
+(in columnar form) until the file footer can be written.
+"""
+
+import io
+import json
+import struct
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import polars as pl
+from pyoxigraph import (
+    BlankNode, Literal, NamedNode, QueryBoolean, QueryResultsFormat, QuerySolutions, RdfFormat, Triple
+)
+
+from query_executor import check_cancelled
+
+SPARQL_JSON = 'application/sparql-results+json'
+SPARQL_XML = 'application/sparql-results+xml'
+JSON = 'application/json'
+CSV = 'text/csv'
+TSV = 'text/tab-separated-values'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/vnd.apache.parquet'
+N_TRIPLES = 'application/n-triples'
+TURTLE = 'text/turtle'
+RDF_XML = 'application/rdf+xml'
+
+# Media types of each kind of result, the default first
+SOLUTIONS_FORMATS = [SPARQL_JSON, JSON, SPARQL_XML, CSV, TSV, ARROW_STREAM, PARQUET]
+BOOLEAN_FORMATS = [SPARQL_JSON, JSON, SPARQL_XML]
+TRIPLES_FORMATS = [JSON, N_TRIPLES, TURTLE, RDF_XML]
+
+_RESULTS_FORMATS = {SPARQL_XML: QueryResultsFormat.XML, CSV: QueryResultsFormat.CSV,
+                    TSV: QueryResultsFormat.TSV}
+_RDF_FORMATS = {N_TRIPLES: RdfFormat.N_TRIPLES, TURTLE: RdfFormat.TURTLE, RDF_XML: RdfFormat.RDF_XML}
+
+# Rows per chunk of a JSON body, bytes per chunk of the other bodies
+CHUNK_ROWS = 1000
+CHUNK_BYTES = 64 * 1024
+
+# Rows per batch of the columnar formats
+COLUMNAR_ROWS = 64 * 1024
+
+# End of an Arrow IPC stream
+_IPC_EOS = b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+
+class NotAcceptable(ValueError):
+    """None of the accepted media types can hold the results"""
+
+XSD_STRING = 'http://www.w3.org/2001/XMLSchema#string'
+
+# Extra top-level members written after the results: footer(row_count)
+Footer = Callable[[int], Dict[str, Any]]
+
+
+def term_to_json(term: Any) -> Dict[str, Any]:
+    """SPARQL JSON object of an RDF term"""
+    if isinstance(term, NamedNode):
+        return {'type': 'uri', 'value': term.value}
+    if isinstance(term, Literal):
+        result = {'type': 'literal', 'value': term.value}
+        if term.language:
+            result['xml:lang'] = term.language
+            if term.direction:
+                result['its:dir'] = term.direction
+        elif term.datatype.value != XSD_STRING:
+            result['datatype'] = term.datatype.value
+        return result
+    if isinstance(term, BlankNode):
+        return {'type': 'bnode', 'value': term.value}
+    if isinstance(term, Triple):
+        return {'type': 'triple', 'value': {
+            'subject': term_to_json(term.subject),
+            'predicate': term_to_json(term.predicate),
+            'object': term_to_json(term.object),
+        }}
+    raise TypeError(f"Not an RDF term: {term!r}")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _footer(footer: Optional[Footer], count: int) -> str:
+    if footer is None:
+        return ''
+    return ''.join(f',{_dumps(key)}:{_dumps(value)}' for key, value in footer(count).items())
+
+
+def _json_array_chunks(items: Iterator[str], counter: List[int],
+                       cancel: Optional[threading.Event], chunk_rows: int) -> Iterator[bytes]:
+    """Comma-separated JSON items in chunks of chunk_rows; counter[0] counts them"""
+    rows: List[str] = []
+    for item in items:
+        rows.append(item)
+        if len(rows) == chunk_rows:
+            if cancel is not None:
+                check_cancelled(cancel)
+            yield (',' if counter[0] else '').encode() + ','.join(rows).encode()
+            counter[0] += len(rows)
+            rows = []
+    if rows:
+        yield (',' if counter[0] else '').encode() + ','.join(rows).encode()
+        counter[0] += len(rows)
+
+
+def iter_solutions_json(
+    solutions: QuerySolutions,
+    cancel: Optional[threading.Event] = None,
+    footer: Optional[Footer] = None,
+    chunk_rows: int = CHUNK_ROWS
+) -> Iterator[bytes]:
+    """
+    Body chunks of SELECT results.
+
+    Args:
+        solutions: Results of store.query() for a SELECT query
+        cancel: Event of QueryExecutor; iteration stops once it is set
+        footer: Extra top-level members, given the number of rows
+        chunk_rows: Rows per chunk
+    """
+    variables = [variable.value for variable in solutions.variables]
+    yield f'{{"head":{{"vars":{_dumps(variables)}}},"results":{{"bindings":['.encode()
+
+    def bindings():
+        for solution in solutions:
+            # Unbound variables are left out of a binding
+            row = {}
+            for variable in variables:
+                term = solution[variable]
+                if term is not None:
+                    row[variable] = term_to_json(term)
+            yield _dumps(row)
+
+    count = [0]
+    yield from _json_array_chunks(bindings(), count, cancel, chunk_rows)
+    yield (']}' + _footer(footer, count[0]) + '}').encode()
+
+
+def iter_triples_json(
+    triples: Iterator[Triple],
+    cancel: Optional[threading.Event] = None,
+    footer: Optional[Footer] = None,
+    chunk_rows: int = CHUNK_ROWS
+) -> Iterator[bytes]:
+    """
+    Body chunks of CONSTRUCT/DESCRIBE results as {"triples": [N-Triples...], "count": n}.
+
+    Args:
+        triples: Results of store.query() for a CONSTRUCT or DESCRIBE query
+        cancel: Event of QueryExecutor; iteration stops once it is set
+        footer: Extra top-level members, given the number of triples
+        chunk_rows: Triples per chunk
+    """
+    yield b'{"triples":['
+    count = [0]
+    yield from _json_array_chunks((_dumps(str(triple)) for triple in triples), count, cancel, chunk_rows)
+    yield (f'],"count":{count[0]}' + _footer(footer, count[0]) + '}').encode()
+
+
+def negotiate(accept: Optional[str], offers: List[str]) -> Optional[str]:
+    """
+    The offered media type an Accept header prefers.
+
+    Highest quality wins; between equal qualities, the order of the
+    offers. An absent or empty header accepts the first offer.
+
+    Returns:
+        Media type, or None if none of the offers is acceptable
+    """
+    if not accept or not accept.strip():
+        return offers[0]
+
+    ranges = []
+    for position, item in enumerate(accept.split(',')):
+        media_range, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_range:
+            ranges.append((media_range.lower(), quality, position))
+
+    def quality(offer: str) -> float:
+        major = offer.split('/')[0]
+        # The most specific matching range decides
+        for pattern in (offer, f"{major}/*", "*/*"):
+            matches = [q for media_range, q, _ in ranges if media_range == pattern]
+            if matches:
+                return max(matches)
+        return 0.0
+
+    best = max(offers, key=lambda offer: (quality(offer), -offers.index(offer)))
+    return best if quality(best) > 0 else None
+
+
+def result_media_type(results: Any, accept: Optional[str] = None) -> str:
+    """
+    Media type to send query results in.
+
+    Args:
+        results: QuerySolutions, QueryBoolean or QueryTriples
+        accept: Accept header of the request
+
+    Raises:
+        NotAcceptable: No acceptable media type for this kind of result
+    """
+    if isinstance(results, QuerySolutions):
+        offers = SOLUTIONS_FORMATS
+    elif isinstance(results, QueryBoolean):
+        offers = BOOLEAN_FORMATS
+    else:
+        offers = TRIPLES_FORMATS
+    media_type = negotiate(accept, offers)
+    if media_type is None:
+        raise NotAcceptable(f"Results can be sent as {', '.join(offers)}")
+    return media_type
+
+
+class ChunkWriter:
+    """File-like object handing its output to emit() in chunks of CHUNK_BYTES"""
+
+    def __init__(self, emit: Callable[[bytes], None], cancel: Optional[threading.Event] = None,
+                 chunk_bytes: Optional[int] = None):
+        self.emit = emit
+        self.cancel = cancel
+        self.chunk_bytes = chunk_bytes or CHUNK_BYTES
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_bytes:
+            if self.cancel is not None:
+                check_cancelled(self.cancel)
+            self.emit(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def flush(self):
+        """Required by the serializers; chunks are only emitted when full"""
+
+    def close(self):
+        """Emit what is left"""
+        if self._buffer:
+            self.emit(bytes(self._buffer))
+            self._buffer.clear()
+
+
+def _term_value(term: Any) -> Optional[str]:
+    """Value of a term in a columnar result"""
+    if term is None:
+        return None
+    if isinstance(term, Triple):
+        return str(term)
+    return term.value
+
+
+def iter_solution_frames(solutions: QuerySolutions, cancel: Optional[threading.Event] = None,
+                         batch_rows: Optional[int] = None) -> Iterator[pl.DataFrame]:
+    """SELECT results as DataFrames of batch_rows rows (default COLUMNAR_ROWS; one string column per variable)"""
+    batch_rows = batch_rows or COLUMNAR_ROWS
+    variables = [variable.value for variable in solutions.variables]
+    schema = {variable: pl.String for variable in variables}
+    columns: List[List[Optional[str]]] = [[] for _ in variables]
+    rows = 0
+    batches = 0
+    for solution in solutions:
+        for column, variable in zip(columns, variables):
+            column.append(_term_value(solution[variable]))
+        rows += 1
+        if rows == batch_rows:
+            if cancel is not None:
+                check_cancelled(cancel)
+            yield pl.DataFrame(dict(zip(variables, columns)), schema=schema)
+            columns = [[] for _ in variables]
+            rows = 0
+            batches += 1
+    # At least one (possibly empty) batch, which carries the schema
+    if rows or not batches:
+        yield pl.DataFrame(dict(zip(variables, columns)), schema=schema)
+
+
+def _ipc_stream(frame: pl.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    frame.write_ipc_stream(buffer)
+    return buffer.getvalue()
+
+
+def _split_ipc_schema(data: bytes) -> Tuple[bytes, bytes]:
+    """Schema message and rest of an Arrow IPC stream"""
+    length = struct.unpack('<i', data[4:8])[0]
+    return data[:8 + length], data[8 + length:]
+
+
+def write_arrow_stream(frames: Iterator[pl.DataFrame], write: Callable[[bytes], Any]):
+    """
+    Write DataFrames of one schema as a single Arrow IPC stream.
+
+    Each frame is written as a stream of its own; the schema message is
+    kept from the first one and the end-of-stream marker from the last.
+    """
+    first = True
+    for frame in frames:
+        data = _ipc_stream(frame)[:-len(_IPC_EOS)]
+        write(data if first else _split_ipc_schema(data)[1])
+        first = False
+    write(_IPC_EOS)
+
+
+def write_results(
+    results: Any,
+    media_type: str,
+    emit: Callable[[bytes], None],
+    cancel: Optional[threading.Event] = None,
+    footer: Optional[Footer] = None
+):
+    """
+    Encode query results straight from their iterator.
+
+    Args:
+        results: QuerySolutions, QueryBoolean or QueryTriples
+        media_type: A media type of result_media_type()
+        emit: Called with each chunk of the body
+        cancel: Event of QueryExecutor; encoding stops once it is set
+        footer: Extra top-level members of JSON results, given the number of rows
+    """
+    if isinstance(results, QueryBoolean):
+        if media_type == SPARQL_XML:
+            emit(results.serialize(format=QueryResultsFormat.XML))
+        else:
+            emit(f'{{"head":{{}},"boolean":{_dumps(bool(results))}{_footer(footer, 1)}}}'.encode())
+        return
+
+    if media_type in (SPARQL_JSON, JSON):
+        if isinstance(results, QuerySolutions):
+            chunks = iter_solutions_json(results, cancel, footer)
+        else:
+            chunks = iter_triples_json(results, cancel, footer)
+        for chunk in chunks:
+            emit(chunk)
+        return
+
+    writer = ChunkWriter(emit, cancel)
+    if media_type in _RESULTS_FORMATS:
+        results.serialize(writer, _RESULTS_FORMATS[media_type])
+    elif media_type in _RDF_FORMATS:
+        results.serialize(writer, _RDF_FORMATS[media_type])
+    elif media_type == ARROW_STREAM:
+        write_arrow_stream(iter_solution_frames(results, cancel), writer.write)
+    elif media_type == PARQUET:
+        pl.concat(list(iter_solution_frames(results, cancel)), rechunk=False).write_parquet(writer)
+    else:
+        raise NotAcceptable(f"Unsupported media type: {media_type}")
+    writer.close()
@@ -0,0 +1,432 @@
+"""
+Bulk Store Ingest
+=================
+
+One ingest layer for everything that writes quads into a pyoxigraph Store:
+the ETL engines, the batch manager and the SPARQL servers.
+
+- bulk_add:        Quad objects, inserted in batches with Store.bulk_extend
+- bulk_load_bytes: Serialized RDF (e.g. N-Quads from the columnar emitter)
+- bulk_load_file:  RDF files, parsed and loaded by Store.bulk_load
+- copy_graph:      Copy one named graph into another store or graph
+- write_store:     Serialize a store (or one graph) straight into a file or
+                   stream, optionally gzip/zstd compressed
+- GraphView:       Read-only view of one graph, without copying its quads
+- open_store:      Open an in-memory store or a RocksDB store on disk
+- file_digest:     SHA-256 of an input file, read in chunks
+
+The bulk APIs skip the per-insert transaction of Store.add/Store.load, so
+they are much faster but not atomic: a failure part-way leaves the quads
+inserted so far in the store.
+
+Every ingest function returns an IngestReport with the quad count and rate.
+The count is taken from the input (quads passed in, or the statement lines
+of N-Quads/N-Triples bytes, duplicates included), never by counting the
+store, so ingesting into a large store costs the size of the input only.
+Files and other formats are loaded natively without a count (quads is None);
+callers that need one count the target graph afterwards (e.g.
+StoreStats.recount_graph).
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from pyoxigraph import Store, Quad, NamedNode, DefaultGraph, RdfFormat, serialize
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Quads per bulk_extend call
+DEFAULT_BATCH_SIZE = 100_000
+
+GraphName = Union[NamedNode, DefaultGraph]
+
+# Bytes read per chunk when hashing files
+HASH_CHUNK_SIZE = 1 << 20
+
+# Compression of write_store output by file extension
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+
+# Formats with one statement per line
+LINE_FORMATS = (RdfFormat.N_QUADS, RdfFormat.N_TRIPLES)
+
+# Lines of N-Quads/N-Triples without a statement (blank or comment)
+_EMPTY_LINE = re.compile(rb'^[ \t\r]*(?:#[^\n]*)?$', re.MULTILINE)
+
+
+@dataclass
+class IngestReport:
+    """Result of a bulk ingest (quads is None if the ingest was not counted)"""
+    quads: Optional[int] = 0
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Quads per second"""
+        return self.quads / self.seconds if self.quads is not None and self.seconds > 0 else 0.0
+
+    def merge(self, other: 'IngestReport'):
+        """Accumulate another report into this one"""
+        if self.quads is not None and other.quads is not None:
+            self.quads += other.quads
+        else:
+            self.quads = None
+        self.seconds += other.seconds
+
+    def __str__(self) -> str:
+        if self.quads is None:
+            return f"loaded in {self.seconds:.2f}s (not counted)"
+        return f"{self.quads:,} quads in {self.seconds:.2f}s ({self.rate:,.0f} quads/s)"
+
+
+def _batches(quads: Iterable[Quad], batch_size: int) -> Iterator[List[Quad]]:
+    """Split an iterable of quads into lists of at most batch_size quads"""
+    iterator = iter(quads)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _in_graph(quads: Iterable[Quad], graph: GraphName) -> Iterator[Quad]:
+    """Rewrite quads into another graph"""
+    for quad in quads:
+        yield Quad(quad.subject, quad.predicate, quad.object, graph)
+
+
+def count_statements(data: bytes) -> int:
+    """Number of statements in N-Quads/N-Triples data (lines that are not blank or comments)"""
+    return data.count(b'\n') + 1 - len(_EMPTY_LINE.findall(data))
+
+
+def bulk_add(store: Store, quads: Iterable[Quad], batch_size: int = DEFAULT_BATCH_SIZE,
+             to_graph: Optional[GraphName] = None) -> IngestReport:
+    """
+    Insert quads in batches with Store.bulk_extend.
+
+    Args:
+        store: Target store
+        quads: Quads to insert (any iterable, consumed lazily)
+        batch_size: Quads per bulk_extend call
+        to_graph: Optional graph that replaces the graph of every quad
+
+    Returns:
+        IngestReport (quads counts the quads passed in, duplicates included)
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    if to_graph is not None:
+        quads = _in_graph(quads, to_graph)
+
+    report = IngestReport()
+    start = time.perf_counter()
+    for batch in _batches(quads, batch_size):
+        store.bulk_extend(batch)
+        report.quads += len(batch)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def bulk_load_bytes(store: Store, data: bytes, rdf_format: RdfFormat,
+                    to_graph: Optional[GraphName] = None,
+                    base_iri: Optional[str] = None,
+                    quads: Optional[int] = None) -> IngestReport:
+    """
+    Parse and load serialized RDF with Store.bulk_load.
+
+    Args:
+        store: Target store
+        data: Serialized RDF
+        rdf_format: Format of the data
+        to_graph: Graph for triples formats (ignored by quad formats' own graphs)
+        base_iri: Optional base IRI for relative IRIs
+        quads: Number of quads in the data, if the caller knows it
+
+    Returns:
+        IngestReport (quads counts the quads in the data: the given count or
+        the statement lines of N-Quads/N-Triples; None for other formats)
+    """
+    if not data:
+        return IngestReport()
+
+    start = time.perf_counter()
+    store.bulk_load(data, rdf_format, base_iri=base_iri, to_graph=to_graph)
+    seconds = time.perf_counter() - start
+    if quads is None and rdf_format in LINE_FORMATS:
+        quads = count_statements(data)
+    return IngestReport(quads=quads, seconds=seconds)
+
+
+def bulk_load_file(store: Store, path: str, rdf_format: RdfFormat,
+                   to_graph: Optional[GraphName] = None,
+                   base_iri: Optional[str] = None,
+                   quads: Optional[int] = None) -> IngestReport:
+    """
+    Load an RDF file with Store.bulk_load (the file is parsed as a stream).
+
+    Args:
+        store: Target store
+        path: Path of the RDF file
+        rdf_format: Format of the file
+        to_graph: Graph for triples formats
+        base_iri: Optional base IRI for relative IRIs
+        quads: Number of quads in the file, if the caller knows it
+
+    Returns:
+        IngestReport (quads is the given count, or None: the file is not
+        read twice to count it)
+    """
+    if os.path.getsize(path) == 0:
+        return IngestReport()
+
+    start = time.perf_counter()
+    store.bulk_load(path=path, format=rdf_format, base_iri=base_iri, to_graph=to_graph)
+    seconds = time.perf_counter() - start
+    return IngestReport(quads=quads, seconds=seconds)
+
+
+def copy_graph(source: Store, target: Store, from_graph: GraphName,
+               to_graph: Optional[GraphName] = None,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> IngestReport:
+    """
+    Copy the quads of one graph into another store (or another graph).
+
+    Args:
+        source: Store to read from
+        target: Store to write into (may be the source store)
+        from_graph: Graph to copy
+        to_graph: Graph to copy into (defaults to from_graph)
+        batch_size: Quads per bulk_extend call
+
+    Returns:
+        IngestReport
+    """
+    quads = source.quads_for_pattern(None, None, None, from_graph)
+    if target is source:
+        # Do not insert into the graph that is being iterated
+        quads = list(quads)
+    return bulk_add(target, quads, batch_size=batch_size, to_graph=to_graph)
+
+
+def open_store(path: Optional[str] = None, read_only: bool = False) -> Store:
+    """
+    Open the store the ETL engines, batch manager and servers work on.
+
+    Without a path the store lives in memory. With a path it is a RocksDB
+    store in that directory (created if missing), so it can outgrow memory
+    and survives restarts. Only one process can open it read-write. Any
+    number can open it read-only, but only while no process has it open
+    for writing: a read-only open next to a writer is undefined behavior
+    in Oxigraph (serve a Store.backup copy instead).
+
+    Args:
+        path: Directory of an on-disk store, or None for an in-memory store
+        read_only: Open an existing on-disk store, that no writer has
+                   open, without write access
+
+    Returns:
+        Store
+    """
+    if path is None:
+        if read_only:
+            raise ValueError("A read-only store needs a store path")
+        return Store()
+
+    if read_only:
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Store not found: {path}")
+        return Store.read_only(path)
+
+    return Store(path)
+
+
+def file_digest(path: str, digest: Optional[Any] = None) -> Any:
+    """
+    Hash a file in chunks, so memory use does not grow with the file size.
+
+    Args:
+        path: File to hash
+        digest: Hash object to update (defaults to a new SHA-256)
+
+    Returns:
+        The hash object (e.g. file_digest(path).hexdigest())
+    """
+    if digest is None:
+        digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+
+def compression_for_path(path: str) -> Optional[str]:
+    """The compression for a file extension (.gz, .zst), or None"""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1])
+
+
+def rdf_format_for_path(path: str, default: RdfFormat = RdfFormat.TRIG) -> RdfFormat:
+    """The RDF format for a file extension (.nq, .trig.gz, .ttl, ...), or default"""
+    if compression_for_path(path):
+        path = os.path.splitext(path)[0]
+    extension = os.path.splitext(path)[1].lstrip('.')
+    if extension == 'nquads':
+        return RdfFormat.N_QUADS
+    return RdfFormat.from_extension(extension) or default
+
+
+@contextmanager
+def _compressed(output: BinaryIO, compression: Optional[str]) -> Iterator[BinaryIO]:
+    """Wrap a binary stream in a gzip or zstd compressor (closed on exit, the stream is not)"""
+    if compression is None:
+        yield output
+    elif compression == 'gzip':
+        with gzip.GzipFile(fileobj=output, mode='wb', compresslevel=6) as compressed:
+            yield compressed
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package: pip install zstandard")
+        with zstandard.ZstdCompressor().stream_writer(output, closefd=False) as compressed:
+            yield compressed
+    else:
+        raise ValueError(f"Unknown compression: {compression} (use 'gzip' or 'zstd')")
+
+
+def _dump(store: Store, output: BinaryIO, rdf_format: RdfFormat,
+          prefixes: Optional[Dict[str, str]], from_graph: Optional[GraphName],
+          quads: Optional[Iterable[Quad]] = None):
+    """Serialize a store, one graph of it, or given quads of it into a binary stream"""
+    if quads is not None:
+        if not rdf_format.supports_datasets:
+            quads = (quad.triple for quad in quads)
+        serialize(quads, output, rdf_format, prefixes=prefixes)
+    elif from_graph is not None and rdf_format.supports_datasets:
+        # Store.dump writes a single graph as the default graph; stream its
+        # quads instead so they keep their graph name
+        serialize(store.quads_for_pattern(None, None, None, from_graph), output, rdf_format,
+                  prefixes=prefixes)
+    else:
+        store.dump(output, rdf_format, from_graph=from_graph, prefixes=prefixes)
+
+
+def write_store(store: Store, output: Union[str, BinaryIO], rdf_format: Optional[RdfFormat] = None,
+                prefixes: Optional[Dict[str, str]] = None,
+                from_graph: Optional[GraphName] = None,
+                compression: Optional[str] = None,
+                quads: Optional[Iterable[Quad]] = None) -> Optional[int]:
+    """
+    Serialize a store into a file (fsynced) or a binary stream.
+
+    The serializer writes straight into the output, so memory use does not
+    grow with the size of the output. N-Quads is the fastest format to write
+    and to bulk load again; TriG and Turtle output uses the given prefixes.
+
+    Args:
+        store: Store to serialize
+        output: Output file path, or a binary stream (file, socket file, HTTP body)
+        rdf_format: Output format (defaults to the format of the file extension, else TriG)
+        prefixes: Prefix name to namespace IRI mapping (ignored by N-Quads/N-Triples)
+        from_graph: Only serialize this graph (quad formats keep its graph name)
+        compression: 'gzip' or 'zstd' (defaults to the .gz/.zst file extension)
+        quads: Write these quads instead of reading the store, e.g. an iterator
+            of quads_for_pattern, which is a snapshot of the store taken when
+            the iterator was created
+
+    Returns:
+        Size of the written file in bytes (None for a stream)
+    """
+    if not isinstance(output, str):
+        with _compressed(output, compression) as stream:
+            _dump(store, stream, rdf_format or RdfFormat.TRIG, prefixes, from_graph, quads)
+        output.flush()
+        return None
+
+    path = output
+    if rdf_format is None:
+        rdf_format = rdf_format_for_path(path)
+    if compression is None:
+        compression = compression_for_path(path)
+
+    with open(path, 'wb') as f:
+        with _compressed(f, compression) as stream:
+            _dump(store, stream, rdf_format, prefixes, from_graph, quads)
+        f.flush()
+        os.fsync(f.fileno())
+
+    return os.path.getsize(path)
+
+
+class GraphView:
+    """
+    Read-only view of one graph of a store.
+
+    Reads go straight to the underlying store, so the quads of the graph are
+    never copied. A view can also be given a build function instead of a
+    store: the store is then only built on the first read.
+
+    Usage:
+        view = GraphView(store, NamedNode("http://example.org/batch/batch_0001"))
+        len(view)
+        view.query("SELECT ?s WHERE { ?s ?p ?o }")
+        view.dump("batch.nq.gz")
+    """
+
+    def __init__(self, store: Optional[Store], graph: NamedNode,
+                 build: Optional[Callable[[], Store]] = None):
+        """
+        Args:
+            store: Store holding the graph (None if build is given)
+            graph: Graph to view
+            build: Function returning the store, called on the first read
+        """
+        if (store is None) == (build is None):
+            raise ValueError("Give either a store or a build function")
+        self._store = store
+        self._build = build
+        self.graph = graph
+
+    @property
+    def store(self) -> Store:
+        """The store holding the graph"""
+        if self._store is None:
+            self._store = self._build()
+        return self._store
+
+    def quads_for_pattern(self, subject=None, predicate=None, object=None,
+                          graph_name=None) -> Iterator[Quad]:
+        """Quads of the graph matching a pattern (None matches anything, as in Store)"""
+        if graph_name is not None and graph_name != self.graph:
+            return iter(())
+        return self.store.quads_for_pattern(subject, predicate, object, self.graph)
+
+    def __iter__(self) -> Iterator[Quad]:
+        return self.quads_for_pattern()
+
+    def __len__(self) -> int:
+        result = self.store.query("SELECT (COUNT(*) AS ?count) WHERE { ?s ?p ?o }",
+                                  default_graph=self.graph)
+        return int(next(iter(result))['count'].value)
+
+    def __contains__(self, quad: Quad) -> bool:
+        return quad.graph_name == self.graph and quad in self.store
+
+    def query(self, sparql_query: str, **kwargs):
+        """SPARQL query with the graph as the default graph (FROM clauses are overridden)"""
+        return self.store.query(sparql_query, default_graph=self.graph, **kwargs)
+
+    def dump(self, output: Union[str, BinaryIO], rdf_format: Optional[RdfFormat] = None,
+             prefixes: Optional[Dict[str, str]] = None,
+             compression: Optional[str] = None) -> Optional[int]:
+        """Serialize the graph into a file or stream (see write_store)"""
+        return write_store(self.store, output, rdf_format, prefixes=prefixes,
+                           from_graph=self.graph, compression=compression)
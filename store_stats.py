@@ -0,0 +1,226 @@
+"""
+Store Statistics
+================
+
+Quad counts of a pyoxigraph Store without materializing its quads:
+
+- total:         Number of quads in the store
+- graph_counts:  Number of quads per named graph (and the default graph)
+- annotations:   Number of quoted-triple annotations (rdf:reifies statements)
+
+Writers report what they ingest with add() (or remove_graph() /
+invalidate()), so the counts are kept up to date as running totals. A count
+that is not known yet - e.g. for a store loaded from disk, or after a load
+into several graphs at once - is recomputed natively by the store the next
+time it is read: len(store) for the total and an aggregate SPARQL query for
+the per-graph and annotation counts. No Python Quad objects are created.
+
+The counts can be shared by writers in several threads (e.g. ETL engines
+loading different batches into one store).
+
+Every recorded write also moves the store to a new generation: readers that
+keep results of the store (e.g. the query cache of the SPARQL servers) keep
+them for one generation. Generations are unique within the process, also
+across StoreStats objects, so a store that is replaced (reloaded) never
+reuses one.
+"""
+
+import itertools
+import threading
+from typing import Dict, Optional
+
+from pyoxigraph import Store
+
+# Key of the default graph in graph_counts
+DEFAULT_GRAPH = ''
+
+RDF_REIFIES = "http://www.w3.org/1999/02/22-rdf-syntax-ns#reifies"
+
+GRAPH_COUNTS_QUERY = """
+SELECT ?g (COUNT(*) AS ?n) WHERE { GRAPH ?g { ?s ?p ?o } } GROUP BY ?g
+"""
+
+DEFAULT_GRAPH_COUNT_QUERY = """
+SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }
+"""
+
+GRAPH_COUNT_QUERY = """
+SELECT (COUNT(*) AS ?n) WHERE {{ GRAPH <{graph}> {{ ?s ?p ?o }} }}
+"""
+
+# Generations of all StoreStats of the process
+_GENERATIONS = itertools.count(1)
+
+ANNOTATIONS_QUERY = f"""
+SELECT (COUNT(*) AS ?n) WHERE {{
+    {{ ?r <{RDF_REIFIES}> ?t }} UNION {{ GRAPH ?g {{ ?r <{RDF_REIFIES}> ?t }} }}
+}}
+"""
+
+
+def store_is_empty(store: Store) -> bool:
+    """Whether a store holds no quads (reads at most one quad)"""
+    return next(iter(store), None) is None
+
+
+class StoreStats:
+    """
+    Running quad counts of a Store.
+
+    Usage:
+        stats = StoreStats(store, empty=True)
+        report = bulk_load_bytes(store, data, RdfFormat.N_QUADS, to_graph=graph)
+        stats.add(report.quads, graph=graph.value)
+        print(stats.total, stats.graph_count(graph.value))
+    """
+
+    def __init__(self, store: Store, empty: bool = False):
+        """
+        Args:
+            store: Store to count
+            empty: The store is known to be empty, so counting starts at zero
+                   instead of reading the store on first access
+        """
+        self.store = store
+        self._lock = threading.RLock()
+        self._total: Optional[int] = 0 if empty else None
+        self._graphs: Optional[Dict[str, int]] = {} if empty else None
+        self._annotations: Optional[int] = 0 if empty else None
+        self.generation = next(_GENERATIONS)
+
+    def add(self, quads: int, graph: Optional[str] = None, annotations: Optional[int] = None):
+        """
+        Record quads added to the store.
+
+        Args:
+            quads: Number of quads added
+            graph: IRI of the graph they were added to (DEFAULT_GRAPH for the
+                   default graph, None if they went to several graphs)
+            annotations: How many of them are rdf:reifies statements (None if
+                         not known)
+        """
+        with self._lock:
+            self.generation = next(_GENERATIONS)
+            if self._total is not None:
+                self._total += quads
+            if annotations is None:
+                self._annotations = None
+            elif self._annotations is not None:
+                self._annotations += annotations
+
+            if graph is None:
+                self._graphs = None
+            elif self._graphs is not None:
+                self._graphs[graph] = self._graphs.get(graph, 0) + quads
+
+    def remove_graph(self, graph: str, quads: Optional[int] = None):
+        """
+        Record that a graph was cleared.
+
+        Args:
+            graph: IRI of the cleared graph
+            quads: Number of quads removed (defaults to the graph's count)
+        """
+        with self._lock:
+            self.generation = next(_GENERATIONS)
+            if quads is None:
+                quads = self.graph_count(graph)
+            if self._total is not None:
+                self._total -= quads
+            if self._graphs is not None:
+                self._graphs.pop(graph, None)
+            # The graph's share of the annotations is not tracked
+            self._annotations = None
+
+    def recount_graph(self, graph: str) -> int:
+        """
+        Count the quads of one graph natively and correct the running counts.
+
+        For writers that record upper bounds (e.g. frames loaded with
+        duplicates) or no count at all (e.g. files loaded with bulk_load);
+        the count only reads that graph, not the whole store.
+
+        Args:
+            graph: IRI of the graph to count (DEFAULT_GRAPH for the default graph)
+
+        Returns:
+            Number of quads in the graph
+        """
+        with self._lock:
+            self.generation = next(_GENERATIONS)
+            if graph == DEFAULT_GRAPH:
+                quads = self._count(DEFAULT_GRAPH_COUNT_QUERY)
+            else:
+                quads = self._count(GRAPH_COUNT_QUERY.format(graph=graph))
+            if self._graphs is not None:
+                if self._total is not None:
+                    self._total += quads - self._graphs.get(graph, 0)
+                if quads:
+                    self._graphs[graph] = quads
+                else:
+                    self._graphs.pop(graph, None)
+            else:
+                self._total = None
+            self._annotations = None
+            return quads
+
+    def invalidate(self):
+        """Forget all counts (after writes that were not recorded)"""
+        with self._lock:
+            self.generation = next(_GENERATIONS)
+            self._total = None
+            self._graphs = None
+            self._annotations = None
+
+    def _count(self, query: str) -> int:
+        """Evaluate a single COUNT query"""
+        for solution in self.store.query(query):
+            return int(solution['n'].value)
+        return 0
+
+    @property
+    def total(self) -> int:
+        """Number of quads in the store"""
+        with self._lock:
+            if self._total is None:
+                self._total = len(self.store)
+            return self._total
+
+    @property
+    def graph_counts(self) -> Dict[str, int]:
+        """Number of quads per graph IRI (DEFAULT_GRAPH for the default graph)"""
+        with self._lock:
+            if self._graphs is None:
+                graphs = {
+                    solution['g'].value: int(solution['n'].value)
+                    for solution in self.store.query(GRAPH_COUNTS_QUERY)
+                }
+                default_count = self._count(DEFAULT_GRAPH_COUNT_QUERY)
+                if default_count:
+                    graphs[DEFAULT_GRAPH] = default_count
+                self._graphs = graphs
+            return dict(self._graphs)
+
+    def graph_count(self, graph: str) -> int:
+        """Number of quads in one graph"""
+        return self.graph_counts.get(graph, 0)
+
+    @property
+    def named_graphs(self) -> list:
+        """IRIs of the non-empty named graphs"""
+        return [graph for graph in self.graph_counts if graph != DEFAULT_GRAPH]
+
+    @property
+    def annotations(self) -> int:
+        """Number of quoted-triple annotations (rdf:reifies statements)"""
+        with self._lock:
+            if self._annotations is None:
+                self._annotations = self._count(ANNOTATIONS_QUERY)
+            return self._annotations
+
+    def to_dict(self) -> Dict:
+        return {
+            'total_quads': self.total,
+            'graph_count': len(self.named_graphs),
+            'annotations': self.annotations,
+        }
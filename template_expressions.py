@@ -0,0 +1,166 @@
+"""
+Polars Expression Compiler for YARRRML Templates
+================================================
+
+Compiles YARRRML templates such as ``ex:dataset/$(dataset_id)`` into Polars
+expressions, so template instantiation runs inside the Polars engine instead
+of a per-row Python loop.
+
+A compiled template:
+- Concatenates the literal template parts and the referenced columns with
+  ``concat_str``
+- Sanitizes column values with a vectorized regex replace (same rules as
+  ``sanitize_uri_component``: null/empty -> "unknown", ``[^\\w\\-.]`` -> "_")
+- Expands the namespace prefix once at compile time instead of per row
+- Drops the ``~iri`` marker
+
+The result of evaluating a compiled template is one Utf8 column per template.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import polars as pl
+
+# Same patterns as the ETL engines use for row-by-row instantiation
+TEMPLATE_VAR_PATTERN = re.compile(r'\$\(([^)]+)\)')
+URI_SANITIZE_REGEX = r'[^\w\-.]'
+
+
+def _expand_prefixed(value: str, prefixes: Dict[str, str]) -> str:
+    """Expand a prefixed name (same rules as the engines' expand_uri)"""
+    if ':' in value and not value.startswith('http'):
+        prefix, local_name = value.split(':', 1)
+        if prefix in prefixes:
+            return prefixes[prefix] + local_name
+    return value
+
+
+def sanitize_expr(column: str, dtype: Optional[pl.DataType] = None) -> pl.Expr:
+    """
+    Build the vectorized equivalent of sanitize_uri_component for a column.
+
+    Args:
+        column: Column name
+        dtype: Column dtype if known (booleans are rendered like Python's str())
+
+    Returns:
+        Utf8 expression with sanitized values
+    """
+    if dtype == pl.Boolean:
+        value = pl.when(pl.col(column)).then(pl.lit('True')).otherwise(pl.lit('False'))
+        value = pl.when(pl.col(column).is_null()).then(None).otherwise(value)
+    else:
+        value = pl.col(column).cast(pl.Utf8)
+
+    return (
+        pl.when(value.is_null() | (value == ''))
+        .then(pl.lit('unknown'))
+        .otherwise(value.str.replace_all(URI_SANITIZE_REGEX, '_'))
+    )
+
+
+def _expand_prefixes_expr(value: pl.Expr, prefixes: Dict[str, str]) -> pl.Expr:
+    """Expand prefixes on a computed column (used when the prefix is not static)"""
+    expanded = value
+    for prefix, namespace in prefixes.items():
+        marker = f"{prefix}:"
+        expanded = (
+            pl.when(value.str.starts_with(marker))
+            .then(pl.lit(namespace) + value.str.slice(len(marker)))
+            .otherwise(expanded)
+        )
+    return pl.when(value.str.starts_with('http')).then(value).otherwise(expanded)
+
+
+@lru_cache(maxsize=1000)
+def _compile_template_cached(template: str, prefixes_tuple: Tuple,
+                             schema_tuple: Optional[Tuple]) -> pl.Expr:
+    """Cached template compilation (prefixes and schema passed as tuples)"""
+    prefixes = dict(prefixes_tuple)
+    schema = dict(schema_tuple) if schema_tuple is not None else None
+
+    # Sanitized values never contain '~' or ':', so both the ~iri marker and
+    # the prefix can be resolved on the literal parts of the template.
+    parts = TEMPLATE_VAR_PATTERN.split(template.replace('~iri', ''))
+    literals = parts[0::2]
+    variables = parts[1::2]
+
+    dynamic_prefix = False
+    if ':' in literals[0] or not variables:
+        literals[0] = _expand_prefixed(literals[0], prefixes)
+    elif any(':' in literal for literal in literals[1:]):
+        dynamic_prefix = True
+
+    if not variables:
+        return pl.lit(literals[0], dtype=pl.Utf8)
+
+    pieces = []
+    for i, var in enumerate(variables):
+        if literals[i]:
+            pieces.append(pl.lit(literals[i]))
+        if schema is not None and var not in schema:
+            pieces.append(pl.lit('unknown'))
+        else:
+            pieces.append(sanitize_expr(var, schema.get(var) if schema else None))
+    if literals[-1]:
+        pieces.append(pl.lit(literals[-1]))
+
+    expr = pl.concat_str(pieces)
+    if dynamic_prefix:
+        expr = _expand_prefixes_expr(expr, prefixes)
+    return expr
+
+
+def compile_template(template: str, prefixes: Dict[str, str],
+                     schema: Optional[Dict[str, pl.DataType]] = None) -> pl.Expr:
+    """
+    Compile a YARRRML template into a Polars expression.
+
+    Args:
+        template: Template string, e.g. 'ex:dataset/$(dataset_id)'
+        prefixes: Prefix -> namespace mapping
+        schema: Optional frame schema; variables missing from it render as
+                "unknown" (matching the row-by-row behaviour)
+
+    Returns:
+        Utf8 expression producing the instantiated template
+    """
+    schema_tuple = tuple(schema.items()) if schema is not None else None
+    return _compile_template_cached(template, tuple(prefixes.items()), schema_tuple)
+
+
+def compile_iri_reference(template: str, prefixes: Dict[str, str],
+                          schema: Optional[Dict[str, pl.DataType]] = None) -> pl.Expr:
+    """
+    Compile an IRI object template.
+
+    A bare column reference ($(column)) whose value is already an absolute
+    http(s) IRI is passed through unchanged; every other value goes through
+    the regular template instantiation.
+
+    Args:
+        template: Object template, e.g. '$(theme_uri)'
+        prefixes: Prefix -> namespace mapping
+        schema: Optional frame schema
+
+    Returns:
+        Utf8 expression producing the object IRIs
+    """
+    compiled = compile_template(template, prefixes, schema)
+
+    stripped = template.strip()
+    if not (stripped.startswith('$(') and stripped.endswith(')')):
+        return compiled
+
+    column = stripped[2:-1]
+    if schema is not None and column not in schema:
+        return compiled
+
+    raw = pl.col(column).cast(pl.Utf8)
+    return (
+        pl.when(raw.str.starts_with('http://') | raw.str.starts_with('https://'))
+        .then(raw)
+        .otherwise(compiled)
+    )
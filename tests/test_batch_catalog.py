@@ -0,0 +1,259 @@
+"""
+Tests for the Batch Catalog
+===========================
+
+Tests for:
+- Committing only changed batches (marked on assignment)
+- Queries that commit pending changes without holding the write lock
+- Identity of batches across lookups
+- Indexed queries (active, newest, children, point in time)
+- Migration from batches.json
+- Transactions shared with other connections
+"""
+
+import sys
+import os
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_catalog import BatchCatalog, DEFAULT_PRODUCT
+from batch_manager import BatchMetadata, BatchStatus
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def make_batch(number, status=BatchStatus.SUPERSEDED, parent=None):
+    """A batch loaded on day <number> and superseded on the next day."""
+    batch_id = f"batch_{number:04d}_test"
+    return BatchMetadata(
+        batch_id=batch_id,
+        batch_number=number,
+        created_at=START + timedelta(days=number),
+        graph_uri=f"http://example.org/batch/{batch_id}",
+        source_mapping="test.yaml",
+        source_files=[],
+        status=status,
+        loaded_at=START + timedelta(days=number),
+        superseded_at=None if status == BatchStatus.ACTIVE else START + timedelta(days=number + 1),
+        parent_batch=parent,
+    )
+
+
+class TestBatchCatalog(unittest.TestCase):
+    """Test batch metadata in SQLite."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "batches.db")
+        self.catalog = BatchCatalog(self.path, BatchMetadata.from_dict)
+        for number in range(1, 5):
+            self.catalog[f"batch_{number:04d}_test"] = make_batch(number, parent=f"batch_{number - 1:04d}_test")
+        self.catalog["batch_0005_test"] = make_batch(5, BatchStatus.ACTIVE)
+        self.catalog.commit()
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.temp_dir)
+
+    def reopen(self):
+        return BatchCatalog(self.path, BatchMetadata.from_dict)
+
+    def test_persisted(self):
+        catalog = self.reopen()
+        self.assertEqual(len(catalog), 5)
+        self.assertEqual(list(catalog), [f"batch_{n:04d}_test" for n in range(1, 6)])
+        self.assertEqual(catalog["batch_0003_test"].to_dict(), make_batch(3, parent="batch_0002_test").to_dict())
+
+    def test_same_object_per_batch(self):
+        catalog = self.reopen()
+        batch = catalog.get("batch_0002_test")
+        self.assertIs(catalog.newest(1, status="superseded")[0], catalog["batch_0004_test"])
+        self.assertIs(catalog.children("batch_0001_test")[0], batch)
+
+    def test_commit_writes_changed_batches(self):
+        catalog = self.reopen()
+        catalog.get("batch_0003_test")
+        catalog["batch_0002_test"].description = "changed"
+
+        statements = []
+        catalog._conn.set_trace_callback(statements.append)
+        catalog.commit()
+        catalog._conn.set_trace_callback(None)
+
+        self.assertEqual(len([s for s in statements if s.lstrip().startswith("INSERT")]), 1)
+        self.assertEqual(self.reopen()["batch_0002_test"].description, "changed")
+
+    def test_reads_do_not_write(self):
+        catalog = self.reopen()
+        batches = catalog.values()
+        batches[0].tags = ["changed"]
+        catalog.commit()
+
+        statements = []
+        catalog._conn.set_trace_callback(statements.append)
+        for batch in catalog.values():
+            catalog.active()
+            catalog.get(batch.batch_id)
+        del catalog["batch_0003_test"]
+        batches[2].description = "deleted meanwhile"
+        catalog.commit()
+        catalog._conn.set_trace_callback(None)
+
+        self.assertEqual([s for s in statements if s.lstrip().startswith("INSERT")], [])
+        self.assertEqual(self.reopen()["batch_0001_test"].tags, ["changed"])
+        self.assertNotIn("batch_0003_test", self.reopen())
+
+    def test_queries_see_changes(self):
+        self.catalog["batch_0005_test"].status = BatchStatus.SUPERSEDED
+        self.assertIsNone(self.catalog.active())
+        self.assertEqual(self.catalog.count_by_status(), {"superseded": 5})
+
+        # Committed by the query, which leaves no write lock behind
+        self.assertFalse(self.catalog._conn.in_transaction)
+        other = sqlite3.connect(self.path, timeout=0)
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+        other.close()
+        self.assertIsNone(self.reopen().active())
+
+    def test_transaction_changes_stay_uncommitted(self):
+        with self.catalog.transaction():
+            self.catalog["batch_0005_test"].status = BatchStatus.SUPERSEDED
+            self.assertIsNone(self.catalog.active())
+            # Not committed yet
+            self.assertEqual(self.reopen().active().batch_id, "batch_0005_test")
+
+    def test_delete(self):
+        del self.catalog["batch_0001_test"]
+        self.assertNotIn("batch_0001_test", self.catalog)
+        self.catalog.commit()
+        self.assertEqual(len(self.reopen()), 4)
+        with self.assertRaises(KeyError):
+            del self.catalog["batch_0001_test"]
+
+    def test_indexed_queries(self):
+        self.assertEqual(self.catalog.active().batch_id, "batch_0005_test")
+        self.assertEqual([b.batch_number for b in self.catalog.newest(2)], [5, 4])
+        self.assertEqual([b.batch_number for b in self.catalog.loaded()], [1, 2, 3, 4, 5])
+        self.assertEqual(self.catalog.next_batch_number(), 6)
+        self.assertEqual(self.catalog.at(START + timedelta(days=2, hours=12)).batch_number, 2)
+        self.assertEqual(self.catalog.at(START + timedelta(days=30)).batch_number, 5)
+        self.assertIsNone(self.catalog.at(START))
+
+    def test_products(self):
+        batch = make_batch(6, BatchStatus.ACTIVE)
+        batch.product = "orders"
+        self.catalog[batch.batch_id] = batch
+
+        self.assertEqual(self.catalog.products(), [DEFAULT_PRODUCT, "orders"])
+        self.assertEqual(self.catalog.active().batch_number, 5)
+        self.assertIs(self.catalog.active("orders"), batch)
+        self.assertEqual([b.batch_number for b in self.catalog.newest(5, product="orders")], [6])
+        self.assertIsNone(self.catalog.at(START + timedelta(days=2), product="orders"))
+
+    def test_transaction_sees_other_connections(self):
+        batch = self.catalog["batch_0005_test"]
+        other = self.reopen()
+        with other.transaction():
+            other["batch_0005_test"].status = BatchStatus.SUPERSEDED
+
+        with self.catalog.transaction():
+            self.assertEqual(batch.status, BatchStatus.SUPERSEDED)
+            self.assertIsNone(self.catalog.active())
+        other.close()
+
+    def test_transaction_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with self.catalog.transaction():
+                self.catalog["batch_0005_test"].description = "changed"
+                del self.catalog["batch_0001_test"]
+                raise RuntimeError()
+
+        self.assertIn("batch_0001_test", self.catalog)
+        self.assertEqual(self.catalog["batch_0005_test"].description, "")
+        self.assertEqual(len(self.reopen()), 5)
+
+    def test_concurrent_batch_numbers(self):
+        """Catalogs on one database allocate distinct batch numbers in transactions."""
+        catalogs = [self.reopen() for _ in range(4)]
+
+        def allocate(catalog):
+            for _ in range(10):
+                with catalog.transaction():
+                    number = catalog.next_batch_number()
+                    catalog[f"batch_{number:04d}_test"] = make_batch(number)
+
+        threads = [threading.Thread(target=allocate, args=(catalog,)) for catalog in catalogs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for catalog in catalogs:
+            catalog.close()
+
+        self.assertEqual(sorted(b.batch_number for b in self.reopen().values()), list(range(1, 46)))
+
+    def test_indexes_used(self):
+        plan = sqlite3.connect(self.path).execute(
+            "EXPLAIN QUERY PLAN SELECT batch_id, data FROM batches WHERE status = ? "
+            "ORDER BY batch_number DESC LIMIT 1", ("active",)
+        ).fetchall()
+        self.assertIn("batches_status", str(plan))
+
+
+class TestJsonMigration(unittest.TestCase):
+    """Test importing batches.json of earlier versions."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.temp_dir, "batches.json")
+        with open(self.json_path, 'w') as f:
+            json.dump({'version': '1.0', 'batches': [make_batch(1).to_dict(),
+                                                     make_batch(2, BatchStatus.ACTIVE).to_dict()]}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_migrates_once(self):
+        path = os.path.join(self.temp_dir, "batches.db")
+        catalog = BatchCatalog(path, BatchMetadata.from_dict, json_path=self.json_path)
+
+        self.assertEqual(len(catalog), 2)
+        self.assertEqual(catalog.active().batch_number, 2)
+        self.assertFalse(os.path.exists(self.json_path))
+        self.assertTrue(os.path.exists(self.json_path + ".migrated"))
+        catalog.close()
+
+        catalog = BatchCatalog(path, BatchMetadata.from_dict, json_path=self.json_path)
+        self.assertEqual(len(catalog), 2)
+        catalog.close()
+
+    def test_adds_product_column(self):
+        path = os.path.join(self.temp_dir, "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE batches (batch_id TEXT PRIMARY KEY, batch_number INTEGER NOT NULL UNIQUE, "
+                     "status TEXT NOT NULL, created_at TEXT NOT NULL, loaded_at TEXT, superseded_at TEXT, "
+                     "parent_batch TEXT, data TEXT NOT NULL)")
+        d = make_batch(1, BatchStatus.ACTIVE).to_dict()
+        del d['product']
+        conn.execute("INSERT INTO batches VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (d['batch_id'], 1, 'active', d['created_at'], d['loaded_at'], None, None, json.dumps(d)))
+        conn.commit()
+        conn.close()
+
+        catalog = BatchCatalog(path, BatchMetadata.from_dict)
+        self.assertEqual(catalog.active(DEFAULT_PRODUCT).batch_number, 1)
+        self.assertEqual(catalog.products(), [DEFAULT_PRODUCT])
+        catalog.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests for the Batch Diff Engine
+===============================
+
+Tests for:
+- Exact added, removed, modified and unchanged counts
+- Subject buckets (results independent of the bucket size)
+- Sample triples and subjects
+- Empty graphs
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyoxigraph import Store, Quad, Triple, NamedNode, BlankNode, Literal
+
+from batch_diff import diff_graphs
+
+EX = "http://example.org/"
+FROM = NamedNode(f"{EX}graph/from")
+TO = NamedNode(f"{EX}graph/to")
+
+
+def term_string(term):
+    """N-Triples form of a term (triple terms as <<( s p o )>>)."""
+    return f"<<( {term} )>>" if isinstance(term, Triple) else str(term)
+
+
+def triple_strings(store, graph):
+    """Triples of a graph in the '<s> <p> <o>' form of the diff samples."""
+    return {
+        f"{q.subject} {q.predicate} {term_string(q.object)}"
+        for q in store.quads_for_pattern(None, None, None, graph)
+    }
+
+
+class TestDiffGraphs(unittest.TestCase):
+    """Test graph diffs against a set-based reference."""
+
+    def setUp(self):
+        self.store = Store()
+        for i in range(200):
+            subject = NamedNode(f"{EX}s{i}")
+            for p in range(3):
+                self.store.add(Quad(subject, NamedNode(f"{EX}p{p}"), Literal(f"{i}-{p}"), FROM))
+                value = f"{i}-{p}" if i % 10 or p else f"{i}-changed"
+                if i < 190:
+                    self.store.add(Quad(subject, NamedNode(f"{EX}p{p}"), Literal(value), TO))
+        # New subjects, a quoted triple and a blank node
+        for i in range(200, 205):
+            self.store.add(Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p0"), Literal('new "quoted"\n'), TO))
+        base = Triple(NamedNode(f"{EX}s1"), NamedNode(f"{EX}p0"), Literal("1-0"))
+        self.store.add(Quad(BlankNode("r1"), NamedNode(f"{EX}reifies"), base, TO))
+
+    def reference(self):
+        before = triple_strings(self.store, FROM)
+        after = triple_strings(self.store, TO)
+        subjects = lambda triples: {t.split(' ', 1)[0] for t in triples}
+        added, removed = after - before, before - after
+        modified = subjects(added | removed) & subjects(before) & subjects(after)
+        return added, removed, modified, before & after
+
+    def test_counts_match_reference(self):
+        added, removed, modified, unchanged = self.reference()
+        diff = diff_graphs(self.store, FROM, TO)
+
+        self.assertEqual(diff.added_count, len(added))
+        self.assertEqual(diff.removed_count, len(removed))
+        self.assertEqual(diff.modified_count, len(modified))
+        self.assertEqual(diff.unchanged_count, len(unchanged))
+        self.assertEqual(diff.buckets, 1)
+
+    def test_buckets_give_the_same_result(self):
+        single = diff_graphs(self.store, FROM, TO, sample_limit=1000)
+        bucketed = diff_graphs(self.store, FROM, TO, sample_limit=1000, bucket_triples=50)
+
+        self.assertGreater(bucketed.buckets, 1)
+        self.assertEqual(
+            (bucketed.added_count, bucketed.removed_count, bucketed.modified_count, bucketed.unchanged_count),
+            (single.added_count, single.removed_count, single.modified_count, single.unchanged_count)
+        )
+        self.assertEqual(set(bucketed.added_triples), set(single.added_triples))
+
+    def test_samples(self):
+        added, removed, modified, _ = self.reference()
+        diff = diff_graphs(self.store, FROM, TO, sample_limit=1000)
+
+        self.assertEqual(set(diff.added_triples), added)
+        self.assertEqual(set(diff.removed_triples), removed)
+        self.assertEqual(set(diff.modified_subjects), modified)
+
+        limited = diff_graphs(self.store, FROM, TO, sample_limit=3)
+        self.assertEqual(len(limited.added_triples), 3)
+        self.assertTrue(set(limited.added_triples) <= added)
+
+    def test_empty_graph(self):
+        diff = diff_graphs(self.store, NamedNode(f"{EX}graph/none"), FROM)
+
+        self.assertEqual(diff.added_count, 600)
+        self.assertEqual(diff.removed_count, 0)
+        self.assertEqual(diff.modified_count, 0)
+        self.assertEqual(diff.unchanged_count, 0)
+
+    def test_invalid_bucket_size(self):
+        with self.assertRaises(ValueError):
+            diff_graphs(self.store, FROM, TO, bucket_triples=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
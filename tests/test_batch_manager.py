@@ -9,21 +9,28 @@ Tests for:
 - Point-in-time queries
 - Provenance tracking
 - Batch lifecycle (archive, delete)
+- Delta storage and state reconstruction
+- Skipping unchanged loads
+- Staged activation and concurrent loads of several products
 """
 
 import sys
 import os
-import json
+import gzip
 import tempfile
 import shutil
 import unittest
+import io
+import contextlib
+import threading
 from datetime import datetime, timezone, timedelta
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from pyoxigraph import Store, Quad, Triple, NamedNode, Literal, RdfFormat
-from batch_manager import BatchManager, BatchMetadata, BatchStatus, BatchDiff
+from batch_manager import BatchManager, BatchMetadata, BatchStatus, BatchStorage, BatchDiff
+from store_io import GraphView
 
 
 class TestBatchMetadata(unittest.TestCase):
@@ -255,6 +262,187 @@ class TestBatchManager(unittest.TestCase):
         batch1_updated = self.manager.get_batch(batch1.batch_id)
         self.assertEqual(batch1_updated.status, BatchStatus.DELETED)
 
+    def test_store_stats_track_loads_and_deletes(self):
+        """Test that the store statistics follow loads and permanent deletes."""
+        source_store = Store()
+        source_store.add(Quad(
+            NamedNode("http://example.org/subject/1"),
+            NamedNode("http://example.org/predicate"),
+            Literal("value1")
+        ))
+
+        batch1 = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.manager.load_batch_from_store(batch1.batch_id, source_store)
+        batch2 = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.manager.load_batch_from_store(batch2.batch_id, source_store)
+
+        stats = self.manager.store_stats
+        self.assertEqual(stats.total, len(self.store))
+        self.assertEqual(stats.graph_count(batch1.graph_uri), 5)
+
+        self.manager.delete_batch(batch1.batch_id, permanent=True)
+        self.assertEqual(stats.total, len(self.store))
+        self.assertEqual(stats.graph_count(batch1.graph_uri), 0)
+
+    def test_load_batch_from_file_into_batch_graph(self):
+        """Test that default graph triples of a file land in the batch graph, counted once."""
+        rdf_file = os.path.join(self.temp_dir, "batch.trig")
+        with open(rdf_file, 'w') as f:
+            f.write('<http://example.org/s> <http://example.org/p> "v" .\n')
+            # A repeated statement and one in a named graph of its own
+            f.write('<http://example.org/s> <http://example.org/p> "v" .\n')
+            f.write('<http://example.org/g> { <http://example.org/s> <http://example.org/p> "w" }\n')
+
+        batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.manager.load_batch_from_file(batch.batch_id, rdf_file)
+
+        self.assertEqual(batch.quad_count, 1)
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+        self.assertIn(Quad(
+            NamedNode("http://example.org/s"),
+            NamedNode("http://example.org/p"),
+            Literal("v"),
+            NamedNode(batch.graph_uri)
+        ), self.store)
+
+    def test_load_batch_from_file_counts_annotations(self):
+        """Test that annotations loaded from a file are counted, not assumed zero."""
+        rdf_file = os.path.join(self.temp_dir, "batch.trig")
+        with open(rdf_file, 'w') as f:
+            f.write('@prefix ex: <http://example.org/> .\n')
+            f.write('@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .\n')
+            for i in range(3):
+                f.write(f'ex:s{i} ex:p ex:o{i} .\n')
+                f.write(f'ex:r{i} rdf:reifies <<( ex:s{i} ex:p ex:o{i} )>> ; ex:confidence "0.9" .\n')
+
+        batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.manager.load_batch_from_file(batch.batch_id, rdf_file)
+
+        self.assertEqual(self.manager.store_stats.annotations, 3)
+
+    def test_load_batch_from_engine(self):
+        """Test that an ETL engine loads straight into the batch graph."""
+        from rdf_star_etl_yarrrml import RDFStarETLEngine
+
+        mapping_file = os.path.join(self.temp_dir, "mapping.yaml")
+        with open(mapping_file, 'w') as f:
+            f.write(
+                'prefixes:\n  ex: "http://example.org/"\n'
+                'mappings:\n  personTM:\n    sources:\n      - [\'people.csv~csv\']\n'
+                '    subject: ex:person/$(id)\n    predicateobjects:\n      - [ex:name, $(name)]\n'
+            )
+        with open(os.path.join(self.temp_dir, "people.csv"), 'w') as f:
+            f.write("id,name\n1,Ada\n2,Alan\n")
+
+        batch = self.manager.create_batch(source_mapping=mapping_file, source_files=[])
+        output_file = os.path.join(self.temp_dir, "batch.trig")
+        engine = RDFStarETLEngine(
+            mapping_file, output_file,
+            store=self.store,
+            store_stats=self.manager.store_stats,
+            graph=batch.graph_uri,
+            background_output=True
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = self.manager.load_batch_from_engine(batch.batch_id, engine)
+        engine.wait_for_output()
+
+        graph = NamedNode(batch.graph_uri)
+        self.assertEqual(batch.status, BatchStatus.ACTIVE)
+        self.assertEqual(batch.source_files, ["people.csv"])
+        self.assertIn(Quad(
+            NamedNode("http://example.org/person/1"),
+            NamedNode("http://example.org/name"),
+            Literal("Ada"),
+            graph
+        ), self.store)
+        self.assertEqual(len(self.store), len(list(self.store.quads_for_pattern(None, None, None, graph))))
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+
+        # The output holds what the engine loaded, without the batch metadata
+        written = Store()
+        written.load(path=output_file, format=RdfFormat.TRIG)
+        self.assertEqual(len(written), engine.graph_quads)
+        self.assertEqual(list(written.quads_for_pattern(
+            None, NamedNode(f"{BatchManager.PROV_NS}generatedAtTime"), None)), [])
+
+    def test_unchanged_annotations_not_in_delta(self):
+        """Test that reloaded annotations are not both added and removed by a delta."""
+        from rdf_star_etl_yarrrml import RDFStarETLEngine
+
+        mapping_file = os.path.join(self.temp_dir, "mapping.yaml")
+        with open(mapping_file, 'w') as f:
+            f.write(
+                'prefixes:\n  ex: "http://example.org/"\n'
+                'mappings:\n  personTM:\n    sources:\n      - [\'people.csv~csv\']\n'
+                '    subject: ex:person/$(id)\n    predicateobjects:\n      - [ex:name, $(name)]\n'
+                '  nameSourceTM:\n    sources:\n      - [\'people.csv~csv\']\n'
+                '    subject:\n      - function: join(quoted=personTM, equal(str1=$(id), str2=$(id)))\n'
+                '    predicateobjects:\n      - [ex:source, $(source)]\n'
+            )
+        with open(os.path.join(self.temp_dir, "people.csv"), 'w') as f:
+            f.write("id,name,source\n1,Ada,crm\n2,Alan,erp\n")
+
+        manager = BatchManager(Store(), metadata_dir=os.path.join(self.temp_dir, "delta"),
+                               storage_mode="delta")
+        for _ in range(2):
+            batch = manager.create_batch(source_mapping=mapping_file, source_files=[])
+            engine = RDFStarETLEngine(mapping_file, store=manager.store, store_stats=manager.store_stats,
+                                      graph=batch.graph_uri, write_output=False)
+            with contextlib.redirect_stdout(io.StringIO()):
+                batch = manager.load_batch_from_engine(batch.batch_id, engine, skip_unchanged=False)
+
+        self.assertEqual(batch.storage, BatchStorage.DELTA)
+        source = NamedNode("http://example.org/source")
+        for graph_uri in (batch.added_graph_uri, batch.removed_graph_uri):
+            self.assertEqual(list(manager.store.quads_for_pattern(None, source, None, NamedNode(graph_uri))), [])
+
+    def test_load_batch_from_engine_needs_batch_graph(self):
+        """Test that an engine loading elsewhere is rejected."""
+        batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+
+        class Engine:
+            store = Store()
+            graph = batch.graph_uri
+
+        with self.assertRaises(ValueError):
+            self.manager.load_batch_from_engine(batch.batch_id, Engine())
+
+    def test_purge_batches(self):
+        """Test purging several batches with one metadata write."""
+        source_store = Store()
+        source_store.add(Quad(
+            NamedNode("http://example.org/subject/1"),
+            NamedNode("http://example.org/predicate"),
+            Literal("value1")
+        ))
+        batch_ids = []
+        for _ in range(3):
+            batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+            self.manager.load_batch_from_store(batch.batch_id, source_store)
+            batch_ids.append(batch.batch_id)
+
+        saves = []
+        save_metadata = self.manager._save_metadata
+        self.manager._save_metadata = lambda: saves.append(save_metadata())
+        removed = self.manager.purge_batches(batch_ids[:2])
+
+        self.assertEqual(len(saves), 1)
+        self.assertEqual(removed, 10)
+        self.assertEqual(set(self.manager.batches), {batch_ids[2]})
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(len(BatchManager(Store(), metadata_dir=self.temp_dir).batches), 1)
+
+    def test_purge_rejects_active_batch(self):
+        """Test that a purge including the active batch changes nothing."""
+        batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.manager.load_batch_from_store(batch.batch_id, Store())
+
+        with self.assertRaises(ValueError):
+            self.manager.purge_batches([batch.batch_id])
+        self.assertIn(batch.batch_id, self.manager.batches)
+
     def test_cannot_delete_active_batch(self):
         """Test that active batch cannot be deleted."""
         batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
@@ -355,9 +543,12 @@ class TestBatchPointInTimeQueries(unittest.TestCase):
 
         state = self.manager.get_state_at_batch(batch.batch_id)
 
-        self.assertIsInstance(state, Store)
+        # A view of the batch graph, not a copy
+        self.assertIsInstance(state, GraphView)
+        self.assertIs(state.store, self.store)
         quads = list(state)
         self.assertGreater(len(quads), 0)
+        self.assertEqual(len(state), len(quads))
 
     def test_query_at_batch(self):
         """Test SPARQL query scoped to a batch."""
@@ -382,6 +573,91 @@ class TestBatchPointInTimeQueries(unittest.TestCase):
         except Exception:
             pass  # Query execution may fail but method should work
 
+    def load_scores(self, scores):
+        """Load one batch per credit score of customer 123; returns the batches."""
+        batches = []
+        for score in scores:
+            source_store = Store()
+            source_store.add(Quad(
+                NamedNode("http://example.org/customer/123"),
+                NamedNode("http://schema.org/creditScore"),
+                Literal(score)
+            ))
+            source_store.add(Quad(
+                NamedNode("http://example.org/customer/123"),
+                NamedNode("http://schema.org/name"),
+                Literal("John Doe")
+            ))
+            batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+            batches.append(self.manager.load_batch_from_store(batch.batch_id, source_store))
+        return batches
+
+    def test_facts_as_of(self):
+        """Test subject lookups at points in time from the validity index."""
+        batches = self.load_scores(["700", "720", "700"])
+
+        for batch, score in zip(batches, ["700", "720", "700"]):
+            facts = self.manager.facts_as_of(
+                "http://example.org/customer/123", batch.loaded_at,
+                predicate_uri="http://schema.org/creditScore"
+            )
+            self.assertEqual(facts, [{'predicate': '<http://schema.org/creditScore>', 'object': f'"{score}"'}])
+
+        before = batches[0].loaded_at - timedelta(days=1)
+        self.assertEqual(self.manager.facts_as_of("http://example.org/customer/123", before), [])
+
+    def test_validity_intervals(self):
+        """Test that each distinct triple gets one interval per validity period."""
+        self.load_scores(["700", "720", "700"])
+
+        history = self.manager.validity_index.history("<http://example.org/customer/123>")
+        intervals = {(row['o'], row['valid_from'], row['valid_to']) for row in history.iter_rows(named=True)}
+        self.assertEqual(intervals, {
+            ('"John Doe"', 1, None),
+            ('"700"', 1, 2),
+            ('"720"', 2, 3),
+            ('"700"', 3, None),
+        })
+
+    def test_as_of_query(self):
+        """Test SPARQL queries against the state at a point in time."""
+        batches = self.load_scores(["700", "720"])
+
+        query = "SELECT ?score WHERE { ?c <http://schema.org/creditScore> ?score }"
+        results = [row['score'].value for row in self.manager.as_of(batches[0].loaded_at, query)]
+        self.assertEqual(results, ["700"])
+
+        with self.assertRaises(ValueError):
+            self.manager.as_of(batches[0].loaded_at - timedelta(days=1), query)
+
+    def test_as_of_moves_one_state(self):
+        """Test that queries at other times move the same state instead of rebuilding it."""
+        batches = self.load_scores(["700", "720", "740"])
+        query = "SELECT ?score WHERE { ?c <http://schema.org/creditScore> ?score }"
+
+        states = set()
+        for batch, score in zip([batches[2], batches[0], batches[1], batches[2]], ["740", "700", "720", "740"]):
+            results = [row['score'].value for row in self.manager.as_of(batch.loaded_at, query)]
+            self.assertEqual(results, [score])
+            position, state = self.manager._as_of_states["default"]
+            self.assertEqual(position, batch.batch_number)
+            self.assertEqual(len(state), 2)
+            states.add(id(state))
+        self.assertEqual(len(states), 1)
+
+        # A new batch keeps the states of earlier batches
+        self.load_scores(["760"])
+        self.assertIs(self.manager._as_of_states["default"][1], state)
+
+    def test_rebuild_validity_index(self):
+        """Test rebuilding the index from the retained batches."""
+        self.load_scores(["700", "720"])
+        before = self.manager.validity_index.scan().collect().sort('s', 'p', 'o', 'valid_from')
+
+        self.manager.rebuild_validity_index()
+        after = self.manager.validity_index.scan().collect().sort('s', 'p', 'o', 'valid_from')
+        self.assertTrue(after.equals(before))
+
 
 class TestBatchLifecycle(unittest.TestCase):
     """Test full batch lifecycle."""
@@ -435,6 +711,334 @@ class TestBatchLifecycle(unittest.TestCase):
         self.assertIsNone(self.manager.get_batch(batch1.batch_id))
 
 
+class TestDeltaStorage(unittest.TestCase):
+    """Test batches stored as deltas between checkpoints."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = Store()
+        self.manager = BatchManager(self.store, metadata_dir=self.temp_dir,
+                                    storage_mode="delta", checkpoint_interval=3)
+        self.states = {}
+        self.batch_ids = []
+        for day in range(5):
+            source_store = self.day_store(day)
+            batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+            self.manager.load_batch_from_store(batch.batch_id, source_store)
+            self.batch_ids.append(batch.batch_id)
+            self.states[batch.batch_id] = {(q.subject, q.predicate, q.object) for q in source_store}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def day_store(day):
+        """20 subjects; one changes its value every day and one is replaced."""
+        store = Store()
+        for i in range(day, 20 + day):
+            value = f"v{i}-day{day}" if i == 10 else f"v{i}"
+            store.add(Quad(
+                NamedNode(f"http://example.org/s{i}"),
+                NamedNode("http://example.org/p"),
+                Literal(value)
+            ))
+        return store
+
+    def data_triples(self, store, batch_id):
+        """Triples of a batch graph without the batch metadata triples."""
+        graph_uri = self.manager.get_batch(batch_id).graph_uri
+        return {
+            (q.subject, q.predicate, q.object)
+            for q in store.quads_for_pattern(None, None, None, NamedNode(graph_uri))
+            if q.subject != NamedNode(graph_uri)
+        }
+
+    def test_checkpoints_and_deltas(self):
+        storage = [self.manager.get_batch(b).storage for b in self.batch_ids]
+        self.assertEqual(storage, [BatchStorage.FULL, BatchStorage.DELTA, BatchStorage.DELTA,
+                                   BatchStorage.FULL, BatchStorage.DELTA])
+
+        # Superseded deltas keep only their added/removed graphs
+        second = self.manager.get_batch(self.batch_ids[1])
+        self.assertFalse(second.materialized)
+        self.assertEqual(self.data_triples(self.store, second.batch_id), set())
+        added = list(self.store.quads_for_pattern(None, None, None, NamedNode(second.added_graph_uri)))
+        self.assertLess(len(added), 10)
+
+        # The active batch stays complete
+        active = self.manager.get_active_batch()
+        self.assertTrue(active.materialized)
+        self.assertEqual(self.data_triples(self.store, active.batch_id), self.states[active.batch_id])
+
+    def test_state_at_every_batch(self):
+        for batch_id in self.batch_ids:
+            state = self.manager.get_state_at_batch(batch_id)
+            self.assertEqual(self.data_triples(state, batch_id), self.states[batch_id])
+
+    def test_query_and_export_delta_batch(self):
+        batch_id = self.batch_ids[2]
+        results = list(self.manager.query_at_batch(
+            batch_id, 'SELECT ?s WHERE { ?s <http://example.org/p> ?o }'
+        ))
+        self.assertEqual(len(results), 20)
+
+        output_file = os.path.join(self.temp_dir, "export.trig")
+        self.manager.export_batch(batch_id, output_file)
+        exported = Store()
+        exported.load(path=output_file, format=RdfFormat.TRIG)
+        self.assertEqual(self.data_triples(exported, batch_id), self.states[batch_id])
+
+        output_file = os.path.join(self.temp_dir, "export.nq.gz")
+        self.manager.export_batch(batch_id, output_file, RdfFormat.N_QUADS)
+        exported = Store()
+        with gzip.open(output_file) as f:
+            exported.load(f.read(), format=RdfFormat.N_QUADS)
+        self.assertEqual(self.data_triples(exported, batch_id), self.states[batch_id])
+
+    def test_compare_delta_batches(self):
+        diff = self.manager.compare_batches(self.batch_ids[1], self.batch_ids[2])
+
+        # One replaced subject, one changed value and the batch metadata differ
+        self.assertEqual(diff.unchanged_count, 18)
+        self.assertEqual(diff.modified_count, 1)
+
+    def test_delete_rebases_dependents(self):
+        for batch_id in self.batch_ids[:2]:
+            self.manager.archive_batch(batch_id)
+
+        # Deleting a delta combines its deltas into the next batch
+        self.manager.delete_batch(self.batch_ids[1], permanent=True)
+        third = self.manager.get_batch(self.batch_ids[2])
+        self.assertEqual(third.parent_batch, self.batch_ids[0])
+        self.assertEqual(self.data_triples(self.manager.get_state_at_batch(third.batch_id), third.batch_id),
+                         self.states[third.batch_id])
+
+        # Deleting a checkpoint makes the next batch a checkpoint
+        self.manager.delete_batch(self.batch_ids[0], permanent=True)
+        third = self.manager.get_batch(self.batch_ids[2])
+        self.assertEqual(third.storage, BatchStorage.FULL)
+        self.assertEqual(self.data_triples(self.store, third.batch_id), self.states[third.batch_id])
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+
+    def test_purge_delta_chain(self):
+        """Test purging a checkpoint together with its deltas."""
+        self.manager.purge_batches(self.batch_ids[:2])
+
+        third = self.manager.get_batch(self.batch_ids[2])
+        self.assertEqual(third.storage, BatchStorage.FULL)
+        for batch_id in self.batch_ids[2:]:
+            state = self.manager.get_state_at_batch(batch_id)
+            self.assertEqual(self.data_triples(state, batch_id), self.states[batch_id])
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+
+    def test_storage_survives_reload(self):
+        reloaded = BatchManager(self.store, metadata_dir=self.temp_dir, storage_mode="delta")
+        batch_id = self.batch_ids[1]
+
+        self.assertEqual(reloaded.get_batch(batch_id).storage, BatchStorage.DELTA)
+        self.assertEqual(self.data_triples(reloaded.get_state_at_batch(batch_id), batch_id),
+                         self.states[batch_id])
+
+    def test_invalid_storage_mode(self):
+        with self.assertRaises(ValueError):
+            BatchManager(self.store, metadata_dir=self.temp_dir, storage_mode="diff")
+
+
+class TestUnchangedLoads(unittest.TestCase):
+    """Test that input with the checksum of the active batch is not loaded again."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = Store()
+        self.manager = BatchManager(self.store, metadata_dir=self.temp_dir)
+        self.rdf_file = os.path.join(self.temp_dir, "batch.nt")
+        self.write_file('"v1"')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, value):
+        with open(self.rdf_file, 'w') as f:
+            f.write(f'<http://example.org/s> <http://example.org/p> {value} .\n')
+
+    def load(self, **kwargs):
+        batch = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.manager.load_batch_from_file(batch.batch_id, self.rdf_file,
+                                                     RdfFormat.N_TRIPLES, **kwargs)
+
+    def test_same_file_is_confirmed(self):
+        first = self.load()
+        quads = len(self.store)
+        second = self.load()
+
+        self.assertEqual(second.status, BatchStatus.CONFIRMED)
+        self.assertEqual(second.confirms, first.batch_id)
+        self.assertEqual(second.checksum, first.checksum)
+        self.assertEqual(len(self.store), quads)
+        self.assertEqual(self.manager.get_active_batch().batch_id, first.batch_id)
+
+        # The confirmation reads the data of the confirmed batch
+        self.assertEqual(set(self.manager.get_state_at_batch(second.batch_id)),
+                         set(self.manager.get_state_at_batch(first.batch_id)))
+        self.assertEqual(len(list(self.manager.query_at_batch(
+            second.batch_id, 'SELECT ?o WHERE { <http://example.org/s> ?p ?o }'))), 1)
+        diff = self.manager.compare_batches(first.batch_id, second.batch_id)
+        self.assertEqual(diff.added_count + diff.removed_count, 0)
+
+        # Still confirmed after a reload
+        reloaded = BatchManager(self.store, metadata_dir=self.temp_dir)
+        self.assertEqual(reloaded.get_batch(second.batch_id).status, BatchStatus.CONFIRMED)
+
+    def test_changed_file_is_loaded(self):
+        first = self.load()
+        self.write_file('"v2"')
+        second = self.load()
+
+        self.assertEqual(second.status, BatchStatus.ACTIVE)
+        self.assertNotEqual(second.checksum, first.checksum)
+
+    def test_force_load(self):
+        self.load()
+        second = self.load(skip_unchanged=False)
+        self.assertEqual(second.status, BatchStatus.ACTIVE)
+
+    def test_confirmations_go_with_their_batch(self):
+        first = self.load()
+        second = self.load()
+        self.write_file('"v2"')
+        self.load()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.manager.purge_batches([first.batch_id])
+        self.assertNotIn(second.batch_id, self.manager.batches)
+
+
+class TestStagedLoads(unittest.TestCase):
+    """Test staged activation and parallel loads of several products."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = Store()
+        self.manager = BatchManager(self.store, metadata_dir=self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def quads(self, value, count=3):
+        return [
+            Quad(NamedNode(f"http://example.org/s{i}"), NamedNode("http://example.org/p"), Literal(value))
+            for i in range(count)
+        ]
+
+    def load(self, quads, product="default", batch=None):
+        batch = batch or self.manager.create_batch(source_mapping="test.yaml", source_files=[], product=product)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.manager.load_batch_from_store(batch.batch_id, quads)
+
+    def test_staged_batch_is_not_active(self):
+        first = self.load(self.quads("v1"))
+        seen = []
+
+        def source():
+            seen.append((self.manager.get_active_batch().batch_id, second.status))
+            yield from self.quads("v2")
+
+        second = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.load(source(), batch=second)
+
+        self.assertEqual(seen, [(first.batch_id, BatchStatus.STAGING)])
+        self.assertEqual(second.status, BatchStatus.ACTIVE)
+        self.assertEqual(first.status, BatchStatus.SUPERSEDED)
+
+    def test_failed_load(self):
+        first = self.load(self.quads("v1"))
+
+        def source():
+            yield from self.quads("v2")
+            raise IOError("source went away")
+
+        second = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        with self.assertRaises(IOError):
+            self.load(source(), batch=second)
+
+        self.assertEqual(second.status, BatchStatus.FAILED)
+        self.assertEqual(self.manager.get_active_batch().batch_id, first.batch_id)
+        self.assertEqual(len(list(self.store.quads_for_pattern(None, None, None, NamedNode(second.graph_uri)))), 0)
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+
+        # Persisted, and a failed batch cannot be loaded again
+        reloaded = BatchManager(self.store, metadata_dir=self.temp_dir)
+        self.assertEqual(reloaded.get_batch(second.batch_id).status, BatchStatus.FAILED)
+        with self.assertRaises(ValueError):
+            self.load(self.quads("v2"), batch=second)
+
+    def test_older_batch_does_not_replace_newer(self):
+        older = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        newer = self.manager.create_batch(source_mapping="test.yaml", source_files=[])
+        self.load(self.quads("v2"), batch=newer)
+        self.load(self.quads("v1"), batch=older)
+
+        self.assertEqual(self.manager.get_active_batch().batch_id, newer.batch_id)
+        self.assertEqual(older.status, BatchStatus.SUPERSEDED)
+        self.assertEqual(older.superseded_by, newer.batch_id)
+
+    def test_products_have_their_own_active_batch(self):
+        orders = self.load(self.quads("o1"), product="orders")
+        customers = self.load(self.quads("c1"), product="customers")
+        orders2 = self.load(self.quads("o2"), product="orders")
+
+        self.assertEqual(self.manager.get_active_batch("orders").batch_id, orders2.batch_id)
+        self.assertEqual(self.manager.get_active_batch("customers").batch_id, customers.batch_id)
+        self.assertEqual(orders.superseded_by, orders2.batch_id)
+        self.assertIsNone(self.manager.get_active_batch())
+        self.assertEqual([b.batch_id for b in self.manager.list_batches(product="orders")],
+                         [orders2.batch_id, orders.batch_id])
+
+        facts = self.manager.facts_as_of("http://example.org/s0", datetime.now(timezone.utc), product="orders")
+        self.assertEqual([f['object'] for f in facts], ['"o2"'])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "validity_index_orders")))
+
+    def test_invalid_product(self):
+        with self.assertRaises(ValueError):
+            self.manager.create_batch(source_mapping="test.yaml", source_files=[], product="a/b")
+
+    def test_parallel_loads(self):
+        """Loads of several products in threads leave one active batch each."""
+        self.manager = BatchManager(self.store, metadata_dir=self.temp_dir, storage_mode='delta')
+        products = [f"product_{n}" for n in range(4)]
+        errors = []
+
+        def run(product):
+            try:
+                for version in range(3):
+                    self.load(self.quads(f"{product}-{version}", count=50), product=product)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(product,)) for product in products]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        batches = self.manager.list_batches()
+        self.assertEqual(sorted(b.batch_number for b in batches), list(range(1, 13)))
+        self.assertEqual(len(self.manager.list_batches(status=BatchStatus.ACTIVE)), 4)
+        for product in products:
+            active = self.manager.get_active_batch(product)
+            self.assertEqual(active.batch_number, max(b.batch_number for b in batches if b.product == product))
+            # Deltas are only taken against batches of the same product
+            for batch in self.manager.list_batches(product=product):
+                if batch.parent_batch:
+                    self.assertEqual(self.manager.get_batch(batch.parent_batch).product, product)
+            state = {q.object.value for q in self.manager.get_state_at_batch(active.batch_id)
+                     if q.predicate.value == "http://example.org/p"}
+            self.assertEqual(state, {f"{product}-2"})
+        self.assertEqual(self.manager.store_stats.total, len(self.store))
+
+
 def run_tests():
     """Run all batch management tests."""
     print("\n")
@@ -452,6 +1056,9 @@ def run_tests():
         TestBatchComparison,
         TestBatchPointInTimeQueries,
         TestBatchLifecycle,
+        TestDeltaStorage,
+        TestUnchangedLoads,
+        TestStagedLoads,
     ]
 
     for test_class in test_classes:
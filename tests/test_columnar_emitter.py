@@ -0,0 +1,145 @@
+"""
+Tests for the Columnar Quad Emitter
+===================================
+
+Tests for:
+- IRI, literal and graph term expressions
+- Literal escaping (quotes, backslashes, newlines)
+- Quad frames and N-Quads serialization
+- On-demand construction of pyoxigraph objects
+"""
+
+import sys
+import os
+import unittest
+from io import BytesIO
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl
+from pyoxigraph import Store, Quad, NamedNode, Literal, DefaultGraph, RdfFormat
+
+from columnar_emitter import (
+    quad_frame, iri_term, literal_term, to_nquads, write_nquads,
+    iter_quads, iter_triples, concat_frames, QUAD_COLUMNS
+)
+
+EX = "http://example.org/"
+XSD_DECIMAL = "http://www.w3.org/2001/XMLSchema#decimal"
+
+
+class TestQuadFrames(unittest.TestCase):
+    """Test building quad frames from a source frame."""
+
+    def setUp(self):
+        self.df = pl.DataFrame({
+            'id': ['1', '2'],
+            'title': ['Plain', 'Has "quotes", \\ and\nnewline'],
+            'score': ['0.5', '0.75'],
+        })
+        self.subject = iri_term(pl.concat_str([pl.lit(f"{EX}item/"), pl.col('id')]))
+
+    def test_frame_columns(self):
+        frame = quad_frame(self.df, self.subject, f"{EX}title", literal_term(pl.col('title')))
+
+        self.assertEqual(frame.columns, QUAD_COLUMNS)
+        self.assertEqual(frame.height, 2)
+        self.assertEqual(frame['s'][0], f"<{EX}item/1>")
+        self.assertEqual(frame['p'][1], f"<{EX}title>")
+        self.assertEqual(frame['g'][0], "")
+
+    def test_row_index(self):
+        frame = quad_frame(self.df, self.subject, f"{EX}title", literal_term(pl.col('title')),
+                           with_row_index=True)
+
+        self.assertEqual(frame.columns, ['row_idx'] + QUAD_COLUMNS)
+        self.assertEqual(frame['row_idx'].to_list(), [0, 1])
+
+    def test_carried_columns(self):
+        frame = quad_frame(self.df, self.subject, f"{EX}title", literal_term(pl.col('title')),
+                           with_row_index=True, carry=['id'])
+
+        self.assertEqual(frame.columns, ['row_idx'] + QUAD_COLUMNS + ['id'])
+        self.assertEqual(frame['id'].to_list(), ['1', '2'])
+
+    def test_lazy_source(self):
+        frame = quad_frame(self.df.lazy(), self.subject, f"{EX}title", literal_term(pl.col('title')))
+
+        eager = quad_frame(self.df, self.subject, f"{EX}title", literal_term(pl.col('title')))
+        self.assertIsInstance(frame, pl.LazyFrame)
+        self.assertTrue(frame.collect().equals(eager))
+
+    def test_literal_escaping_round_trip(self):
+        frame = quad_frame(self.df, self.subject, f"{EX}title", literal_term(pl.col('title')))
+        quads = list(iter_quads(frame))
+
+        self.assertEqual(quads[1].object, Literal('Has "quotes", \\ and\nnewline'))
+
+    def test_datatype_and_language(self):
+        typed = quad_frame(self.df, self.subject, f"{EX}score",
+                           literal_term(pl.col('score'), datatype=XSD_DECIMAL))
+        tagged = quad_frame(self.df, self.subject, f"{EX}title",
+                            literal_term(pl.col('title'), language='en'))
+
+        self.assertEqual(typed['o'][0], f'"0.5"^^<{XSD_DECIMAL}>')
+        self.assertEqual(next(iter_quads(tagged)).object, Literal('Plain', language='en'))
+
+    def test_named_graph(self):
+        frame = quad_frame(self.df, self.subject, f"{EX}p", iri_term(f"{EX}o"),
+                           graph_iri=f"{EX}graph/g1")
+        quad = next(iter_quads(frame))
+
+        self.assertEqual(quad.graph_name, NamedNode(f"{EX}graph/g1"))
+
+    def test_default_graph(self):
+        frame = quad_frame(self.df, self.subject, f"{EX}p", iri_term(f"{EX}o"))
+        quad = next(iter_quads(frame))
+
+        self.assertEqual(quad.graph_name, DefaultGraph())
+
+
+class TestSerialization(unittest.TestCase):
+    """Test N-Quads output of quad frames."""
+
+    def setUp(self):
+        df = pl.DataFrame({'id': ['a', 'b', 'c']})
+        subject = iri_term(pl.concat_str([pl.lit(f"{EX}x/"), pl.col('id')]))
+        self.frame = concat_frames([
+            quad_frame(df, subject, f"{EX}p", literal_term(pl.col('id'))),
+            quad_frame(df, subject, f"{EX}q", iri_term(f"{EX}o"), graph_iri=f"{EX}g"),
+        ])
+
+    def test_to_nquads_loads_into_store(self):
+        store = Store()
+        store.load(to_nquads(self.frame), RdfFormat.N_QUADS)
+
+        self.assertEqual(len(store), 6)
+        self.assertIn(
+            Quad(NamedNode(f"{EX}x/a"), NamedNode(f"{EX}q"), NamedNode(f"{EX}o"), NamedNode(f"{EX}g")),
+            store
+        )
+
+    def test_write_nquads_to_file_object(self):
+        buffer = BytesIO()
+        write_nquads(self.frame, buffer)
+
+        lines = buffer.getvalue().decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(all(line.endswith(' .') for line in lines))
+
+    def test_iter_triples(self):
+        triples = list(iter_triples(self.frame))
+
+        self.assertEqual(len(triples), 6)
+        self.assertEqual(triples[0].subject, NamedNode(f"{EX}x/a"))
+
+    def test_empty_frame(self):
+        empty = concat_frames([])
+
+        self.assertEqual(empty.columns, QUAD_COLUMNS)
+        self.assertEqual(to_nquads(empty), b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
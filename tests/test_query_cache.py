@@ -0,0 +1,370 @@
+"""
+Tests for the Query Cache
+=========================
+
+Tests for:
+- Normalizing query text
+- ETags and If-None-Match
+- LRU eviction by entries and bytes, invalidation by store generation
+- Single-flight execution of concurrent identical queries
+- The cache of the SPARQL endpoint
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from pyoxigraph import Store, Quad, NamedNode, Literal
+
+import fastapi_sparql_server as server
+from query_cache import QueryCache, normalize_query, etag_matches
+from query_executor import QueryExecutor
+from store_stats import StoreStats
+
+QUERY = "SELECT ?o WHERE { <http://example.org/s1> <http://example.org/p> ?o }"
+
+
+class TestNormalizeQuery(unittest.TestCase):
+    """Test the normalized query text."""
+
+    def test_whitespace(self):
+        self.assertEqual(normalize_query("  SELECT ?s\n\tWHERE {  ?s ?p ?o }\n"),
+                         "SELECT ?s WHERE { ?s ?p ?o }")
+
+    def test_comments(self):
+        self.assertEqual(normalize_query("# all subjects\nSELECT ?s # the subject\nWHERE { ?s ?p ?o }"),
+                         "SELECT ?s WHERE { ?s ?p ?o }")
+
+    def test_strings_and_iris_kept(self):
+        query = 'SELECT * WHERE { ?s <http://example.org/a#b> "a  #b" ; <http://x/p> """two\n  lines""" }'
+        self.assertEqual(normalize_query(query), query)
+
+    def test_less_than(self):
+        self.assertEqual(normalize_query("FILTER(?a <  ?b)"), "FILTER(?a < ?b)")
+
+
+class TestETag(unittest.TestCase):
+    """Test ETags."""
+
+    def setUp(self):
+        self.cache = QueryCache()
+
+    def test_etag_depends_on_key_and_generation(self):
+        key = self.cache.key(QUERY)
+        self.assertEqual(self.cache.etag(key, 1), self.cache.etag(self.cache.key(f"  {QUERY}\n"), 1))
+        self.assertNotEqual(self.cache.etag(key, 1), self.cache.etag(key, 2))
+        self.assertNotEqual(self.cache.etag(key, 1), self.cache.etag(self.cache.key(QUERY, 'text/csv'), 1))
+        self.assertNotEqual(self.cache.etag(key, 1), QueryCache().etag(key, 1))
+
+    def test_if_none_match(self):
+        etag = self.cache.etag(self.cache.key(QUERY), 1)
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", {etag}', etag))
+        self.assertTrue(etag_matches(etag[2:], etag))
+        self.assertTrue(etag_matches('*', etag))
+        self.assertFalse(etag_matches('"other"', etag))
+        self.assertFalse(etag_matches(None, etag))
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test the LRU cache."""
+
+    def test_hit_and_miss(self):
+        cache = QueryCache()
+        self.assertIsNone(cache.get('q', 1))
+        cache.put('q', 1, 'text/csv', b'o\n1\n')
+
+        entry = cache.get('q', 1)
+        self.assertEqual((entry.media_type, entry.body), ('text/csv', b'o\n1\n'))
+        self.assertEqual(cache.to_dict()['hits'], 1)
+        self.assertEqual(cache.to_dict()['misses'], 1)
+        self.assertEqual(cache.to_dict()['hit_rate'], 0.5)
+
+    def test_new_generation_misses(self):
+        cache = QueryCache()
+        cache.put('q', 1, 'text/csv', b'old')
+        self.assertIsNone(cache.get('q', 2))
+        # The stale entry is dropped
+        self.assertEqual(cache.to_dict()['entries'], 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = QueryCache(max_entries=2)
+        cache.put('a', 1, 'text/csv', b'a')
+        cache.put('b', 1, 'text/csv', b'b')
+        cache.get('a', 1)
+        cache.put('c', 1, 'text/csv', b'c')
+
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_byte_limit(self):
+        cache = QueryCache(max_bytes=100, max_entry_bytes=60)
+        cache.put('a', 1, 'text/csv', b'x' * 50)
+        cache.put('b', 1, 'text/csv', b'x' * 50)
+        cache.put('c', 1, 'text/csv', b'x' * 61)
+
+        self.assertEqual(cache.to_dict()['bytes'], 100)
+        self.assertEqual(cache.stats['too_large'], 1)
+        cache.put('c', 1, 'text/csv', b'x' * 10)
+        self.assertIsNone(cache.get('a', 1))
+        self.assertEqual(cache.to_dict()['bytes'], 60)
+
+    def test_disabled(self):
+        cache = QueryCache(max_entries=0)
+        cache.put('q', 1, 'text/csv', b'x')
+        self.assertIsNone(cache.get('q', 1))
+
+
+class TestFlight(unittest.TestCase):
+    """Test sharing one execution between concurrent requests."""
+
+    def setUp(self):
+        self.starts = 0
+
+    def source(self, *chunks, delay=0.01, error=None):
+        """start() of an execution yielding the media type and chunks"""
+        async def start(disconnected):
+            self.starts += 1
+
+            async def items():
+                yield 'text/csv'
+                for chunk in chunks:
+                    await asyncio.sleep(delay)
+                    yield chunk
+                if error is not None:
+                    raise error
+            return items()
+        return start
+
+    async def read(self, iterator):
+        return [chunk async for chunk in iterator]
+
+    def test_concurrent_requests_share_execution(self):
+        cache = QueryCache()
+        start = self.source(b'o\n', b'1\n', b'2\n')
+
+        async def scenario():
+            return await asyncio.gather(*(self.read(cache.flight('q', 1, start)) for _ in range(10)))
+
+        responses = asyncio.run(scenario())
+        self.assertEqual(self.starts, 1)
+        self.assertEqual(responses, [['text/csv', b'o\n', b'1\n', b'2\n']] * 10)
+        self.assertEqual(cache.stats['coalesced'], 9)
+        self.assertEqual(cache.get('q', 1).body, b'o\n1\n2\n')
+        self.assertEqual(cache.to_dict()['in_flight'], 0)
+
+    def test_late_request_reads_from_start(self):
+        cache = QueryCache()
+        start = self.source(b'a', b'b', b'c', delay=0.02)
+
+        async def scenario():
+            first = asyncio.ensure_future(self.read(cache.flight('q', 1, start)))
+            await asyncio.sleep(0.03)
+            second = await self.read(cache.flight('q', 1, start))
+            return await first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(self.starts, 1)
+
+    def test_other_generation_runs_again(self):
+        cache = QueryCache()
+        start = self.source(b'a')
+
+        async def scenario():
+            await asyncio.gather(self.read(cache.flight('q', 1, start)), self.read(cache.flight('q', 2, start)))
+
+        asyncio.run(scenario())
+        self.assertEqual(self.starts, 2)
+
+    def test_coalesce_off(self):
+        cache = QueryCache(coalesce=False)
+        start = self.source(b'a')
+
+        async def scenario():
+            await asyncio.gather(*(self.read(cache.flight('q', 1, start)) for _ in range(3)))
+
+        asyncio.run(scenario())
+        self.assertEqual(self.starts, 3)
+
+    def test_errors_reach_every_request(self):
+        cache = QueryCache()
+        start = self.source(b'a', error=ValueError("failed"))
+
+        async def scenario():
+            return await asyncio.gather(*(self.read(cache.flight('q', 1, start)) for _ in range(3)),
+                                        return_exceptions=True)
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in asyncio.run(scenario())))
+        self.assertEqual(self.starts, 1)
+        self.assertIsNone(cache.get('q', 1))
+
+    def test_large_response_takes_no_more_requests(self):
+        cache = QueryCache(max_entry_bytes=3)
+        start = self.source(b'ab', b'cd', b'ef', delay=0.02)
+
+        async def scenario():
+            first = asyncio.ensure_future(self.read(cache.flight('q', 1, start)))
+            await asyncio.sleep(0.05)
+            second = await self.read(cache.flight('q', 1, start))
+            return await first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(self.starts, 2)
+        self.assertIsNone(cache.get('q', 1))
+
+    def test_leaving_request_keeps_execution(self):
+        cache = QueryCache()
+        start = self.source(b'a', b'b', b'c')
+
+        async def scenario():
+            leaving = cache.flight('q', 1, start)
+            staying = asyncio.ensure_future(self.read(cache.flight('q', 1, start)))
+            await leaving.__anext__()
+            await leaving.aclose()
+            return await staying
+
+        self.assertEqual(asyncio.run(scenario()), ['text/csv', b'a', b'b', b'c'])
+
+    def test_last_request_leaving_cancels(self):
+        cache = QueryCache()
+        closed = []
+
+        async def start(disconnected):
+            async def items():
+                try:
+                    yield 'text/csv'
+                    while True:
+                        await asyncio.sleep(0.01)
+                        yield b'x'
+                finally:
+                    closed.append(True)
+            return items()
+
+        async def scenario():
+            reader = cache.flight('q', 1, start)
+            await reader.__anext__()
+            await reader.__anext__()
+            await reader.aclose()
+            await asyncio.sleep(0.05)
+
+        asyncio.run(scenario())
+        self.assertEqual(closed, [True])
+        self.assertEqual(cache.to_dict()['in_flight'], 0)
+
+
+class TestEndpointCache(unittest.TestCase):
+    """Test the cache of the SPARQL endpoint."""
+
+    def setUp(self):
+        store = Store()
+        store.extend(
+            Quad(NamedNode(f"http://example.org/s{i}"), NamedNode("http://example.org/p"), Literal(str(i)))
+            for i in range(100)
+        )
+        self.saved = server.store, server.store_stats, server.executor, server.cache
+        server.store = store
+        server.store_stats = StoreStats(store)
+        server.executor = QueryExecutor(max_workers=2, timeout=5.0)
+        server.cache = QueryCache()
+
+    def tearDown(self):
+        server.executor.shutdown()
+        server.store, server.store_stats, server.executor, server.cache = self.saved
+
+    def requests(self, *requests):
+        """Send (method, headers) requests for QUERY in turn"""
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = []
+                for method, headers in requests:
+                    if method == 'GET':
+                        responses.append(await client.get("/sparql", params={"query": QUERY}, headers=headers))
+                    else:
+                        responses.append(await client.post("/sparql", content=QUERY, headers={
+                            'Content-Type': 'application/sparql-query', **headers}))
+                return responses
+        return asyncio.run(scenario())
+
+    def test_second_request_is_cached(self):
+        first, second = self.requests(('GET', {}), ('GET', {}))
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first.headers['etag'], second.headers['etag'])
+        self.assertEqual(second.headers['content-type'], 'application/sparql-results+json')
+        self.assertEqual(server.cache.stats['hits'], 1)
+        self.assertEqual(server.executor.stats['completed'], 1)
+
+    def test_concurrent_requests_run_once(self):
+        query = "SELECT (COUNT(*) AS ?c) WHERE { ?a ?p ?x . ?b ?p ?y }"
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(client.get("/sparql", params={"query": query}) for _ in range(8)))
+
+        responses = asyncio.run(scenario())
+        self.assertEqual({r.status_code for r in responses}, {200})
+        self.assertEqual(len({r.content for r in responses}), 1)
+        self.assertEqual(server.executor.stats['completed'], 1)
+        self.assertEqual(server.cache.stats['coalesced'], 7)
+
+    def test_cached_per_accept(self):
+        json_response, csv_response = self.requests(('GET', {}), ('GET', {'Accept': 'text/csv'}))
+        self.assertTrue(csv_response.headers['content-type'].startswith('text/csv'))
+        self.assertNotEqual(json_response.headers['etag'], csv_response.headers['etag'])
+        self.assertEqual(server.cache.stats['hits'], 0)
+
+    def test_not_modified(self):
+        first, = self.requests(('GET', {}))
+        etag = first.headers['etag']
+        revalidated, posted = self.requests(('GET', {'If-None-Match': etag}), ('POST', {'If-None-Match': etag}))
+
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers['etag'], etag)
+        self.assertEqual(revalidated.content, b'')
+        self.assertEqual(posted.status_code, 200)
+        self.assertEqual(server.cache.stats['not_modified'], 1)
+
+    def test_write_invalidates(self):
+        first, = self.requests(('GET', {}))
+        server.store.add(Quad(NamedNode("http://example.org/s1"), NamedNode("http://example.org/p"), Literal("new")))
+        server.store_stats.add(1)
+        revalidated, second = self.requests(('GET', {'If-None-Match': first.headers['etag']}), ('GET', {}))
+
+        self.assertEqual(revalidated.status_code, 200)
+        self.assertNotEqual(revalidated.headers['etag'], first.headers['etag'])
+        self.assertEqual(len(second.json()['results']['bindings']), 2)
+        self.assertEqual(server.cache.stats['hits'], 1)
+
+    def test_errors_not_cached(self):
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return [await client.get("/sparql", params={"query": "SELECT WHERE"}) for _ in range(2)]
+
+        self.assertEqual([r.status_code for r in asyncio.run(scenario())], [400, 400])
+        self.assertEqual(server.cache.to_dict()['entries'], 0)
+
+    def test_stats(self):
+        self.requests(('GET', {}), ('GET', {}))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/stats")
+
+        cache_stats = asyncio.run(scenario()).json()['query_cache']
+        self.assertEqual((cache_stats['hits'], cache_stats['misses'], cache_stats['entries']), (1, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,353 @@
+"""
+Tests for the Query Executor
+============================
+
+Tests for:
+- Running blocking work off the event loop
+- Timeouts and cancellation of queries
+- Bounding the queries run at once
+- Streaming chunks from a worker
+- The SPARQL endpoint on the executor
+- Content negotiation of the endpoint's results
+"""
+
+import sys
+import os
+import asyncio
+import io
+import json
+import threading
+import time
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import polars as pl
+from pyoxigraph import Store, Quad, NamedNode, Literal
+
+from store_stats import StoreStats
+
+import fastapi_sparql_server as server
+from query_cache import QueryCache
+from query_executor import QueryExecutor, QueryTimeout, QueryCancelled, check_cancelled
+
+# Cross join of every ?p triple with itself: slow, but a single pyoxigraph call
+HEAVY_QUERY = "SELECT (COUNT(*) AS ?c) WHERE { ?a <http://example.org/p> ?x . ?b <http://example.org/p> ?y }"
+LIGHT_QUERY = "SELECT ?o WHERE { <http://example.org/s1> <http://example.org/p> ?o }"
+
+
+def sleeper(seconds):
+    """Work that sleeps in small steps and stops once cancelled"""
+    def work(cancel):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            check_cancelled(cancel)
+            time.sleep(0.005)
+        return seconds
+    return work
+
+
+class TestQueryExecutor(unittest.TestCase):
+    """Test the bounded pool."""
+
+    def setUp(self):
+        self.executor = QueryExecutor(max_workers=2, timeout=5.0)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_result(self):
+        self.assertEqual(self.run_async(self.executor.run(lambda cancel: 42)), 42)
+        self.assertEqual(self.executor.to_dict()['completed'], 1)
+
+    def test_errors_propagate(self):
+        def fail(cancel):
+            raise ValueError("bad query")
+
+        with self.assertRaises(ValueError):
+            self.run_async(self.executor.run(fail))
+        self.assertEqual(self.executor.stats['failed'], 1)
+
+    def test_event_loop_not_blocked(self):
+        async def scenario():
+            ticks = 0
+            task = asyncio.ensure_future(self.executor.run(sleeper(0.3)))
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return ticks, task.result()
+
+        ticks, result = self.run_async(scenario())
+        self.assertEqual(result, 0.3)
+        self.assertGreater(ticks, 10)
+
+    def test_timeout_cancels_work(self):
+        cancelled = threading.Event()
+
+        def work(cancel):
+            try:
+                sleeper(5)(cancel)
+            except QueryCancelled:
+                cancelled.set()
+                raise
+
+        start = time.monotonic()
+        with self.assertRaises(QueryTimeout):
+            self.run_async(self.executor.run(work, timeout=0.1))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertTrue(cancelled.wait(1.0))
+        self.assertEqual(self.executor.stats['timeouts'], 1)
+
+    def test_disconnect_cancels_work(self):
+        async def scenario():
+            calls = []
+
+            async def disconnected():
+                calls.append(1)
+                return len(calls) >= 2
+
+            with self.assertRaises(QueryCancelled):
+                await self.executor.run(sleeper(5), disconnected=disconnected)
+
+        self.run_async(scenario())
+        self.assertEqual(self.executor.stats['cancelled'], 1)
+
+    def test_bounded(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def work(cancel):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+        async def scenario():
+            await asyncio.gather(*(self.executor.run(work) for _ in range(6)))
+
+        self.run_async(scenario())
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(self.executor.stats['running'], 0)
+
+    def test_waiting_counts_towards_timeout(self):
+        async def scenario():
+            busy = [asyncio.ensure_future(self.executor.run(sleeper(0.5))) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with self.assertRaises(QueryTimeout):
+                await self.executor.run(lambda cancel: 1, timeout=0.1)
+            await asyncio.gather(*busy)
+
+        self.run_async(scenario())
+
+
+class TestStream(unittest.TestCase):
+    """Test streaming chunks from a worker."""
+
+    def setUp(self):
+        self.executor = QueryExecutor(max_workers=1, timeout=5.0)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def collect(self, fn, **kwargs):
+        async def scenario():
+            chunks = await self.executor.stream(fn, **kwargs)
+            return [chunk async for chunk in chunks]
+        return asyncio.run(scenario())
+
+    def test_chunks(self):
+        def work(cancel, emit):
+            for i in range(50):
+                emit(i)
+
+        self.assertEqual(self.collect(work), list(range(50)))
+        self.assertEqual(self.executor.stats['completed'], 1)
+
+    def test_empty(self):
+        self.assertEqual(self.collect(lambda cancel, emit: None), [])
+
+    def test_error_before_first_chunk(self):
+        def work(cancel, emit):
+            raise ValueError("does not parse")
+
+        async def scenario():
+            with self.assertRaises(ValueError):
+                await self.executor.stream(work)
+
+        asyncio.run(scenario())
+        self.assertEqual(self.executor.stats['failed'], 1)
+
+    def test_close_cancels_work(self):
+        closed = threading.Event()
+        stopped = threading.Event()
+
+        def work(cancel, emit):
+            emit(0)
+            # Only emit again once the consumer has closed the stream
+            closed.wait(10.0)
+            try:
+                emit(1)
+            except QueryCancelled:
+                stopped.set()
+                raise
+
+        async def scenario():
+            chunks = await self.executor.stream(work)
+            await chunks.__anext__()
+            await chunks.aclose()
+            closed.set()
+
+        asyncio.run(scenario())
+        self.assertTrue(stopped.wait(10.0))
+        # The worker is free again
+        self.assertEqual(self.collect(lambda cancel, emit: emit(1)), [1])
+
+    def test_timeout(self):
+        def work(cancel, emit):
+            emit(0)
+            sleeper(5)(cancel)
+
+        async def scenario():
+            chunks = await self.executor.stream(work, timeout=0.1)
+            self.assertEqual(await chunks.__anext__(), 0)
+            with self.assertRaises(QueryTimeout):
+                await chunks.__anext__()
+
+        asyncio.run(scenario())
+
+
+class TestSparqlEndpoint(unittest.TestCase):
+    """Test the SPARQL endpoint on the executor."""
+
+    def setUp(self):
+        store = Store()
+        store.extend(
+            Quad(NamedNode(f"http://example.org/s{i}"), NamedNode("http://example.org/p"), Literal(str(i)))
+            for i in range(2000)
+        )
+        self.saved = server.store, server.store_stats, server.executor, server.cache
+        server.store = store
+        server.store_stats = StoreStats(store)
+        server.executor = QueryExecutor(max_workers=2, timeout=5.0)
+        server.cache = QueryCache(max_entries=0, coalesce=False)
+
+    def tearDown(self):
+        server.executor.shutdown()
+        server.store, server.store_stats, server.executor, server.cache = self.saved
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+    def test_select(self):
+        async def scenario():
+            async with self.client() as client:
+                return await client.get("/sparql", params={"query": LIGHT_QUERY})
+
+        response = asyncio.run(scenario())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['content-type'], 'application/sparql-results+json')
+        self.assertEqual(response.json()['results']['bindings'], [{'o': {'type': 'literal', 'value': '1'}}])
+        self.assertEqual(response.json()['meta']['result_count'], 1)
+
+    def test_large_select_streams(self):
+        """The body is sent in several messages (httpx would join them)."""
+        messages = []
+
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # The client stays connected
+            await asyncio.sleep(60)
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/sparql', 'raw_path': b'/sparql', 'root_path': '',
+            'query_string': b'query=SELECT+%2A+WHERE+%7B+%3Fs+%3Fp+%3Fo+%7D', 'headers': [],
+            'server': ('test', 80), 'client': ('test', 1234),
+        }
+        asyncio.run(server.app(scope, receive, send))
+
+        self.assertEqual(messages[0]['status'], 200)
+        bodies = [m['body'] for m in messages if m['type'] == 'http.response.body' and m.get('body')]
+        self.assertGreater(len(bodies), 2)
+        self.assertEqual(json.loads(b''.join(bodies))['meta']['result_count'], 2000)
+
+    def get(self, query, accept=None):
+        async def scenario():
+            async with self.client() as client:
+                headers = {'Accept': accept} if accept else {}
+                return await client.get("/sparql", params={"query": query}, headers=headers)
+        return asyncio.run(scenario())
+
+    def test_accept_csv(self):
+        response = self.get(LIGHT_QUERY, accept='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('text/csv'))
+        self.assertEqual(response.headers['vary'], 'Accept')
+        self.assertEqual(response.text.splitlines(), ['o', '1'])
+
+    def test_accept_arrow(self):
+        response = self.get("SELECT ?s ?o WHERE { ?s ?p ?o }", accept='application/vnd.apache.arrow.stream')
+        self.assertEqual(response.headers['content-type'], 'application/vnd.apache.arrow.stream')
+        self.assertEqual(pl.read_ipc_stream(io.BytesIO(response.content)).shape, (2000, 2))
+
+    def test_accept_n_triples(self):
+        response = self.get("CONSTRUCT WHERE { <http://example.org/s1> ?p ?o }", accept='application/n-triples')
+        self.assertEqual(response.headers['content-type'], 'application/n-triples')
+        self.assertEqual(response.text, '<http://example.org/s1> <http://example.org/p> "1" .\n')
+
+    def test_not_acceptable(self):
+        self.assertEqual(self.get(LIGHT_QUERY, accept='image/png').status_code, 406)
+        self.assertEqual(self.get("CONSTRUCT WHERE { ?s ?p ?o }", accept='text/csv').status_code, 406)
+
+    def test_bad_query(self):
+        async def scenario():
+            async with self.client() as client:
+                return await client.get("/sparql", params={"query": "SELECT WHERE"})
+
+        self.assertEqual(asyncio.run(scenario()).status_code, 400)
+
+    def test_health_during_heavy_query(self):
+        async def scenario():
+            async with self.client() as client:
+                heavy = asyncio.ensure_future(client.get("/sparql", params={"query": HEAVY_QUERY}))
+                await asyncio.sleep(0.05)
+                start = time.monotonic()
+                health = await client.get("/health")
+                health_time = time.monotonic() - start
+                light = await client.get("/sparql", params={"query": LIGHT_QUERY})
+                heavy_done = heavy.done()
+                await heavy
+                return health, health_time, light, heavy_done
+
+        health, health_time, light, heavy_done = asyncio.run(scenario())
+        self.assertEqual(health.status_code, 200)
+        self.assertEqual(light.status_code, 200)
+        self.assertFalse(heavy_done)
+        self.assertLess(health_time, 0.1)
+
+    def test_timeout(self):
+        server.executor.timeout = 0.05
+
+        async def scenario():
+            async with self.client() as client:
+                return await client.get("/sparql", params={"query": HEAVY_QUERY})
+
+        self.assertEqual(asyncio.run(scenario()).status_code, 504)
+
+
+if __name__ == '__main__':
+    unittest.main()
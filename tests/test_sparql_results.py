@@ -0,0 +1,261 @@
+"""
+Tests for the SPARQL Results Serializer
+=======================================
+
+Tests for:
+- Encoding terms by their class (IRIs, literals, blank nodes, triple terms)
+- Streaming SELECT, ASK and CONSTRUCT results in chunks
+- Negotiating the result format
+- CSV/TSV, XML, RDF and columnar (Arrow IPC, Parquet) results
+"""
+
+import sys
+import os
+import io
+import json
+import threading
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl
+from pyoxigraph import Store, Quad, Triple, NamedNode, BlankNode, Literal
+
+from query_executor import QueryCancelled
+import sparql_results
+from sparql_results import (
+    NotAcceptable, negotiate, result_media_type, write_results, iter_solutions_json, term_to_json,
+    SOLUTIONS_FORMATS, TRIPLES_FORMATS, SPARQL_JSON, SPARQL_XML, JSON, CSV, TSV, ARROW_STREAM, PARQUET,
+    N_TRIPLES, TURTLE
+)
+
+EX = "http://example.org/"
+XSD_INTEGER = "http://www.w3.org/2001/XMLSchema#integer"
+
+
+def body(chunks):
+    return json.loads(b''.join(chunks))
+
+
+def encode(results, accept=None, **kwargs):
+    """Media type and chunks of results"""
+    media_type = result_media_type(results, accept)
+    chunks = []
+    write_results(results, media_type, chunks.append, **kwargs)
+    return media_type, chunks
+
+
+class TestTermToJson(unittest.TestCase):
+    """Test the JSON objects of terms."""
+
+    def test_iri(self):
+        self.assertEqual(term_to_json(NamedNode(f"{EX}x")), {'type': 'uri', 'value': f"{EX}x"})
+
+    def test_blank_node(self):
+        self.assertEqual(term_to_json(BlankNode("b1")), {'type': 'bnode', 'value': 'b1'})
+
+    def test_literals(self):
+        self.assertEqual(term_to_json(Literal('say "a^^b"')), {'type': 'literal', 'value': 'say "a^^b"'})
+        self.assertEqual(term_to_json(Literal("chat", language="fr")),
+                         {'type': 'literal', 'value': 'chat', 'xml:lang': 'fr'})
+        self.assertEqual(term_to_json(Literal("1", datatype=NamedNode(XSD_INTEGER))),
+                         {'type': 'literal', 'value': '1', 'datatype': XSD_INTEGER})
+
+    def test_triple_term(self):
+        triple = Triple(NamedNode(f"{EX}s"), NamedNode(f"{EX}p"), Literal("o"))
+        self.assertEqual(term_to_json(triple), {'type': 'triple', 'value': {
+            'subject': {'type': 'uri', 'value': f"{EX}s"},
+            'predicate': {'type': 'uri', 'value': f"{EX}p"},
+            'object': {'type': 'literal', 'value': 'o'},
+        }})
+
+
+class TestSerializeResults(unittest.TestCase):
+    """Test streaming query results."""
+
+    def setUp(self):
+        self.store = Store()
+        self.store.extend(
+            Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p"), Literal(str(i), datatype=NamedNode(XSD_INTEGER)))
+            for i in range(25)
+        )
+
+    def test_select(self):
+        media_type, chunks = encode(
+            self.store.query(f"SELECT ?s ?o ?unbound WHERE {{ ?s <{EX}p> ?o }} ORDER BY ?o"))
+        data = body(chunks)
+
+        self.assertEqual(media_type, SPARQL_JSON)
+        self.assertEqual(data['head'], {'vars': ['s', 'o', 'unbound']})
+        self.assertEqual(len(data['results']['bindings']), 25)
+        self.assertEqual(data['results']['bindings'][0], {
+            's': {'type': 'uri', 'value': f"{EX}s0"},
+            'o': {'type': 'literal', 'value': '0', 'datatype': XSD_INTEGER},
+        })
+
+    def test_chunks(self):
+        for rows in (1, 7, 25, 100):
+            chunks = list(iter_solutions_json(
+                self.store.query(f"SELECT ?s WHERE {{ ?s <{EX}p> ?o }}"), chunk_rows=rows,
+                footer=lambda count: {'meta': {'result_count': count}}))
+            data = body(chunks)
+            self.assertEqual(len(data['results']['bindings']), 25)
+            self.assertEqual(data['meta'], {'result_count': 25})
+            self.assertEqual(len(chunks), 2 + -(-25 // rows))
+
+    def test_empty_select(self):
+        data = body(encode(self.store.query("SELECT ?x WHERE { ?x ?x ?x }"))[1])
+        self.assertEqual(data['results']['bindings'], [])
+
+    def test_ask(self):
+        media_type, chunks = encode(self.store.query("ASK { ?s ?p ?o }"))
+        self.assertEqual(media_type, SPARQL_JSON)
+        self.assertEqual(body(chunks), {'head': {}, 'boolean': True})
+
+    def test_construct(self):
+        media_type, chunks = encode(
+            self.store.query(f"CONSTRUCT WHERE {{ <{EX}s1> ?p ?o }}"))
+        self.assertEqual(media_type, JSON)
+        self.assertEqual(body(chunks), {
+            'triples': [f'<{EX}s1> <{EX}p> "1"^^<{XSD_INTEGER}>'],
+            'count': 1
+        })
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        chunks = iter_solutions_json(self.store.query("SELECT * WHERE { ?s ?p ?o }"), cancel, chunk_rows=5)
+        next(chunks)
+        next(chunks)
+        cancel.set()
+        with self.assertRaises(QueryCancelled):
+            list(chunks)
+
+
+class TestNegotiate(unittest.TestCase):
+    """Test choosing a media type from an Accept header."""
+
+    def test_default(self):
+        self.assertEqual(negotiate(None, SOLUTIONS_FORMATS), SPARQL_JSON)
+        self.assertEqual(negotiate('', SOLUTIONS_FORMATS), SPARQL_JSON)
+        self.assertEqual(negotiate('*/*', TRIPLES_FORMATS), JSON)
+
+    def test_exact(self):
+        self.assertEqual(negotiate('text/csv', SOLUTIONS_FORMATS), CSV)
+        self.assertEqual(negotiate('application/n-triples', TRIPLES_FORMATS), N_TRIPLES)
+
+    def test_quality(self):
+        self.assertEqual(negotiate(f'{CSV};q=0.5, {ARROW_STREAM}', SOLUTIONS_FORMATS), ARROW_STREAM)
+        self.assertEqual(negotiate(f'{CSV};q=0.5, {TSV};q=0.9', SOLUTIONS_FORMATS), TSV)
+        self.assertEqual(negotiate('application/json, */*;q=0', SOLUTIONS_FORMATS), JSON)
+
+    def test_wildcards(self):
+        self.assertEqual(negotiate('text/*', SOLUTIONS_FORMATS), CSV)
+        self.assertEqual(negotiate('text/*', TRIPLES_FORMATS), TURTLE)
+        # A browser gets the default
+        self.assertEqual(negotiate('text/html,application/xml;q=0.9,*/*;q=0.8', SOLUTIONS_FORMATS), SPARQL_JSON)
+
+    def test_not_acceptable(self):
+        self.assertIsNone(negotiate('image/png', SOLUTIONS_FORMATS))
+        self.assertIsNone(negotiate(f'{CSV};q=0', SOLUTIONS_FORMATS))
+        with self.assertRaises(NotAcceptable):
+            result_media_type(Store().query("CONSTRUCT WHERE { ?s ?p ?o }"), 'text/csv')
+
+
+class TestResultFormats(unittest.TestCase):
+    """Test the non-JSON result formats."""
+
+    def setUp(self):
+        self.store = Store()
+        self.store.extend(
+            Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p"), Literal(f'say "{i}", ok'))
+            for i in range(25)
+        )
+        self.select = f"SELECT ?s ?o ?unbound WHERE {{ ?s <{EX}p> ?o }} ORDER BY ?s"
+
+    def test_csv(self):
+        media_type, chunks = encode(self.store.query(self.select), CSV)
+        lines = b''.join(chunks).decode().splitlines()
+        self.assertEqual(media_type, CSV)
+        self.assertEqual(lines[0], 's,o,unbound')
+        self.assertEqual(lines[1], f'{EX}s0,"say ""0"", ok",')
+        self.assertEqual(len(lines), 26)
+
+    def test_tsv(self):
+        lines = b''.join(encode(self.store.query(self.select), TSV)[1]).decode().splitlines()
+        self.assertEqual(lines[0], '?s\t?o\t?unbound')
+        self.assertEqual(lines[1], f'<{EX}s0>\t"say \\"0\\", ok"\t')
+
+    def test_xml(self):
+        media_type, chunks = encode(self.store.query("ASK { ?s ?p ?o }"), SPARQL_XML)
+        self.assertEqual(media_type, SPARQL_XML)
+        self.assertIn(b'<boolean>true</boolean>', b''.join(chunks))
+
+    def test_n_triples(self):
+        media_type, chunks = encode(self.store.query(f"CONSTRUCT WHERE {{ <{EX}s1> ?p ?o }}"), N_TRIPLES)
+        self.assertEqual(media_type, N_TRIPLES)
+        self.assertEqual(b''.join(chunks).decode(), f'<{EX}s1> <{EX}p> "say \\"1\\", ok" .\n')
+
+    def test_turtle_round_trip(self):
+        _, chunks = encode(self.store.query("CONSTRUCT WHERE { ?s ?p ?o }"), TURTLE)
+        store = Store()
+        store.load(b''.join(chunks), format=sparql_results.RdfFormat.TURTLE)
+        self.assertEqual(len(store), 25)
+
+    def test_chunks(self):
+        store = Store()
+        store.extend(Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p"), Literal(str(i))) for i in range(5000))
+        _, chunks = encode(store.query("SELECT * WHERE { ?s ?p ?o }"), CSV)
+        self.assertGreater(len(chunks), 2)
+        self.assertTrue(all(len(chunk) >= sparql_results.CHUNK_BYTES for chunk in chunks[:-1]))
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 5001)
+
+    def test_arrow_stream(self):
+        saved = sparql_results.COLUMNAR_ROWS
+        sparql_results.COLUMNAR_ROWS = 10
+        try:
+            media_type, chunks = encode(self.store.query(self.select), ARROW_STREAM)
+        finally:
+            sparql_results.COLUMNAR_ROWS = saved
+        frame = pl.read_ipc_stream(io.BytesIO(b''.join(chunks)))
+
+        self.assertEqual(media_type, ARROW_STREAM)
+        self.assertEqual(frame.columns, ['s', 'o', 'unbound'])
+        self.assertEqual(frame.height, 25)
+        self.assertEqual(frame.row(0), (f"{EX}s0", 'say "0", ok', None))
+        self.assertEqual(frame['s'].to_list(), sorted(frame['s'].to_list()))
+
+    def test_arrow_stream_empty(self):
+        _, chunks = encode(self.store.query("SELECT ?x ?y WHERE { ?x ?x ?y }"), ARROW_STREAM)
+        frame = pl.read_ipc_stream(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(frame.columns, ['x', 'y'])
+        self.assertEqual(frame.height, 0)
+
+    def test_parquet(self):
+        media_type, chunks = encode(self.store.query(self.select), PARQUET)
+        frame = pl.read_parquet(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(media_type, PARQUET)
+        self.assertEqual(frame.shape, (25, 3))
+        self.assertEqual(frame['o'][24], 'say "9", ok')
+
+    def test_columnar_terms(self):
+        store = Store()
+        store.add(Quad(BlankNode("b1"), NamedNode(f"{EX}p"), Literal("1", datatype=NamedNode(XSD_INTEGER))))
+        _, chunks = encode(store.query("SELECT ?s ?o WHERE { ?s ?p ?o }"), ARROW_STREAM)
+        frame = pl.read_ipc_stream(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(frame.row(0), ('b1', '1'))
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        cancel.set()
+        saved = sparql_results.CHUNK_BYTES
+        sparql_results.CHUNK_BYTES = 64
+        try:
+            with self.assertRaises(QueryCancelled):
+                encode(self.store.query(self.select), CSV, cancel=cancel)
+        finally:
+            sparql_results.CHUNK_BYTES = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,373 @@
+"""
+Tests for the Bulk Store Ingest Layer
+=====================================
+
+Tests for:
+- Batched bulk_extend inserts and graph rewriting
+- Bulk loading of serialized RDF (bytes and files)
+- Graph copies between and within stores
+- Ingest reports
+- Writing stores to files and streams, with compression
+- Graph views
+- Opening in-memory and on-disk stores
+"""
+
+import sys
+import os
+import gzip
+import hashlib
+import io
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyoxigraph import Store, Quad, NamedNode, Literal, DefaultGraph, RdfFormat
+
+from store_io import (
+    GraphView, IngestReport, bulk_add, bulk_load_bytes, bulk_load_file, copy_graph,
+    file_digest, open_store, rdf_format_for_path, write_store,
+)
+from store_stats import StoreStats
+
+EX = "http://example.org/"
+
+
+def make_quads(count, graph=None):
+    """Quads with distinct subjects, optionally in a named graph."""
+    return [
+        Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p"), Literal(str(i)), graph)
+        for i in range(count)
+    ]
+
+
+class TestBulkAdd(unittest.TestCase):
+    """Test batched inserts of Quad objects."""
+
+    def test_batches_cover_all_quads(self):
+        store = Store()
+        report = bulk_add(store, iter(make_quads(25)), batch_size=10)
+
+        self.assertEqual(report.quads, 25)
+        self.assertEqual(len(store), 25)
+
+    def test_rewrite_graph(self):
+        store = Store()
+        graph = NamedNode(f"{EX}graph/batch")
+        bulk_add(store, make_quads(3), to_graph=graph)
+
+        self.assertEqual(len(list(store.quads_for_pattern(None, None, None, graph))), 3)
+        self.assertEqual(len(list(store.quads_for_pattern(None, None, None, DefaultGraph()))), 0)
+
+    def test_empty_input(self):
+        store = Store()
+        report = bulk_add(store, [])
+
+        self.assertEqual(report.quads, 0)
+        self.assertEqual(report.rate, 0.0)
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            bulk_add(Store(), make_quads(1), batch_size=0)
+
+
+class TestBulkLoad(unittest.TestCase):
+    """Test bulk loading of serialized RDF."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.data = b"".join(
+            f'<{EX}s{i}> <{EX}p> "{i}" <{EX}g> .\n'.encode() for i in range(5)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_bytes_counts_input_quads(self):
+        store = Store()
+        store.add(Quad(NamedNode(f"{EX}s0"), NamedNode(f"{EX}p"), Literal("0"), NamedNode(f"{EX}g")))
+        data = b"# comment\n\n" + self.data + b"<http://example.org/x> <http://example.org/p> \"x\" ."
+        report = bulk_load_bytes(store, data, RdfFormat.N_QUADS)
+
+        # The statements of the input, whatever the store already holds
+        self.assertEqual(report.quads, 6)
+        self.assertEqual(len(store), 6)
+
+    def test_load_does_not_count_store(self):
+        store = Store()
+        bulk_add(store, make_quads(10))
+
+        class CountingStore:
+            """Store wrapper that fails when the store is counted"""
+            def __init__(self, store):
+                self.store = store
+
+            def __len__(self):
+                raise AssertionError("the store was counted")
+
+            def __getattr__(self, name):
+                return getattr(self.store, name)
+
+        counting = CountingStore(store)
+        self.assertEqual(bulk_load_bytes(counting, self.data, RdfFormat.N_QUADS).quads, 5)
+        # Other formats are loaded natively and left uncounted
+        self.assertIsNone(bulk_load_bytes(counting, b'<urn:a> <urn:b> <urn:c> .', RdfFormat.TURTLE).quads)
+
+    def test_load_trig_keeps_named_graphs(self):
+        data = f'<{EX}a> <{EX}b> <{EX}c> . <{EX}g> {{ <{EX}a> <{EX}b> <{EX}d> }}'.encode()
+        store = Store()
+        graph = NamedNode(f"{EX}graph/batch")
+        bulk_load_bytes(store, data, RdfFormat.TRIG, to_graph=graph)
+
+        self.assertEqual(len(store), 2)
+        self.assertIn(Quad(NamedNode(f"{EX}a"), NamedNode(f"{EX}b"), NamedNode(f"{EX}c"), graph), store)
+        self.assertIn(Quad(NamedNode(f"{EX}a"), NamedNode(f"{EX}b"), NamedNode(f"{EX}d"), NamedNode(f"{EX}g")),
+                      store)
+
+    def test_load_file_into_graph(self):
+        path = os.path.join(self.temp_dir, 'data.ttl')
+        with open(path, 'w') as f:
+            f.write(f'<{EX}a> <{EX}b> <{EX}c> .\n')
+
+        store = Store()
+        graph = NamedNode(f"{EX}graph/file")
+        report = bulk_load_file(store, path, RdfFormat.TURTLE, to_graph=graph)
+
+        self.assertIsNone(report.quads)
+        self.assertEqual(StoreStats(store).recount_graph(graph.value), 1)
+        self.assertIn(Quad(NamedNode(f"{EX}a"), NamedNode(f"{EX}b"), NamedNode(f"{EX}c"), graph), store)
+
+    def test_load_empty_file(self):
+        path = os.path.join(self.temp_dir, 'empty.nq')
+        open(path, 'wb').close()
+
+        self.assertEqual(bulk_load_file(Store(), path, RdfFormat.N_QUADS).quads, 0)
+
+    def test_uncounted_report(self):
+        report = IngestReport(quads=3, seconds=1.0)
+        report.merge(IngestReport(quads=None, seconds=1.0))
+
+        self.assertIsNone(report.quads)
+        self.assertEqual((report.seconds, report.rate), (2.0, 0.0))
+        self.assertIn("not counted", str(report))
+
+
+class TestCopyGraph(unittest.TestCase):
+    """Test graph copies."""
+
+    def setUp(self):
+        self.graph = NamedNode(f"{EX}graph/source")
+        self.store = Store()
+        bulk_add(self.store, make_quads(4, self.graph))
+        bulk_add(self.store, make_quads(2))
+
+    def test_copy_to_other_store(self):
+        target = Store()
+        report = copy_graph(self.store, target, self.graph)
+
+        self.assertEqual(report.quads, 4)
+        self.assertEqual(len(target), 4)
+
+    def test_copy_within_store(self):
+        copy_graph(self.store, self.store, self.graph, to_graph=NamedNode(f"{EX}graph/copy"))
+
+        copied = list(self.store.quads_for_pattern(None, None, None, NamedNode(f"{EX}graph/copy")))
+        self.assertEqual(len(copied), 4)
+
+
+class TestIngestReport(unittest.TestCase):
+    """Test ingest reports."""
+
+    def test_merge_and_rate(self):
+        report = IngestReport(quads=100, seconds=1.0)
+        report.merge(IngestReport(quads=300, seconds=1.0))
+
+        self.assertEqual(report.quads, 400)
+        self.assertEqual(report.rate, 200.0)
+        self.assertIn("quads/s", str(report))
+
+
+class TestWriteStore(unittest.TestCase):
+    """Test serializing stores into files."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.graph = NamedNode(f"{EX}graph/out")
+        self.store = Store()
+        bulk_add(self.store, make_quads(3, self.graph))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_trig_uses_prefixes(self):
+        path = os.path.join(self.temp_dir, 'out.trig')
+        size = write_store(self.store, path, prefixes={'ex': EX})
+
+        with open(path) as f:
+            content = f.read()
+        self.assertEqual(size, os.path.getsize(path))
+        self.assertTrue(content.startswith(f'@prefix ex: <{EX}> .'))
+        self.assertIn('ex:s0', content)
+
+        reloaded = Store()
+        reloaded.load(path=path, format=RdfFormat.TRIG)
+        self.assertEqual(set(reloaded), set(self.store))
+
+    def test_nquads_from_extension(self):
+        path = os.path.join(self.temp_dir, 'out.nq')
+        write_store(self.store, path, prefixes={'ex': EX})
+
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(line.endswith(f'<{EX}graph/out> .') for line in lines))
+
+    def test_single_graph_as_triples(self):
+        bulk_add(self.store, make_quads(2))
+        path = os.path.join(self.temp_dir, 'out.nt')
+        write_store(self.store, path, from_graph=self.graph)
+
+        reloaded = Store()
+        bulk_load_file(reloaded, path, RdfFormat.N_TRIPLES)
+        self.assertEqual(len(reloaded), 3)
+
+    def test_single_graph_keeps_graph_name(self):
+        bulk_add(self.store, make_quads(2))
+        path = os.path.join(self.temp_dir, 'out.nq')
+        write_store(self.store, path, from_graph=self.graph)
+
+        reloaded = Store()
+        bulk_load_file(reloaded, path, RdfFormat.N_QUADS)
+        self.assertEqual(set(reloaded), set(self.store.quads_for_pattern(None, None, None, self.graph)))
+
+    def test_snapshot_quads(self):
+        snapshot = self.store.quads_for_pattern(None, None, None, self.graph)
+        expected = set(self.store)
+        self.store.add(Quad(NamedNode(f"{EX}later"), NamedNode(f"{EX}p"), Literal("x"), self.graph))
+        path = os.path.join(self.temp_dir, 'out.nq')
+        write_store(self.store, path, quads=snapshot)
+
+        reloaded = Store()
+        bulk_load_file(reloaded, path, RdfFormat.N_QUADS)
+        self.assertEqual(set(reloaded), expected)
+
+    def test_gzip_from_extension(self):
+        path = os.path.join(self.temp_dir, 'out.nq.gz')
+        size = write_store(self.store, path)
+
+        self.assertEqual(size, os.path.getsize(path))
+        with gzip.open(path) as f:
+            lines = f.read().decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_write_to_stream(self):
+        output = io.BytesIO()
+        size = write_store(self.store, output, RdfFormat.N_QUADS, compression='gzip')
+
+        self.assertIsNone(size)
+        reloaded = Store()
+        bulk_load_bytes(reloaded, gzip.decompress(output.getvalue()), RdfFormat.N_QUADS)
+        self.assertEqual(set(reloaded), set(self.store))
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            write_store(self.store, io.BytesIO(), RdfFormat.N_QUADS, compression='lz4')
+
+    def test_file_digest(self):
+        path = os.path.join(self.temp_dir, 'out.nq')
+        write_store(self.store, path)
+
+        with open(path, 'rb') as f:
+            self.assertEqual(file_digest(path).hexdigest(), hashlib.sha256(f.read()).hexdigest())
+
+    def test_format_for_path(self):
+        self.assertEqual(rdf_format_for_path('data.nquads'), RdfFormat.N_QUADS)
+        self.assertEqual(rdf_format_for_path('data.ttl'), RdfFormat.TURTLE)
+        self.assertEqual(rdf_format_for_path('data.nq.gz'), RdfFormat.N_QUADS)
+        self.assertEqual(rdf_format_for_path('data.out'), RdfFormat.TRIG)
+
+
+class TestGraphView(unittest.TestCase):
+    """Test read-only views of one graph."""
+
+    def setUp(self):
+        self.graph = NamedNode(f"{EX}graph/view")
+        self.store = Store()
+        bulk_add(self.store, make_quads(3, self.graph))
+        bulk_add(self.store, make_quads(5))
+
+    def test_reads_only_the_graph(self):
+        view = GraphView(self.store, self.graph)
+
+        self.assertIs(view.store, self.store)
+        self.assertEqual(len(view), 3)
+        self.assertEqual(len(list(view)), 3)
+        self.assertEqual(len(list(view.quads_for_pattern(NamedNode(f"{EX}s0")))), 1)
+        self.assertEqual(len(list(view.query("SELECT ?s WHERE { ?s ?p ?o }"))), 3)
+
+    def test_contains(self):
+        view = GraphView(self.store, self.graph)
+        quad = next(iter(view))
+
+        self.assertIn(quad, view)
+        self.assertNotIn(Quad(quad.subject, quad.predicate, quad.object), view)
+
+    def test_build_on_first_read(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return self.store
+
+        view = GraphView(None, self.graph, build=build)
+        self.assertEqual(calls, [])
+        self.assertEqual(len(view), 3)
+        list(view)
+        self.assertEqual(calls, [1])
+
+    def test_store_or_build(self):
+        with self.assertRaises(ValueError):
+            GraphView(None, self.graph)
+        with self.assertRaises(ValueError):
+            GraphView(self.store, self.graph, build=lambda: self.store)
+
+
+class TestOpenStore(unittest.TestCase):
+    """Test opening in-memory and on-disk stores."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'store')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_on_disk_store_persists(self):
+        store = open_store(self.path)
+        bulk_add(store, make_quads(3))
+        store.flush()
+        del store
+
+        self.assertEqual(len(open_store(self.path)), 3)
+
+    def test_read_only_store(self):
+        store = open_store(self.path)
+        bulk_add(store, make_quads(2))
+        store.flush()
+
+        reader = open_store(self.path, read_only=True)
+        self.assertEqual(len(reader), 2)
+        with self.assertRaises(Exception):
+            reader.add(make_quads(1)[0])
+
+    def test_read_only_needs_existing_store(self):
+        with self.assertRaises(FileNotFoundError):
+            open_store(self.path, read_only=True)
+        with self.assertRaises(ValueError):
+            open_store(read_only=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Tests for Store Statistics
+==========================
+
+Tests for:
+- Running quad counts recorded by writers
+- Native recounts of unknown counts
+- Per-graph and annotation counts
+- Store generations
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyoxigraph import Store, Quad, Triple, NamedNode, BlankNode, Literal
+
+from store_io import bulk_add
+from store_stats import StoreStats, DEFAULT_GRAPH, RDF_REIFIES
+
+EX = "http://example.org/"
+
+
+def make_quads(count, graph=None):
+    """Quads with distinct subjects, optionally in a named graph."""
+    return [
+        Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p"), Literal(str(i)), graph)
+        for i in range(count)
+    ]
+
+
+def annotation(index, graph=None):
+    """One rdf:reifies statement about a base triple."""
+    base = Triple(NamedNode(f"{EX}s{index}"), NamedNode(f"{EX}p"), Literal(str(index)))
+    return Quad(BlankNode(), NamedNode(RDF_REIFIES), base, graph)
+
+
+class TestRunningCounts(unittest.TestCase):
+    """Test counts recorded by writers."""
+
+    def test_counts_start_at_zero_for_empty_store(self):
+        stats = StoreStats(Store(), empty=True)
+
+        self.assertEqual(stats.total, 0)
+        self.assertEqual(stats.graph_counts, {})
+        self.assertEqual(stats.annotations, 0)
+
+    def test_recorded_counts_are_not_recomputed(self):
+        store = Store()
+        stats = StoreStats(store, empty=True)
+        graph = f"{EX}graph/a"
+        report = bulk_add(store, make_quads(3, NamedNode(graph)) + [annotation(0, NamedNode(graph))])
+        stats.add(report.quads, graph=graph, annotations=1)
+
+        # Writes that bypass the stats are not seen by the running counts
+        store.add(Quad(NamedNode(f"{EX}x"), NamedNode(f"{EX}p"), Literal("x")))
+
+        self.assertEqual(stats.total, 4)
+        self.assertEqual(stats.graph_counts, {graph: 4})
+        self.assertEqual(stats.annotations, 1)
+
+    def test_unreported_annotations_are_recounted(self):
+        store = Store()
+        stats = StoreStats(store, empty=True)
+        stats.add(bulk_add(store, [annotation(0), annotation(1)]).quads, graph=DEFAULT_GRAPH)
+
+        self.assertEqual(stats.annotations, 2)
+
+    def test_remove_graph(self):
+        store = Store()
+        stats = StoreStats(store, empty=True)
+        for name in ('a', 'b'):
+            graph = f"{EX}graph/{name}"
+            stats.add(bulk_add(store, make_quads(2, NamedNode(graph))).quads, graph=graph)
+
+        store.remove_graph(NamedNode(f"{EX}graph/a"))
+        stats.remove_graph(f"{EX}graph/a")
+
+        self.assertEqual(stats.total, 2)
+        self.assertEqual(stats.named_graphs, [f"{EX}graph/b"])
+
+    def test_recount_graph_corrects_upper_bound(self):
+        store = Store()
+        stats = StoreStats(store, empty=True)
+        graph = f"{EX}graph/a"
+        # The same quads twice: 6 recorded, 3 stored
+        for _ in range(2):
+            stats.add(bulk_add(store, make_quads(3, NamedNode(graph))).quads, graph=graph)
+
+        self.assertEqual(stats.recount_graph(graph), 3)
+        self.assertEqual(stats.total, 3)
+        self.assertEqual(stats.graph_counts, {graph: 3})
+
+    def test_recount_default_graph(self):
+        store = Store()
+        stats = StoreStats(store, empty=True)
+        bulk_add(store, make_quads(2))
+        bulk_add(store, make_quads(3, NamedNode(f"{EX}graph/a")))
+
+        self.assertEqual(stats.recount_graph(DEFAULT_GRAPH), 2)
+        self.assertEqual(stats.graph_counts, {DEFAULT_GRAPH: 2})
+
+
+class TestNativeCounts(unittest.TestCase):
+    """Test counts recomputed from the store."""
+
+    def setUp(self):
+        self.store = Store()
+        bulk_add(self.store, make_quads(3))
+        bulk_add(self.store, make_quads(2, NamedNode(f"{EX}graph/a")))
+        self.store.add(annotation(0))
+        self.store.add(annotation(1, NamedNode(f"{EX}graph/a")))
+
+    def test_counts_of_existing_store(self):
+        stats = StoreStats(self.store)
+
+        self.assertEqual(stats.total, 7)
+        self.assertEqual(stats.graph_counts, {DEFAULT_GRAPH: 4, f"{EX}graph/a": 3})
+        self.assertEqual(stats.annotations, 2)
+
+    def test_load_into_several_graphs_recounts_graphs(self):
+        stats = StoreStats(self.store)
+        self.assertEqual(stats.graph_count(f"{EX}graph/a"), 3)
+
+        report = bulk_add(self.store, make_quads(4, NamedNode(f"{EX}graph/b")))
+        stats.add(report.quads)
+
+        self.assertEqual(stats.total, 11)
+        self.assertEqual(stats.graph_count(f"{EX}graph/b"), 4)
+
+    def test_invalidate(self):
+        stats = StoreStats(self.store)
+        self.assertEqual(stats.total, 7)
+
+        self.store.add(Quad(NamedNode(f"{EX}x"), NamedNode(f"{EX}p"), Literal("x")))
+        stats.invalidate()
+
+        self.assertEqual(stats.total, 8)
+        self.assertEqual(stats.to_dict(), {'total_quads': 8, 'graph_count': 1, 'annotations': 2})
+
+
+
+class TestGeneration(unittest.TestCase):
+    """Test the generation moved by recorded writes."""
+
+    def test_writes_move_generation(self):
+        stats = StoreStats(Store(), empty=True)
+        generations = [stats.generation]
+        stats.add(3, graph=f"{EX}graph/a")
+        generations.append(stats.generation)
+        stats.recount_graph(f"{EX}graph/a")
+        generations.append(stats.generation)
+        stats.remove_graph(f"{EX}graph/a", 3)
+        generations.append(stats.generation)
+        stats.invalidate()
+        generations.append(stats.generation)
+
+        self.assertEqual(generations, sorted(set(generations)))
+
+    def test_reads_keep_generation(self):
+        stats = StoreStats(Store(), empty=True)
+        generation = stats.generation
+        stats.total, stats.graph_counts, stats.annotations
+        self.assertEqual(stats.generation, generation)
+
+    def test_new_stats_get_new_generation(self):
+        store = Store()
+        first = StoreStats(store, empty=True)
+        self.assertGreater(StoreStats(store, empty=True).generation, first.generation)
+
+
+if __name__ == '__main__':
+    unittest.main()
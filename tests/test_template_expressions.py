@@ -0,0 +1,114 @@
+"""
+Tests for the Polars template expression compiler
+==================================================
+
+Tests for:
+- Equivalence with the row-by-row template instantiation
+- Sanitization of special characters, nulls and empty values
+- Prefix expansion and the ~iri marker
+- Pass-through of absolute IRIs in bare column references
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl
+
+from template_expressions import compile_template, compile_iri_reference
+from rdf_star_etl_yarrrml import (
+    instantiate_template_vectorized, sanitize_uri_component, expand_uri, TEMPLATE_VAR_PATTERN
+)
+
+
+PREFIXES = {
+    'ex': 'http://example.org/',
+    'xsd': 'http://www.w3.org/2001/XMLSchema#',
+}
+
+
+def instantiate_row_by_row(template, df, prefixes):
+    """Reference implementation (the engines' original per-row loop)."""
+    results = []
+    for row in df.to_dicts():
+        result = template
+        for var in TEMPLATE_VAR_PATTERN.findall(template):
+            result = result.replace(f"$({var})", sanitize_uri_component(row.get(var, '')))
+        result = result.replace('~iri', '')
+        results.append(expand_uri(result, prefixes))
+    return results
+
+
+class TestCompileTemplate(unittest.TestCase):
+    """Test compiled templates against the row-by-row implementation."""
+
+    def setUp(self):
+        self.df = pl.DataFrame({
+            'id': ['DS-1', 'a b/c', '', None, 'naïve'],
+            'num': [1, 2, None, 4, 5],
+            'score': [0.84, 1.0, 2.5, None, 0.1],
+            'flag': [True, False, None, True, False],
+        })
+
+    def assertMatchesReference(self, template):
+        expected = instantiate_row_by_row(template, self.df, PREFIXES)
+        actual = instantiate_template_vectorized(template, self.df, PREFIXES).to_list()
+        self.assertEqual(actual, expected)
+
+    def test_prefixed_template(self):
+        self.assertMatchesReference('ex:dataset/$(id)')
+
+    def test_multiple_variables(self):
+        self.assertMatchesReference('ex:item/$(id)/$(num)')
+
+    def test_numeric_and_boolean_columns(self):
+        self.assertMatchesReference('$(score)')
+        self.assertMatchesReference('ex:flag/$(flag)')
+
+    def test_missing_column_renders_unknown(self):
+        self.assertMatchesReference('ex:thing/$(missing)')
+
+    def test_iri_marker_removed(self):
+        self.assertMatchesReference('ex:org/$(id)~iri')
+
+    def test_prefix_after_variable(self):
+        self.assertMatchesReference('$(id)ex:suffix')
+
+    def test_constant_template(self):
+        expr = compile_template('ex:constant', PREFIXES)
+        result = self.df.select(expr.alias('value')).to_series().to_list()
+        self.assertEqual(result, ['http://example.org/constant'])
+
+    def test_unknown_prefix_kept(self):
+        self.assertMatchesReference('other:item/$(id)')
+
+    def test_result_is_utf8_column(self):
+        series = instantiate_template_vectorized('ex:dataset/$(id)', self.df, PREFIXES)
+        self.assertIsInstance(series, pl.Series)
+        self.assertEqual(series.dtype, pl.Utf8)
+        self.assertEqual(series.len(), self.df.height)
+
+
+class TestCompileIriReference(unittest.TestCase):
+    """Test IRI object references."""
+
+    def test_absolute_iris_pass_through(self):
+        df = pl.DataFrame({'theme': ['http://example.org/themes/A', 'Finance Risk', None]})
+        expr = compile_iri_reference('$(theme)', PREFIXES, df.schema)
+        result = df.select(expr.alias('value')).to_series().to_list()
+
+        self.assertEqual(result, ['http://example.org/themes/A', 'Finance_Risk', 'unknown'])
+
+    def test_non_reference_template(self):
+        df = pl.DataFrame({'owner': ['Sales Ops']})
+        expr = compile_iri_reference('ex:org/$(owner)', PREFIXES, df.schema)
+        result = df.select(expr.alias('value')).to_series().to_list()
+
+        self.assertEqual(result, ['http://example.org/org/Sales_Ops'])
+
+
+if __name__ == '__main__':
+    unittest.main()
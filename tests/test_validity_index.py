@@ -0,0 +1,137 @@
+"""
+Tests for the Validity Index
+============================
+
+Tests for:
+- Opening and closing intervals on updates
+- States at earlier batches
+- Stores built from a state and moved between batches
+- Append-only partitions of closed intervals
+- Batch ordering
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl
+from pyoxigraph import Store, Quad, Triple, NamedNode, Literal
+
+from validity_index import ValidityIndex
+
+EX = "http://example.org/"
+
+
+def batch_store(graph, values):
+    """A store with one <s{i}> <p> "value" triple per value in a graph."""
+    store = Store()
+    for i, value in enumerate(values):
+        store.add(Quad(NamedNode(f"{EX}s{i}"), NamedNode(f"{EX}p"), Literal(value), graph))
+    return store
+
+
+class TestValidityIndex(unittest.TestCase):
+    """Test valid-time intervals across batch updates."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = ValidityIndex(os.path.join(self.temp_dir, "validity_index"))
+        self.graph = NamedNode(f"{EX}batch/b")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_updates_count_changes(self):
+        self.assertEqual(self.index.update(batch_store(self.graph, ["a", "b"]), self.graph, 1), 2)
+        # s1 changes: one interval closes, one opens
+        self.assertEqual(self.index.update(batch_store(self.graph, ["a", "c"]), self.graph, 2), 2)
+        self.assertEqual(self.index.last_batch, 2)
+        self.assertEqual(self.index.scan().collect().height, 3)
+        # Nothing version-dependent (such as a Polars hash) is persisted
+        self.assertEqual(self.index.scan().collect_schema().names(), ['s', 'p', 'o', 'valid_from', 'valid_to'])
+
+    def test_state_at_earlier_batch(self):
+        self.index.update(batch_store(self.graph, ["a", "b"]), self.graph, 1)
+        self.index.update(batch_store(self.graph, ["a"]), self.graph, 2)
+
+        self.assertEqual(self.index.state(1).height, 2)
+        self.assertEqual(self.index.state(2)['o'].to_list(), ['"a"'])
+        self.assertEqual(self.index.state(1, subject=f"<{EX}s1>")['o'].to_list(), ['"b"'])
+
+    def test_state_store(self):
+        store = batch_store(self.graph, ["a"])
+        base = Triple(NamedNode(f"{EX}s0"), NamedNode(f"{EX}p"), Literal("a"))
+        store.add(Quad(NamedNode(f"{EX}r"), NamedNode(f"{EX}about"), base, self.graph))
+        self.index.update(store, self.graph, 1)
+
+        state = self.index.state_store(1)
+        self.assertEqual({(q.subject, q.predicate, q.object) for q in state},
+                         {(q.subject, q.predicate, q.object) for q in store})
+
+    def test_empty_batch_closes_everything(self):
+        self.index.update(batch_store(self.graph, ["a"]), self.graph, 1)
+        self.index.update(Store(), self.graph, 2)
+
+        self.assertEqual(self.index.state(2).height, 0)
+        self.assertEqual(len(self.index.state_store(2)), 0)
+
+    def test_changes_between_batches(self):
+        self.index.update(batch_store(self.graph, ["a", "b"]), self.graph, 1)
+        self.index.update(batch_store(self.graph, ["a", "c"]), self.graph, 2)
+        self.index.update(batch_store(self.graph, ["a", "c", "d"]), self.graph, 3)
+
+        added, removed = self.index.changes(1, 3)
+        self.assertEqual(sorted(added['o'].to_list()), ['"c"', '"d"'])
+        self.assertEqual(removed['o'].to_list(), ['"b"'])
+        added, removed = self.index.changes(3, 2)
+        self.assertEqual((added.height, removed['o'].to_list()), (0, ['"d"']))
+
+    def test_move_state(self):
+        for batch_number, values in enumerate([["a", "b"], ["a", "c"], ["d"]], start=1):
+            self.index.update(batch_store(self.graph, values), self.graph, batch_number)
+
+        store = Store()
+        position = 0
+        for batch_number in (3, 1, 2, 3):
+            self.index.move_state(store, position, batch_number)
+            position = batch_number
+            self.assertEqual({q.object for q in store},
+                             {q.object for q in self.index.state_store(batch_number)})
+        self.assertEqual(self.index.move_state(store, 3, 3), 0)
+
+    def test_closed_intervals_are_appended(self):
+        self.index.update(batch_store(self.graph, ["a", "b"]), self.graph, 1)
+        self.index.update(batch_store(self.graph, ["a", "c"]), self.graph, 2)
+        closed_2 = os.path.join(self.index.path, "closed_2.parquet")
+        written = os.stat(closed_2).st_mtime_ns
+        self.index.update(batch_store(self.graph, ["d", "c"]), self.graph, 3)
+
+        self.assertEqual(os.stat(closed_2).st_mtime_ns, written)
+        self.assertEqual(sorted(os.listdir(self.index.path)),
+                         ["closed_2.parquet", "closed_3.parquet", "open.parquet"])
+        self.assertEqual(self.index.scan_open().collect().height, 2)
+        self.assertEqual(self.index.state(1)['o'].sort().to_list(), ['"a"', '"b"'])
+
+    def test_uncommitted_partition_is_ignored(self):
+        self.index.update(batch_store(self.graph, ["a"]), self.graph, 1)
+        # Left by an update of batch 2 that failed before replacing open.parquet
+        self.index.scan_open().with_columns(valid_to=pl.col('valid_from') + 1).collect().write_parquet(
+            os.path.join(self.index.path, "closed_2.parquet"))
+
+        self.assertEqual(self.index.scan().collect().height, 1)
+        self.index.update(batch_store(self.graph, ["a"]), self.graph, 2)
+        self.assertEqual(self.index.state(2)['o'].to_list(), ['"a"'])
+
+    def test_batches_must_be_newer(self):
+        self.index.update(batch_store(self.graph, ["a"]), self.graph, 2)
+        with self.assertRaises(ValueError):
+            self.index.update(batch_store(self.graph, ["a"]), self.graph, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,589 @@
+"""
+Tests for the YARRRML Direct ETL Engine
+=======================================
+
+Tests for:
+- Columnar quad generation for regular triples maps
+- RDF-star annotations from quoted triples maps
+- N-Quads emission mode and output formats
+- Chunked streaming mode
+- Column projection of sources
+- Process-pool execution of triples maps
+- Loading into a named graph of a shared store
+"""
+
+import sys
+import os
+import io
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import polars as pl
+from pyoxigraph import Store, Quad, NamedNode, Literal, BlankNode, RdfFormat
+
+from rdf_star_etl_yarrrml import RDFStarETLEngine, content_digest
+from store_stats import StoreStats
+
+EX = "http://example.org/"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+DCAT = "http://www.w3.org/ns/dcat#"
+PROV = "http://www.w3.org/ns/prov#"
+
+MAPPING = """
+prefixes:
+  ex:   "http://example.org/"
+  dcat: "http://www.w3.org/ns/dcat#"
+  dct:  "http://purl.org/dc/terms/"
+  prov: "http://www.w3.org/ns/prov#"
+  xsd:  "http://www.w3.org/2001/XMLSchema#"
+
+mappings:
+  datasetTM:
+    sources:
+      - ['products.csv~csv']
+    subject: ex:dataset/$(dataset_id)
+    predicateobjects:
+      - [a, dcat:Dataset]
+      - [dct:title, $(title), xsd:string]
+      - [dct:publisher, ex:org/$(owner)~iri]
+
+  datasetThemeTM:
+    sources:
+      - ['products.csv~csv']
+    subject: ex:dataset/$(dataset_id)
+    predicateobjects:
+      - predicates: dcat:theme
+        objects:
+          value: $(theme_uri)
+          type: iri
+
+  themeGovernanceTM:
+    sources:
+      - ['lineage.csv~csv']
+    subject:
+      - function: join(quoted=datasetThemeTM, equal(str1=$(dataset_id), str2=$(dataset_id)))
+    predicateobjects:
+      - predicates: prov:wasDerivedFrom
+        objects:
+          value: ex:system/$(source_system)
+          type: iri
+      - [ex:confidence, $(confidence), xsd:decimal]
+
+  activityTM:
+    sources:
+      - ['lineage.csv~csv']
+    subject: ex:activity/$(run_id)
+    predicateobjects:
+      - [a, prov:Activity]
+"""
+
+PRODUCTS_CSV = """dataset_id,title,notes,owner,theme_uri
+DS-1,Sales Metrics,not mapped,Sales Ops,http://example.org/themes/Finance
+DS-2,"Risk ""Scores"" v2",not mapped,Risk,https://example.org/themes/Compliance
+DS-3,Unused,not mapped,Nobody,http://example.org/themes/Other
+"""
+
+LINEAGE_CSV = """dataset_id,source_system,confidence,run_id,row_count
+DS-1,IBM_IGC,0.840,RUN_1,10
+DS-2,ALATION,0.98,RUN_1,20
+"""
+
+
+def write_fixture(directory):
+    """Write the test mapping and CSV sources into a directory."""
+    mapping_path = os.path.join(directory, 'mapping.yaml')
+    with open(mapping_path, 'w') as f:
+        f.write(MAPPING)
+    with open(os.path.join(directory, 'products.csv'), 'w') as f:
+        f.write(PRODUCTS_CSV)
+    with open(os.path.join(directory, 'lineage.csv'), 'w') as f:
+        f.write(LINEAGE_CSV)
+    return mapping_path
+
+
+def run_engine(mapping_path, output_path, **kwargs):
+    """Run the engine quietly and return it."""
+    engine = RDFStarETLEngine(mapping_path, output_path, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run()
+    return engine
+
+
+def comparable_quads(store):
+    """Quads without blank node labels or run timestamps, for cross-run comparison."""
+    result = set()
+    for quad in store:
+        if quad.predicate == NamedNode("http://purl.org/dc/terms/created"):
+            continue
+        subject = '_' if isinstance(quad.subject, BlankNode) else str(quad.subject)
+        result.add((subject, str(quad.predicate), str(quad.object), str(quad.graph_name)))
+    return result
+
+
+class TestRegularTriplesMaps(unittest.TestCase):
+    """Test quads generated for regular triples maps."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.mapping = write_fixture(cls.temp_dir)
+        cls.engine = run_engine(cls.mapping, os.path.join(cls.temp_dir, 'out.trig'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_type_statements(self):
+        self.assertIn(
+            Quad(NamedNode(f"{EX}dataset/DS-1"),
+                 NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#type"),
+                 NamedNode(f"{DCAT}Dataset")),
+            self.engine.store
+        )
+
+    def test_typed_literal_with_quotes(self):
+        self.assertIn(
+            Quad(NamedNode(f"{EX}dataset/DS-2"), NamedNode("http://purl.org/dc/terms/title"),
+                 Literal("Risk__Scores__v2", datatype=NamedNode(f"{XSD}string"))),
+            self.engine.store
+        )
+
+    def test_iri_column_reference(self):
+        theme = NamedNode(f"{DCAT}theme")
+        self.assertIn(
+            Quad(NamedNode(f"{EX}dataset/DS-1"), theme, NamedNode(f"{EX}themes/Finance")),
+            self.engine.store
+        )
+        self.assertIn(
+            Quad(NamedNode(f"{EX}dataset/DS-2"), theme, NamedNode("https://example.org/themes/Compliance")),
+            self.engine.store
+        )
+
+    def test_stats(self):
+        self.assertEqual(self.engine.stats['rows_processed'], 5)
+        self.assertEqual(self.engine.stats['files_processed'], 2)
+        # 3 rows x 3 (datasetTM) + 3 rows x 1 (datasetThemeTM) + 2 rows x 1 (activityTM)
+        self.assertEqual(self.engine.stats['triples_generated'], 14)
+
+
+class TestQuotedTriplesMaps(unittest.TestCase):
+    """Test RDF-star annotations."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.mapping = write_fixture(cls.temp_dir)
+        cls.engine = run_engine(cls.mapping, os.path.join(cls.temp_dir, 'out.trig'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_annotations_reify_theme_triples(self):
+        query = """
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX dcat: <http://www.w3.org/ns/dcat#>
+        PREFIX prov: <http://www.w3.org/ns/prov#>
+        PREFIX ex: <http://example.org/>
+
+        SELECT ?dataset ?system ?confidence WHERE {
+            ?r rdf:reifies <<( ?dataset dcat:theme ?theme )>> ;
+               prov:wasDerivedFrom ?system ;
+               ex:confidence ?confidence .
+        }
+        """
+        rows = {(str(r['dataset']), str(r['system']), r['confidence'].value)
+                for r in self.engine.store.query(query)}
+
+        self.assertIn((f"<{EX}dataset/DS-1>", f"<{EX}system/IBM_IGC>", "0.84"), rows)
+        self.assertIn((f"<{EX}dataset/DS-2>", f"<{EX}system/ALATION>", "0.98"), rows)
+        self.assertEqual(len(rows), 2)
+
+    def test_only_referenced_map_is_annotated(self):
+        reifies = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#reifies")
+        reified = [quad.object for quad in self.engine.store.quads_for_pattern(None, reifies, None)]
+
+        # datasetTM triples share the dataset subjects but are not quoted by the map
+        self.assertEqual(len(reified), 2)
+        self.assertTrue(all(triple.predicate == NamedNode(f"{DCAT}theme") for triple in reified))
+        self.assertEqual(self.engine.stats['quoted_triples_generated'], 4)
+
+    def test_store_stats_match_store(self):
+        stats = self.engine.store_stats
+        recount = StoreStats(self.engine.store)
+
+        self.assertEqual(stats.total, len(self.engine.store))
+        self.assertEqual(stats.graph_counts, recount.graph_counts)
+        self.assertEqual(stats.annotations, 2)
+
+    def test_cache_only_for_referenced_maps(self):
+        cache = self.engine.triples_cache
+
+        self.assertEqual(set(cache), {'datasetThemeTM'})
+        self.assertEqual(cache['datasetThemeTM'].columns, ['row_idx', 'pred_id'])
+        self.assertEqual(cache['datasetThemeTM']['row_idx'].to_list(), [0, 1, 2])
+        self.assertEqual(cache['datasetThemeTM']['pred_id'].to_list(), [0, 0, 0])
+
+    def test_referenced_map_with_several_predicates(self):
+        mapping_path = os.path.join(self.temp_dir, 'quote_dataset.yaml')
+        with open(mapping_path, 'w') as f:
+            f.write(MAPPING.replace("quoted=datasetThemeTM", "quoted=datasetTM"))
+
+        engine = run_engine(mapping_path, os.path.join(self.temp_dir, 'quote_dataset.trig'))
+        reifies = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#reifies")
+        reified = {(str(t.subject), str(t.predicate))
+                   for t in (q.object for q in engine.store.quads_for_pattern(None, reifies, None))}
+
+        self.assertEqual(reified, {
+            (f"<{EX}dataset/{ds}>", predicate)
+            for ds in ('DS-1', 'DS-2')
+            for predicate in ("<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>",
+                              "<http://purl.org/dc/terms/title>",
+                              "<http://purl.org/dc/terms/publisher>")
+        })
+
+    def test_join_on_differently_named_keys(self):
+        lineage_path = os.path.join(self.temp_dir, 'lineage_by_product.csv')
+        with open(lineage_path, 'w') as f:
+            f.write("product,source_system,confidence\nDS-3,SAP,0.5\n")
+        mapping_path = os.path.join(self.temp_dir, 'product_join.yaml')
+        with open(mapping_path, 'w') as f:
+            f.write(MAPPING.replace("['lineage.csv~csv']", "['lineage_by_product.csv~csv']", 1)
+                           .replace("str1=$(dataset_id)", "str1=$(product)"))
+
+        engine = run_engine(mapping_path, os.path.join(self.temp_dir, 'product_join.trig'))
+        rows = list(engine.store.query("""
+            SELECT ?dataset WHERE {
+                ?r <http://www.w3.org/1999/02/22-rdf-syntax-ns#reifies> <<( ?dataset ?p ?o )>> ;
+                   <http://www.w3.org/ns/prov#wasDerivedFrom> <http://example.org/system/SAP> .
+            }
+        """))
+
+        self.assertEqual([str(row['dataset']) for row in rows], [f"<{EX}dataset/DS-3>"])
+
+
+class TestNQuadsEmitMode(unittest.TestCase):
+    """Test streaming quad frames straight to N-Quads."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mapping = write_fixture(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_nquads_output_matches_store_mode(self):
+        trig_path = os.path.join(self.temp_dir, 'out.trig')
+        nq_path = os.path.join(self.temp_dir, 'out.nq')
+        run_engine(self.mapping, trig_path)
+        engine = run_engine(self.mapping, nq_path, emit_mode='nquads')
+
+        trig_store = Store()
+        trig_store.load(path=trig_path, format=RdfFormat.TRIG)
+        nq_store = Store()
+        nq_store.load(path=nq_path, format=RdfFormat.N_QUADS)
+
+        self.assertEqual(comparable_quads(nq_store), comparable_quads(trig_store))
+        self.assertGreater(engine.stats['quads_written'], 0)
+
+    def test_on_disk_store_matches_in_memory_store(self):
+        trig_path = os.path.join(self.temp_dir, 'out.trig')
+        disk_path = os.path.join(self.temp_dir, 'disk.trig')
+        run_engine(self.mapping, trig_path)
+        engine = run_engine(self.mapping, disk_path, store_path=os.path.join(self.temp_dir, 'store'))
+
+        trig_store = Store()
+        trig_store.load(path=trig_path, format=RdfFormat.TRIG)
+        self.assertEqual(comparable_quads(engine.store), comparable_quads(trig_store))
+        self.assertEqual(engine.store_stats.total, len(engine.store))
+
+    def test_invalid_emit_mode(self):
+        with self.assertRaises(ValueError):
+            RDFStarETLEngine(self.mapping, emit_mode='rdfxml')
+
+    def test_store_mode_writes_nquads_for_nq_output(self):
+        trig_path = os.path.join(self.temp_dir, 'out.trig')
+        nq_path = os.path.join(self.temp_dir, 'store.nq')
+        run_engine(self.mapping, trig_path)
+        run_engine(self.mapping, nq_path)
+
+        with open(nq_path) as f:
+            self.assertNotIn('@prefix', f.read())
+
+        trig_store = Store()
+        trig_store.load(path=trig_path, format=RdfFormat.TRIG)
+        nq_store = Store()
+        nq_store.load(path=nq_path, format=RdfFormat.N_QUADS)
+        self.assertEqual(comparable_quads(nq_store), comparable_quads(trig_store))
+
+    def test_trig_output_declares_mapping_prefixes(self):
+        trig_path = os.path.join(self.temp_dir, 'out.trig')
+        run_engine(self.mapping, trig_path)
+
+        with open(trig_path) as f:
+            header = f.read().split('\n')
+        self.assertIn('@prefix ex: <http://example.org/> .', header)
+        self.assertEqual(sum(line.startswith('@prefix ex:') for line in header), 1)
+
+
+class TestStreamingMode(unittest.TestCase):
+    """Test chunked streaming over lazily scanned sources."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mapping = write_fixture(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def load_nquads(self, path):
+        store = Store()
+        store.load(path=path, format=RdfFormat.N_QUADS)
+        return store
+
+    def test_streaming_output_matches_in_memory_run(self):
+        trig_path = os.path.join(self.temp_dir, 'out.trig')
+        nq_path = os.path.join(self.temp_dir, 'stream.nq')
+        reference = run_engine(self.mapping, trig_path)
+        # Chunks smaller than the sources, so every source spans several chunks
+        engine = run_engine(self.mapping, nq_path, streaming=True, chunk_rows=1)
+
+        trig_store = Store()
+        trig_store.load(path=trig_path, format=RdfFormat.TRIG)
+        stream_store = self.load_nquads(nq_path)
+
+        self.assertEqual(comparable_quads(stream_store), comparable_quads(trig_store))
+        self.assertEqual(len(stream_store), len(trig_store))
+        for key in ('triples_generated', 'quoted_triples_generated', 'rows_processed', 'files_processed'):
+            self.assertEqual(engine.stats[key], reference.stats[key], key)
+
+    def test_reifiers_unique_across_chunks(self):
+        nq_path = os.path.join(self.temp_dir, 'stream.nq')
+        run_engine(self.mapping, nq_path, streaming=True, chunk_rows=1)
+
+        reifies = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#reifies")
+        store = self.load_nquads(nq_path)
+        reifiers = [quad.subject for quad in store.quads_for_pattern(None, reifies, None)]
+
+        self.assertGreater(len(reifiers), 1)
+        self.assertEqual(len(set(reifiers)), len(reifiers))
+
+    def test_reifiers_stable_across_runs(self):
+        reifies = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#reifies")
+        runs = []
+        for chunk_rows in (1, 1000):
+            nq_path = os.path.join(self.temp_dir, f'stream{chunk_rows}.nq')
+            run_engine(self.mapping, nq_path, streaming=True, chunk_rows=chunk_rows)
+            store = self.load_nquads(nq_path)
+            runs.append({(quad.subject, quad.object) for quad in store.quads_for_pattern(None, reifies, None)})
+
+        self.assertTrue(all(isinstance(reifier, NamedNode) for reifier, _ in runs[0]))
+        self.assertEqual(runs[0], runs[1])
+
+    def test_reifier_digest_is_fixed(self):
+        # A fixed function of the key, not of the Polars version
+        digests = content_digest(pl.Series(['<s>\n<p>\n"o"', None]))
+        self.assertEqual(digests.to_list(), ['69ffa742058d9c12a30e308676bf0eec', None])
+
+    def test_streaming_writes_nquads(self):
+        engine = RDFStarETLEngine(self.mapping, streaming=True)
+
+        self.assertEqual(engine.emit_mode, 'nquads')
+
+    def test_invalid_chunk_rows(self):
+        with self.assertRaises(ValueError):
+            RDFStarETLEngine(self.mapping, streaming=True, chunk_rows=0)
+
+
+class TestSourceProjection(unittest.TestCase):
+    """Test that sources are read with only the mapped columns, as Utf8."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.mapping = write_fixture(cls.temp_dir)
+        cls.engine = run_engine(cls.mapping, os.path.join(cls.temp_dir, 'out.trig'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_unmapped_columns_not_loaded(self):
+        products = self.engine.dataframes['products.csv']
+        lineage = self.engine.dataframes['lineage.csv']
+
+        # Header order is kept; the join key is loaded for the quoted map
+        self.assertEqual(products.columns, ['dataset_id', 'title', 'owner', 'theme_uri'])
+        self.assertEqual(lineage.columns, ['dataset_id', 'source_system', 'confidence', 'run_id'])
+
+    def test_columns_read_as_utf8(self):
+        lineage = self.engine.dataframes['lineage.csv']
+
+        self.assertTrue(all(dtype == pl.Utf8 for dtype in lineage.dtypes))
+        self.assertEqual(lineage['confidence'].to_list(), ['0.840', '0.98'])
+
+    def test_join_keys_are_required_columns(self):
+        parser = self.engine.parser
+
+        self.assertEqual(parser.get_join_keys(parser.triples_maps['themeGovernanceTM']),
+                         ('dataset_id', 'dataset_id'))
+        self.assertIn('dataset_id', parser.get_required_columns_for_source('lineage.csv'))
+
+    def test_mapping_without_column_references_keeps_rows(self):
+        constant_mapping = os.path.join(self.temp_dir, 'constant.yaml')
+        with open(constant_mapping, 'w') as f:
+            f.write("""
+prefixes:
+  ex: "http://example.org/"
+mappings:
+  constantTM:
+    sources:
+      - ['products.csv~csv']
+    subject: ex:catalog
+    predicateobjects:
+      - [ex:source, ex:products~iri]
+""")
+        engine = run_engine(constant_mapping, os.path.join(self.temp_dir, 'constant.trig'))
+
+        self.assertEqual(engine.stats['rows_processed'], 3)
+        self.assertEqual(engine.stats['triples_generated'], 3)
+
+
+class TestParallelWorkers(unittest.TestCase):
+    """Test running triples maps in worker processes."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.mapping = write_fixture(cls.temp_dir)
+        cls.reference_path = os.path.join(cls.temp_dir, 'reference.trig')
+        cls.reference = run_engine(cls.mapping, cls.reference_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def test_store_mode_matches_sequential(self):
+        engine = run_engine(self.mapping, os.path.join(self.temp_dir, 'parallel.trig'), workers=2)
+
+        self.assertEqual(comparable_quads(engine.store), comparable_quads(self.reference.store))
+        self.assertEqual(engine.stats, self.reference.stats)
+        self.assertEqual(set(engine.triples_cache), {'datasetThemeTM'})
+
+    def test_streaming_nquads_matches_sequential(self):
+        nq_path = os.path.join(self.temp_dir, 'parallel.nq')
+        run_engine(self.mapping, nq_path, workers=2, streaming=True, chunk_rows=1)
+
+        store = Store()
+        store.load(path=nq_path, format=RdfFormat.N_QUADS)
+        self.assertEqual(comparable_quads(store), comparable_quads(self.reference.store))
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            RDFStarETLEngine(self.mapping, workers=0)
+
+
+class TestSharedStore(unittest.TestCase):
+    """Test loading straight into a named graph of a caller's store."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mapping = write_fixture(self.temp_dir)
+        self.graph = f"{EX}batch/b1"
+        self.existing = Quad(NamedNode(f"{EX}s"), NamedNode(f"{EX}p"), Literal("kept"))
+        self.store = Store()
+        self.store.add(self.existing)
+        self.stats = StoreStats(self.store)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def graph_quads(self):
+        return list(self.store.quads_for_pattern(None, None, None, NamedNode(self.graph)))
+
+    def test_loads_into_graph_without_output(self):
+        output_path = os.path.join(self.temp_dir, 'unused.trig')
+        engine = run_engine(self.mapping, output_path, store=self.store, store_stats=self.stats,
+                            graph=self.graph, write_output=False)
+
+        self.assertFalse(os.path.exists(output_path))
+        self.assertIn(self.existing, self.store)
+        self.assertEqual(len(self.store), len(self.graph_quads()) + 1)
+        self.assertEqual(engine.graph_quads, len(self.graph_quads()))
+        self.assertEqual(self.stats.total, len(self.store))
+        self.assertEqual(self.stats.graph_count(self.graph), engine.graph_quads)
+
+    def test_background_output_holds_graph(self):
+        output_path = os.path.join(self.temp_dir, 'batch.trig')
+        engine = run_engine(self.mapping, output_path, store=self.store, store_stats=self.stats,
+                            graph=self.graph, background_output=True)
+        engine.wait_for_output()
+
+        written = Store()
+        written.load(path=output_path, format=RdfFormat.TRIG)
+        self.assertEqual(len(written), engine.graph_quads)
+
+    def test_parallel_workers_load_into_graph(self):
+        engine = run_engine(self.mapping, None, store=self.store, store_stats=self.stats,
+                            graph=self.graph, write_output=False, workers=2)
+
+        self.assertEqual(len(self.store), len(self.graph_quads()) + 1)
+        self.assertEqual(self.stats.total, len(self.store))
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            RDFStarETLEngine(self.mapping, store=self.store, store_path=self.temp_dir)
+        with self.assertRaises(ValueError):
+            RDFStarETLEngine(self.mapping, store=self.store, emit_mode='nquads')
+        with self.assertRaises(ValueError):
+            RDFStarETLEngine(self.mapping, streaming=True, write_output=False)
+
+
+class TestSourceFingerprint(unittest.TestCase):
+    """Test the fingerprint of the mapping and its source files."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.mapping = write_fixture(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def fingerprint(self):
+        engine = RDFStarETLEngine(self.mapping, write_output=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return engine.source_fingerprint()
+
+    def test_same_input_same_fingerprint(self):
+        self.assertEqual(self.fingerprint(), self.fingerprint())
+
+    def test_changed_source_or_mapping(self):
+        before = self.fingerprint()
+        with open(os.path.join(self.temp_dir, 'lineage.csv'), 'a') as f:
+            f.write('\n')
+        changed_source = self.fingerprint()
+        with open(self.mapping, 'a') as f:
+            f.write('\n# changed\n')
+
+        self.assertNotEqual(changed_source, before)
+        self.assertNotEqual(self.fingerprint(), changed_source)
+
+    def test_missing_source_has_no_fingerprint(self):
+        os.remove(os.path.join(self.temp_dir, 'products.csv'))
+        self.assertIsNone(self.fingerprint())
+
+    def test_run_after_fingerprint(self):
+        engine = RDFStarETLEngine(self.mapping, write_output=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.source_fingerprint()
+            engine.run()
+        self.assertGreater(engine.stats['triples_generated'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
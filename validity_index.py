@@ -0,0 +1,294 @@
+"""
+Validity Index
+==============
+
+Valid-time intervals of every distinct triple across batches, kept as
+Parquet files in a directory next to the batch metadata:
+
+    s, p, o       N-Triples terms of the triple (join key)
+    valid_from    Number of the first batch that holds the triple
+    valid_to      Number of the first batch that no longer holds it
+                  (null while the triple is in the latest indexed batch)
+
+A triple that disappears and comes back has one row per interval. Each load
+only compares the new batch with the open intervals, so updates cost the
+size of the batch, and the state at any batch is a filter over the index
+instead of a scan over every retained batch graph. A store holding the state
+of one batch is moved to another batch by applying only the triples that
+differ between the two (move_state).
+
+Closed intervals never change again, so they are written once into one
+append-only partition per batch (closed_<n>.parquet, the intervals batch n
+closed); a load only rewrites open.parquet. The open set records the
+latest indexed batch in its Parquet metadata, which makes the replacement
+of open.parquet the commit point of an update. Triples are matched on
+their terms rather than a hash, as the index outlives the Polars version
+(and its hash function) that wrote it.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+from typing import Iterator, List, Optional, Tuple
+
+import polars as pl
+from pyoxigraph import Store, Quad, NamedNode, RdfFormat, parse
+
+from batch_diff import scan_ntriples
+from store_io import bulk_add, write_store
+
+INDEX_SCHEMA = {
+    's': pl.String,
+    'p': pl.String,
+    'o': pl.String,
+    'valid_from': pl.UInt32,
+    'valid_to': pl.UInt32,
+}
+
+TRIPLE_KEY = ['s', 'p', 'o']
+
+OPEN_FILE = 'open.parquet'
+CLOSED_FILE = re.compile(r'^closed_(\d+)\.parquet$')
+
+# Index rows parsed into quads at a time when a state store is moved
+STATE_CHUNK_ROWS = 65536
+
+
+def _split_triples(lines: pl.LazyFrame) -> pl.LazyFrame:
+    """Split N-Triples lines into s, p, o terms"""
+    terms = pl.col('line').str.strip_suffix(' .').str.splitn(' ', 3)
+    return lines.select(
+        s=terms.struct.field('field_0'),
+        p=terms.struct.field('field_1'),
+        o=terms.struct.field('field_2'),
+    )
+
+
+def _valid_at(batch_number: int) -> pl.Expr:
+    """Whether an interval covers a batch"""
+    return (
+        (pl.col('valid_from') <= batch_number)
+        & (pl.col('valid_to').is_null() | (pl.col('valid_to') > batch_number))
+    )
+
+
+def _default_graph_quads(triples: pl.DataFrame) -> Iterator[Quad]:
+    """Parse s, p, o rows into default graph quads, a chunk at a time"""
+    for chunk in triples.iter_slices(STATE_CHUNK_ROWS):
+        data = chunk.select(
+            pl.concat_str([pl.col('s'), pl.col('p'), pl.col('o'), pl.lit('.\n')], separator=' ')
+            .str.join('')
+        ).item()
+        yield from parse(data.encode(), RdfFormat.N_TRIPLES)
+
+
+class ValidityIndex:
+    """
+    Valid-from/valid-to batch numbers of every triple.
+
+    Usage:
+        index = ValidityIndex("batch_metadata/validity_index")
+        index.update(store, NamedNode(batch.graph_uri), batch.batch_number)
+        index.state(batch_number, subject="<http://example.org/customer/123>")
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Directory of the index partitions (created on the first update)
+        """
+        self.path = path
+
+    @property
+    def _open_path(self) -> str:
+        return os.path.join(self.path, OPEN_FILE)
+
+    def _closed_paths(self, after: int = 0) -> List[str]:
+        """Partitions of the intervals closed after a batch, up to the latest indexed batch"""
+        last_batch = self.last_batch
+        if not last_batch:
+            return []
+        paths = []
+        for name in sorted(os.listdir(self.path)):
+            match = CLOSED_FILE.match(name)
+            # Partitions of an update that did not commit are left out
+            if match and after < int(match.group(1)) <= last_batch:
+                paths.append(os.path.join(self.path, name))
+        return paths
+
+    def scan(self, closed_after: int = 0) -> pl.LazyFrame:
+        """
+        All intervals of the index.
+
+        Args:
+            closed_after: Leave out the intervals closed up to this batch
+        """
+        if not os.path.exists(self._open_path):
+            return pl.LazyFrame(schema=INDEX_SCHEMA)
+        return pl.scan_parquet([self._open_path] + self._closed_paths(closed_after))
+
+    def scan_open(self) -> pl.LazyFrame:
+        """Intervals of the triples in the latest indexed batch"""
+        if not os.path.exists(self._open_path):
+            return pl.LazyFrame(schema=INDEX_SCHEMA)
+        return pl.scan_parquet(self._open_path)
+
+    @property
+    def last_batch(self) -> int:
+        """Number of the latest indexed batch (0 if none)"""
+        if not os.path.exists(self._open_path):
+            return 0
+        return int(pl.read_parquet_metadata(self._open_path).get('last_batch', 0))
+
+    def update(self, store: Store, graph: NamedNode, batch_number: int) -> int:
+        """
+        Index a newly loaded batch.
+
+        Open intervals of triples missing from the batch are closed (into
+        a new partition) and the batch's new triples open an interval.
+
+        Args:
+            store: Store holding the batch
+            graph: Graph of the batch
+            batch_number: Number of the batch (higher than every indexed batch)
+
+        Returns:
+            Number of triples that changed (opened or closed intervals)
+        """
+        if batch_number <= self.last_batch:
+            raise ValueError(f"Batch {batch_number} is not newer than indexed batch {self.last_batch}")
+
+        os.makedirs(self.path, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix='validity_', dir=self.path) as tmp:
+            nt_path = os.path.join(tmp, 'batch.nt')
+            write_store(store, nt_path, RdfFormat.N_TRIPLES, from_graph=graph)
+            if os.path.getsize(nt_path) == 0:
+                batch = pl.LazyFrame(schema={k: INDEX_SCHEMA[k] for k in TRIPLE_KEY})
+            else:
+                batch = _split_triples(scan_ntriples(nt_path))
+
+            open_intervals = self.scan_open()
+            still_valid = open_intervals.join(batch, on=TRIPLE_KEY, how='semi')
+            ended = (
+                open_intervals.join(batch, on=TRIPLE_KEY, how='anti')
+                .with_columns(valid_to=pl.lit(batch_number, dtype=pl.UInt32))
+            )
+            started = (
+                batch.join(open_intervals, on=TRIPLE_KEY, how='anti')
+                .unique(TRIPLE_KEY)
+                .with_columns(valid_from=pl.lit(batch_number, dtype=pl.UInt32),
+                              valid_to=pl.lit(None, dtype=pl.UInt32))
+                .select(list(INDEX_SCHEMA))
+            )
+
+            tmp_closed = os.path.join(tmp, 'closed.parquet')
+            tmp_open = os.path.join(tmp, OPEN_FILE)
+            ended.sink_parquet(tmp_closed)
+            pl.concat([still_valid, started], how='vertical').sink_parquet(
+                tmp_open, metadata={'last_batch': str(batch_number)})
+            closed = pl.scan_parquet(tmp_closed).select(pl.len()).collect().item()
+            opened = (
+                pl.scan_parquet(tmp_open)
+                .select((pl.col('valid_from') == batch_number).sum())
+                .collect().item()
+            )
+
+            # The closed partition is only read once open.parquet names its
+            # batch; one left by an update that did not commit is replaced
+            closed_path = os.path.join(self.path, f"closed_{batch_number}.parquet")
+            if closed:
+                os.replace(tmp_closed, closed_path)
+            elif os.path.exists(closed_path):
+                os.remove(closed_path)
+            os.replace(tmp_open, self._open_path)
+
+        return closed + opened
+
+    def state(self, batch_number: int, subject: Optional[str] = None,
+              predicate: Optional[str] = None) -> pl.DataFrame:
+        """
+        Triples valid in a batch, optionally for one subject and predicate.
+
+        Args:
+            batch_number: Batch to get the state of
+            subject: N-Triples subject term (e.g. '<http://example.org/x>')
+            predicate: N-Triples predicate term
+
+        Returns:
+            DataFrame of s, p, o terms
+        """
+        valid = self.scan(closed_after=batch_number).filter(_valid_at(batch_number))
+        if subject is not None:
+            valid = valid.filter(pl.col('s') == subject)
+        if predicate is not None:
+            valid = valid.filter(pl.col('p') == predicate)
+        return valid.select('s', 'p', 'o').collect()
+
+    def history(self, subject: str) -> pl.DataFrame:
+        """All intervals of the triples of one subject, oldest first"""
+        return (
+            self.scan()
+            .filter(pl.col('s') == subject)
+            .select('p', 'o', 'valid_from', 'valid_to')
+            .sort('valid_from', 'p', 'o')
+            .collect()
+        )
+
+    def changes(self, from_batch: int, to_batch: int) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        """
+        Triples that differ between the states of two batches.
+
+        Only the open intervals and the partitions closed after the earlier
+        batch are read.
+
+        Args:
+            from_batch: Batch to start from (0 for the empty state)
+            to_batch: Batch to go to (earlier or later than from_batch)
+
+        Returns:
+            (added, removed) DataFrames of s, p, o terms: the triples valid in
+            to_batch but not in from_batch, and the other way round
+        """
+        differing = (
+            self.scan(closed_after=min(from_batch, to_batch))
+            .filter(_valid_at(from_batch) != _valid_at(to_batch))
+            .select('s', 'p', 'o', valid=_valid_at(to_batch))
+            .collect()
+        )
+        added = differing.filter(pl.col('valid')).drop('valid')
+        removed = differing.filter(~pl.col('valid')).drop('valid')
+        return added, removed
+
+    def move_state(self, store: Store, from_batch: int, to_batch: int) -> int:
+        """
+        Turn a store holding the state of one batch into the state of another.
+
+        Only the triples that differ between the two batches are added or
+        removed, so moving between nearby batches costs their churn rather
+        than the size of the state.
+
+        Args:
+            store: Store with the triples valid in from_batch (in the default graph)
+            from_batch: Batch the store holds (0 for an empty store)
+            to_batch: Batch to move the store to
+
+        Returns:
+            Number of triples added or removed
+        """
+        added, removed = self.changes(from_batch, to_batch)
+        for quad in _default_graph_quads(removed):
+            store.remove(quad)
+        bulk_add(store, _default_graph_quads(added))
+        return added.height + removed.height
+
+    def state_store(self, batch_number: int) -> Store:
+        """A store with the triples valid in a batch (in the default graph)"""
+        store = Store()
+        self.move_state(store, 0, batch_number)
+        return store
+
+    def clear(self):
+        """Remove the index partitions"""
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
@@ -529,8 +529,41 @@ class YARRRMLParser:
                 if po.predicate:
                     columns.update(self.extract_template_variables(po.predicate))
 
+            # Join keys: str1 is read from the quoted map's own source,
+            # str2 from the source of the map it quotes
+            if tm.subject.is_quoted:
+                child_key, _ = self.get_join_keys(tm)
+                if child_key:
+                    columns.add(child_key)
+            for other in self.triples_maps.values():
+                if other.subject.is_quoted and other.subject.quoted_mapping_ref == tm.name:
+                    _, parent_key = self.get_join_keys(other)
+                    if parent_key:
+                        columns.add(parent_key)
+
         return sorted(list(columns))
 
+    def get_join_keys(self, tm: TriplesMap) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get the (str1, str2) columns of a quoted triples map's equal() join condition.
+
+        str1 is a column of the quoted map's source, str2 a column of the
+        source of the referenced map. Either is None if not present.
+        """
+        join_condition = tm.subject.join_condition
+        if not join_condition:
+            return None, None
+
+        equal_params = join_condition.get('equal', '')
+        if not isinstance(equal_params, str):
+            return None, None
+
+        keys = []
+        for param in ('str1', 'str2'):
+            match = re.search(param + r'=\$\(([^)]+)\)', equal_params)
+            keys.append(match.group(1) if match else None)
+        return keys[0], keys[1]
+
     def _parse_authors(self, authors_def) -> List[Dict[str, str]]:
         """Parse authors from various formats"""
         authors = []